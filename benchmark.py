@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from functools import partial
+
+from functions import *
+from sources import iter_archive_members
+from decoding import DECODERS, decode_match
+from storage import INGEST_TABLES, LocalDatabase, SQLiteBackend, MemoryBackend
+from synthetic_cricsheet import generate_archive
+from writer_pool import WriterPool
+
+
+BACKENDS = {'sqlite': SQLiteBackend, 'memory': MemoryBackend}
+
+
+###############################################
+class StageTimer:
+    """
+    Accumulates wall time per stage.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+
+    def time(self, stage: str, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.seconds[stage] += time.perf_counter() - start
+        return result
+
+
+def run_benchmark(n_matches: int = 100, batch_size: int = 1000, seed: int = 0, trace_memory: bool = False,
+                  backend: str = None, decoder: str = None, **match_options):
+    """
+    Generates a synthetic archive and runs the ingest steps over it against a LocalDatabase, timing each step.
+
+    Parameters:
+    ------------
+        n_matches (int): Number of synthetic matches.
+        batch_size (int): Passed to the write_* functions; None benchmarks the per-row path.
+        backend (str, optional): 'sqlite' or 'memory' to time storage backend write_match calls (see storage.py)
+                                 instead of the individual write_* functions.
+        seed (int): Generator seed, so runs are reproducible.
+        decoder (str, optional): A decoding.DECODERS entry timed as the 'decode' stage; defaults to decoding.default_decoder().
+                                 A streaming decoder defers part of its work to parse_innings_info.
+        trace_memory (bool): Also report the peak of Python allocations with tracemalloc (slows every stage down).
+        **match_options: Passed to synthetic_cricsheet.generate_match (overs, wicket_rate, extras_rate, ...).
+
+    Returns:
+    -----------
+        dict: Per-stage seconds, matches/s and deliveries/s, plus totals and peak memory.
+    """
+    archive = generate_archive(n_matches, seed=seed, **match_options)
+    cnx = LocalDatabase()
+    storage_backend = None
+    if backend == 'sqlite':
+        storage_backend = SQLiteBackend(batch_size=batch_size or 1000)
+    elif backend is not None:
+        storage_backend = BACKENDS[backend]()
+    timer = StageTimer()
+    n_deliveries = 0
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for member_name, raw in iter_archive_members(archive):
+        json_data = timer.time('decode', decode_match, raw, decoder)
+        team_df, player_df = timer.time('parse_team_player_info', parse_team_player_info, json_data)
+        match_info_df = timer.time('parse_match_info', parse_match_info, json_data, match_id=match_id_from_file_name(member_name))
+        delivery_details, rollups = {}, {}
+        innings_df = timer.time('parse_innings_info', parse_innings_info, json_data, match_info_df, delivery_details=delivery_details,
+                                rollups=rollups)
+        n_deliveries += len(innings_df)
+
+        if storage_backend is not None:
+            timer.time('write_match', storage_backend.write_match, team_df, player_df, match_info_df, innings_df, delivery_details, rollups)
+            timer.time('commit', storage_backend.commit)
+            continue
+
+        timer.time('write_players_to_cricket_db', write_players_to_cricket_db, player_df, cnx, batch_size=batch_size, commit=False)
+        timer.time('write_teams_to_cricket_db', write_teams_to_cricket_db, team_df, cnx, batch_size=batch_size, commit=False)
+        match_info_df['team1_id'] = lookup_team_id(match_info_df['team1'].iloc[0], cnx)
+        match_info_df['team2_id'] = lookup_team_id(match_info_df['team2'].iloc[0], cnx)
+        timer.time('write_match_info', write_match_info, match_info_df, cnx, batch_size=batch_size, commit=False)
+        timer.time('write_innings_info', write_innings_info, innings_df, cnx, batch_size=batch_size, commit=False)
+        timer.time('write_delivery_details', write_delivery_details, delivery_details, cnx, batch_size=batch_size or 1000, commit=False)
+        timer.time('write_rollups', write_rollups, rollups, cnx, batch_size=batch_size or 1000, commit=False)
+        timer.time('commit', cnx.commit)
+    total_seconds = time.perf_counter() - start
+
+    results = {
+        "matches": n_matches,
+        "deliveries": n_deliveries,
+        "batch_size": batch_size,
+        "backend": backend,
+        "decoder": decoder,
+        "total_seconds": total_seconds,
+        "matches_per_second": n_matches / total_seconds,
+        "deliveries_per_second": n_deliveries / total_seconds,
+        "stages": {
+            stage: {
+                "seconds": seconds,
+                "matches_per_second": n_matches / seconds if seconds else None,
+                "deliveries_per_second": n_deliveries / seconds if seconds else None,
+            }
+            for stage, seconds in timer.seconds.items()
+        },
+        #ru_maxrss is kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024),
+    }
+    if trace_memory:
+        results["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    cnx.close()
+    if storage_backend is not None:
+        storage_backend.close()
+    return results
+
+
+def run_pool_benchmark(pool_sizes: list = (1, 2, 4, 8), n_matches: int = 200, connect=None, batch_size: int = 1000,
+                       seed: int = 0, **match_options):
+    """
+    Times writer_pool.WriterPool over a synthetic archive at each pool size. The matches are parsed once up front, so
+    only the writes are timed, and the ingest tables are emptied before each run.
+
+    Parameters:
+    ------------
+        pool_sizes (list): Connection counts to time.
+        connect (optional): Function returning a new connection to a throwaway database with the ingest tables and
+                            an empty match_info; its ingest tables are truncated before each run. Defaults to
+                            LocalDatabase on a temporary sqlite file, which serializes writers and so cannot show any
+                            scaling; point it at MySQL (see --mysql-database) to measure it.
+        batch_size, seed, **match_options: As in run_benchmark.
+
+    Returns:
+    -----------
+        dict: matches, deliveries, the database ('sqlite' or 'mysql') and, per pool size, seconds, matches/s,
+              deliveries/s and the speedup over the first size.
+    """
+    archive = generate_archive(n_matches, seed=seed, **match_options)
+    parsed_matches = list(parse_match_members(iter_archive_members(archive)))
+    n_deliveries = sum(len(parsed[3]) for parsed in parsed_matches)
+    if connect is None:
+        connect = partial(LocalDatabase, os.path.join(tempfile.mkdtemp(), 'pool_benchmark.db'))
+
+    #the runs truncate the ingest tables, so refuse a database that holds matches (and the manifest and summaries
+    #describing them) rather than wipe it
+    cnx = connect()
+    database = 'sqlite' if isinstance(cnx, LocalDatabase) else 'mysql'
+    cursor = cnx.cursor()
+    cursor.execute("SELECT 1 FROM match_info LIMIT 1")
+    has_matches = bool(cursor.fetchall())
+    cursor.close()
+    cnx.close()
+    if has_matches:
+        raise ValueError("the pool benchmark truncates the ingest tables, but match_info already holds matches; "
+                         "point it at a throwaway database")
+
+    runs = {}
+    for pool_size in pool_sizes:
+        cnx = connect()
+        cursor = cnx.cursor()
+        for table in INGEST_TABLES:
+            cursor.execute("TRUNCATE TABLE {}".format(table))
+        cursor.close()
+        cnx.commit()
+
+        start = time.perf_counter()
+        with WriterPool(connect, pool_size=pool_size, dimension_cnx=cnx, batch_size=batch_size) as writer_pool:
+            futures = [writer_pool.submit(parsed) for parsed in parsed_matches]
+        seconds = time.perf_counter() - start
+        for future in futures:
+            future.result()
+        cnx.close()
+        runs[pool_size] = {
+            "seconds": seconds,
+            "matches_per_second": n_matches / seconds,
+            "deliveries_per_second": n_deliveries / seconds,
+        }
+    for results in runs.values():
+        results["speedup"] = runs[pool_sizes[0]]["seconds"] / results["seconds"]
+    return {"matches": n_matches, "deliveries": n_deliveries, "batch_size": batch_size, "database": database, "pool_sizes": runs}
+
+
+def format_pool_results(results: dict):
+    """
+    Renders run_pool_benchmark results as a plain-text table.
+    """
+    lines = [
+        "{matches} matches, {deliveries} deliveries, batch_size={batch_size}, database={database}".format(**results),
+        "{:<10} {:>10} {:>12} {:>14} {:>8}".format("pool size", "seconds", "matches/s", "deliveries/s", "speedup"),
+    ]
+    if results["database"] == 'sqlite':
+        lines.insert(1, "sqlite serializes the writers, so these runs cannot show scaling; use --mysql-database")
+    for pool_size, pool_results in results["pool_sizes"].items():
+        lines.append("{:<10} {:>10.3f} {:>12.1f} {:>14.0f} {:>7.2f}x".format(
+            pool_size, pool_results["seconds"], pool_results["matches_per_second"], pool_results["deliveries_per_second"],
+            pool_results["speedup"]))
+    return "\n".join(lines)
+
+
+def format_results(results: dict):
+    """
+    Renders run_benchmark results as a plain-text table.
+    """
+    lines = [
+        "{matches} matches, {deliveries} deliveries, batch_size={batch_size}, backend={backend}, decoder={decoder}".format(**results),
+        "{:<30} {:>10} {:>12} {:>14}".format("stage", "seconds", "matches/s", "deliveries/s"),
+    ]
+    for stage, stage_results in results["stages"].items():
+        lines.append("{:<30} {:>10.3f} {:>12.1f} {:>14.0f}".format(
+            stage, stage_results["seconds"], stage_results["matches_per_second"] or 0, stage_results["deliveries_per_second"] or 0))
+    lines.append("{:<30} {:>10.3f} {:>12.1f} {:>14.0f}".format(
+        "total", results["total_seconds"], results["matches_per_second"], results["deliveries_per_second"]))
+    lines.append("peak RSS: {:.1f} MB".format(results["peak_rss_mb"]))
+    if "peak_traced_mb" in results:
+        lines.append("peak traced allocations: {:.1f} MB".format(results["peak_traced_mb"]))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline ingest benchmark over synthetic Cricsheet ODI matches.")
+    parser.add_argument('--matches', type=int, default=100, help="number of synthetic matches")
+    parser.add_argument('--overs', type=int, default=50, help="overs per innings")
+    parser.add_argument('--wicket-rate', type=float, default=0.03, help="probability a legal delivery takes a wicket")
+    parser.add_argument('--extras-rate', type=float, default=0.05, help="probability a delivery concedes extras")
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per multi-row INSERT; 0 benchmarks the per-row path")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), help="time storage backend write_match calls instead of the write_* functions")
+    parser.add_argument('--decoder', choices=sorted(DECODERS), help="match file decoder (default: orjson if installed, else json)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-memory', action='store_true', help="also report peak Python allocations (slower)")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('--pool-sizes', type=int, nargs='+', help="time writer_pool.WriterPool at these connection counts instead")
+    parser.add_argument('--mysql-database', help="with --pool-sizes, write to this MySQL database instead of a temporary "
+                                                 "sqlite file; its ingest tables are truncated, so it must be a throwaway "
+                                                 "database (the benchmark refuses one with matches in it)")
+    parser.add_argument('--config', help="MySQL option file for --mysql-database (see cricket_parser.db_config); "
+                                         "its database setting is ignored")
+    args = parser.parse_args()
+
+    if args.pool_sizes:
+        connect = None
+        if args.mysql_database:
+            import cricket_parser
+            from schema import create_tables
+
+            connect = partial(cricket_parser.connect, dict(cricket_parser.db_config(args.config), database=args.mysql_database))
+            setup_cnx = connect()
+            create_tables(setup_cnx)
+            setup_cnx.close()
+        results = run_pool_benchmark(args.pool_sizes, n_matches=args.matches, connect=connect, batch_size=args.batch_size or 1000,
+                                     seed=args.seed, overs=args.overs, wicket_rate=args.wicket_rate, extras_rate=args.extras_rate)
+        print(json.dumps(results, indent=2) if args.json else format_pool_results(results))
+        sys.exit()
+
+
+    results = run_benchmark(n_matches=args.matches, batch_size=args.batch_size or None, seed=args.seed,
+                            trace_memory=args.trace_memory, backend=args.backend, decoder=args.decoder, overs=args.overs,
+                            wicket_rate=args.wicket_rate, extras_rate=args.extras_rate)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
@@ -0,0 +1,34 @@
+import pytest
+
+import cricket_parser
+import schema
+from storage import LocalDatabase
+
+
+###############################################
+class LocalIngest:
+    """
+    Runs cricket_parser.ingest against a sqlite file (see storage.LocalDatabase) instead of MySQL.
+    """
+
+    def __init__(self, path: str, metrics_path: str):
+        self.path = path
+        self.metrics_path = metrics_path
+
+    def connect(self, config: dict = None, **options):
+        return LocalDatabase(self.path)
+
+    def __call__(self, archive, **options):
+        options = dict({'parse_workers': 1, 'pipeline': False, 'metrics_path': self.metrics_path}, **options)
+        return cricket_parser.ingest(archive, config={}, **options)
+
+
+@pytest.fixture
+def local_ingest(tmp_path, monkeypatch):
+    local_ingest = LocalIngest(str(tmp_path / 'cricket.db'), str(tmp_path / 'ingest_metrics.json'))
+    monkeypatch.setattr(cricket_parser, 'connect', local_ingest.connect)
+    #SQLITE_SCHEMA already creates the ingest tables; the MySQL DDL, column and index checks do not run on sqlite
+    monkeypatch.setattr(schema, 'create_tables', lambda cnx, tables=None: None)
+    monkeypatch.setattr(schema, 'create_secondary_indexes', lambda cnx, tables=None: [])
+    monkeypatch.setattr(schema, 'drop_secondary_indexes', lambda cnx, tables=None: [])
+    return local_ingest
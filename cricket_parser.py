@@ -1,219 +1,478 @@
-
-#establish database connection 
-import mysql.connector
-import pandas as pd
-import numpy as np
-import requests
-import sys
+#command line and importable entry point of the ingest: fetch the Cricsheet archive, ingest it into MySQL, run the reports
+#    python cricket_parser.py fetch --output odis_json.zip
+#    python cricket_parser.py ingest --archive odis_json.zip
+#    python cricket_parser.py report --season 2019
+#    python cricket_parser.py report --check-plans
+#only the standard library is imported here; each command imports what it uses, so a report never loads the ingest code
 import os
-import json
-from concurrent.futures import ProcessPoolExecutor
+import sys
 import logging
-import shutil
-from functions import *
+import argparse
+import configparser
 
 
 #create logging object
-logging.basicConfig(
-    stream = sys.stderr,
-    format = '%(levelname)s: %(name)s: %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Set the logging level
-logger.setLevel(logging.INFO)
-
-logger.info("Successfully imported necessary libraries!")
-
-#scrape the data and store it in odis_json folder:
-# Get the file from the URL
-response = requests.get("https://cricsheet.org/downloads/odis_json.zip")
-
-
-current_directory = os.getcwd() #the directory where the script is being run. store the downloaded json here for now
-
-# Check if the folder exists
-if os.path.exists("odis_json"):
-    # Delete the folder and all of its contents
-    shutil.rmtree("odis_json")
-
-# Create a folder to store the files
-os.mkdir("odis_json")
-
-# Write the file to the folder
-with open("odis_json/odis_json.zip", "wb") as f:
-    f.write(response.content)
-
-# Unzip the file
-os.system("unzip odis_json/odis_json.zip -d odis_json")
-
-#connect to MySQL database cricket_db
-db_username = input("Please enter database username: ")
-db_pw = input("Please enter db password: ")
-db_name = input("Please enter the name of the database: ")
-cnx = mysql.connector.connect(user=db_username, password=db_pw,
-                              database=db_name)
-
-#clear contents
-clear_contents(cnx = cnx)
-
-#set folder path
-folder_path = current_directory + "/odis_json"
-logging.info("Folder Path: {}".format(folder_path))
-
-#put all the file paths in a list
-file_paths = [os.path.join(folder_path, filename) for filename in os.listdir(folder_path) if filename.endswith('.json')]
-
-
-logger.info("setting directory path to: {}".format(folder_path))
-for idx,file in enumerate(file_paths):
-
-    logger.info("file no. {},  parsing/writing file {}...".format(idx, file))
-    with open(file, 'r') as file:
-        json_data = json.load(file)
-
-    #get team and player information from the json
-    team_df, player_df = parse_team_player_info(json_data = json_data)
-
-    #write info to cricket_db
-    write_players_to_cricket_db(player_df = player_df, cnx=cnx)
-    write_teams_to_cricket_db(team_df=team_df, cnx = cnx)
-
-    #get match information
-    match_info_df = parse_match_info(json_data=json_data, cnx=cnx)
-
-    #write match info to database
-    write_match_info(match_info_df=match_info_df, cnx = cnx )
-
-    #get innings information
-    innings_df = parse_innings_info(json_data = json_data, match_info_df=match_info_df, cnx = cnx)
-
-    #write to cricket_db
-    write_innings_info(innings_info_df = innings_df, cnx=cnx)
-
-logger.info("Successfully Completed Task")
-
-
-logger.info("Running Query to answer Q2a: ")
-cursor = cnx.cursor()
-
-query1 = """ WITH temp AS(
-(SELECT
-	season,
-	gender,
-	team1 as team,
-	team1_id as team_id,
-	winner
-FROM match_info mi)
-UNION ALL
-(SELECT 
-	season,
-	gender,
-	team2 as team,
-	team2_id as team_id,
-	winner 
-FROM match_info))
-
-
-SELECT
-	season,
-	gender,
-	team,
-	SUM(CASE WHEN team = winner THEN 1 ELSE 0 END) as num_wins,
-	COUNT(*) as total_games_played_excluding,
-	SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 as win_percentage
-FROM temp
-GROUP BY 1,2,3
-ORDER BY season, gender, SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 DESC """
-
-cursor.execute(query1)
-result1 = cursor.fetchall()
-
-
-
-logger.info("Q2a Answer (as a pandas dataframe): ")
-#insert dataframe here
-df = pd.DataFrame(result1)
-df.columns = ['season', 'gender', 'team', 'num_wins', 'total_games_played_excluding', 'win_percentage']
-print(df)
-
-logger.info("Running Query for Q2b...")
-cursor = cnx.cursor()
-
-query2 = """ WITH temp AS(
-(SELECT
-	season,
-	gender,
-	team1 as team,
-	team1_id as team_id,
-	winner
-FROM match_info mi)
-UNION ALL
-(SELECT 
-	season,
-	gender,
-	team2 as team,
-	team2_id as team_id,
-	winner 
-FROM match_info)),
-
-win_pct AS(
-SELECT
-	season,
-	gender,
-	team,
-	SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 as win_percentage,
-	ROW_NUMBER() OVER(PARTITION BY gender ORDER BY SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 DESC) as ranking
-FROM temp
-WHERE season = '2019' -- not sure how seasons work in cricket, i have 2019 alone and 2018/19 and 2019/20...
-GROUP BY 1,2,3) 
-
-SELECT 
-	season,
-	gender,
-	team as team_with_best_win_pctg
-FROM win_pct
-WHERE ranking = 1 """
-
-cursor.execute(query2)
-result2 = cursor.fetchall()
-
-logger.info("Answer to Q2b (as a pandas dataframe): ")
-
-#insert dataframe here
-df2 = pd.DataFrame(result2)
-columns = ['year','gender','team']
-df2.columns = columns
-print(df2)
-
-
-logger.info("Running Query for Q2c...")
-
-query3 = """ WITH temp AS(
-SELECT 
-	season,
-	batter,
-	COUNT(innings_id) as times_bowled_to, -- each innings_id should represent a pitch/delivery
-	SUM(batter_runs) as runs_from_batting, -- extra runs are a separate column/FIELD
-	(SUM(batter_runs)*1.0/COUNT(innings_id)*1.0) as strike_rate,
-	ROW_NUMBER() OVER(ORDER BY SUM(batter_runs)*1.0/COUNT(innings_id)*1.0 DESC ) as ranking
-FROM innings_info 
-LEFT JOIN match_info ON innings_info.match_id = match_info.match_id 
-WHERE season = '2019'
-GROUP BY season, batter)
-
-SELECT 
-	batter
-FROM temp
-WHERE ranking = 1"""
-
-cursor.execute(query3)
-result3 = cursor.fetchall()
-
-
-logger.info("Answer to Q2c (as a pandas dataframe): ")
-df3 = pd.DataFrame(result3)
-columns = ['batter_with_highest_strikerate_2019']
-df3.columns = columns
-print(df3)
-
+#source settings: set ARCHIVE_PATH to a pre-fetched odis_json.zip to skip the download
+ARCHIVE_URL = "https://cricsheet.org/downloads/odis_json.zip"
+ARCHIVE_PATH = None
+
+#database settings: connection parameters come from the [client] section of DB_CONFIG_PATH (MySQL option file
+#format: user, password, host, port, database), each overridden by its DB_ENV_VARS environment variable when set
+DB_CONFIG_PATH = os.path.expanduser('~/.cricket_db.cnf')
+DB_ENV_VARS = {
+    'user': 'CRICKET_DB_USER',
+    'password': 'CRICKET_DB_PASSWORD',
+    'host': 'CRICKET_DB_HOST',
+    'port': 'CRICKET_DB_PORT',
+    'database': 'CRICKET_DB_NAME',
+}
+
+#write settings: set BATCH_SIZE to None to fall back to one INSERT/commit per row
+BATCH_SIZE = 1000 #rows per multi-row INSERT
+COMMIT_EVERY_N_MATCHES = 1 #commit once per N matches in batched mode
+#batched mode also commits as soon as the matches since the last commit reach this many rows (over every table) or
+#bytes of parsed frames, so transactions stay bounded when long-form matches are mixed in; None disables either
+COMMIT_EVERY_N_ROWS = None
+COMMIT_EVERY_N_BYTES = None
+
+#bulk mode for full historical loads: deliveries are staged to a file and loaded with LOAD DATA LOCAL INFILE
+#(needs local_infile=ON on the server); matches are then committed together with each bulk load
+BULK_LOAD = False
+BULK_LOAD_ROWS = 200000 #staged deliveries per LOAD DATA
+
+#writer pool: ingest(writer_pool_size=N > 1) writes matches over N connections, one transaction per match (the
+#COMMIT_EVERY_N_* settings do not apply); bulk mode always writes over the single connection. Pooled matches journal
+#their summary table changes, which the main connection folds in every WRITER_POOL_FOLD_EVERY_N_MATCHES matches and
+#at the end of the run; it also bumps the data version for each batch of pooled matches it finds committed. The pool is not a setting or a command line
+#option: no speedup over one connection has been measured against MySQL yet (see benchmark.py --pool-sizes)
+WRITER_POOL_FOLD_EVERY_N_MATCHES = 100
+
+#ingest mode: 'incremental' skips files whose content hash is already in load_manifest, reloads changed
+#files and appends new ones; 'full' truncates every table (manifest included) and reloads the whole archive.
+#An incremental run refuses a database loaded before the manifest existed; it needs one full reload (see README.md)
+INGEST_MODE = 'incremental'
+
+#report settings: the reports read the ingest-maintained summary tables unless USE_SUMMARY_TABLES is False;
+#REBUILD_SUMMARY_TABLES recomputes them from match_info/innings_info before reporting. Ingest and the reports also
+#rebuild them on their own when they are empty while match_info is not (see reports.ensure_summary_tables)
+USE_SUMMARY_TABLES = True
+REBUILD_SUMMARY_TABLES = False
+REPORT_SEASON = '2019'
+REPORTS = ['win_percentage', 'best_team', 'top_strike_rate']
+#report results are cached here (see report_cache.py) until the next ingest commits; None disables the cache
+REPORT_CACHE_DIR = os.path.expanduser('~/.cache/cricket_reports')
+
+#parse settings: JSON loading and DataFrame building run in worker processes, writes stay on this process
+PARSE_WORKERS = os.cpu_count() #set to 1 to parse in this process
+PARSE_CHUNK_SIZE = 16 #files handed to a worker at a time
+PARSE_DECODER = None #None picks orjson if installed, else json; 'ijson' streams the deliveries (see decoding.py)
+
+#pipeline settings: read the archive and feed the parse workers in background threads while this process writes,
+#with at most PIPELINE_READ_AHEAD raw files and PIPELINE_PARSE_AHEAD parsed matches queued between the stages,
+#and at most PIPELINE_READ_AHEAD_BYTES / PIPELINE_PARSE_AHEAD_BYTES of them (None bounds a queue by count only), so
+#peak memory stays flat on archives of large matches, e.g. the all-formats archive with its Test matches
+PIPELINE = True
+PIPELINE_READ_AHEAD = 64
+PIPELINE_PARSE_AHEAD = 32
+PIPELINE_READ_AHEAD_BYTES = 64 * 1024 ** 2
+PIPELINE_PARSE_AHEAD_BYTES = 128 * 1024 ** 2
+
+#metrics settings: per-stage timings and per-table row rates are written to METRICS_PATH at the end of the run
+COLLECT_METRICS = True
+METRICS_PATH = 'ingest_metrics.json'
+
+
+###############################################
+def db_config(config_path: str = None):
+    """
+    Returns the MySQL connection parameters: the [client] section of the option file at config_path (default
+    DB_CONFIG_PATH, skipped if it does not exist), overridden by the DB_ENV_VARS environment variables.
+
+    Returns:
+    -----------
+        - dict of mysql.connector.connect keyword arguments (user, password, host, port, database)
+    """
+    config = {}
+    parser = configparser.ConfigParser(interpolation=None)
+    if parser.read(os.path.expanduser(config_path or DB_CONFIG_PATH)) and parser.has_section('client'):
+        config.update((key, value) for key, value in parser.items('client') if key in DB_ENV_VARS)
+    for key, env_var in DB_ENV_VARS.items():
+        if os.environ.get(env_var):
+            config[key] = os.environ[env_var]
+    if 'port' in config:
+        config['port'] = int(config['port'])
+    return config
+
+
+def connect(config: dict = None, **options):
+    """
+    Opens a MySQL connection with db_config() (or config) plus any extra mysql.connector.connect options.
+    """
+    import mysql.connector
+
+    return mysql.connector.connect(**(db_config() if config is None else config), **options)
+
+
+def fetch(url: str = ARCHIVE_URL, archive_path: str = None, output_path: str = None):
+    """
+    Returns the archive to ingest (see sources.fetch_archive). With output_path the download is saved there and the
+    path is returned, so later ingest runs can reuse it.
+    """
+    from sources import fetch_archive
+
+    archive = fetch_archive(url=url, archive_path=archive_path)
+    if output_path is None or isinstance(archive, str):
+        return archive
+    with open(output_path, 'wb') as file:
+        file.write(archive)
+    logger.info("Archive saved to {}".format(output_path))
+    return output_path
+
+
+def ingest(archive, config: dict = None, mode: str = None, bulk_load: bool = None, parse_workers: int = None,
+           writer_pool_size: int = None, pipeline: bool = None, metrics_path: str = None):
+    """
+    Loads the matches of a Cricsheet archive into MySQL. Arguments left as None take the module settings of the same
+    name (INGEST_MODE, BULK_LOAD, PARSE_WORKERS, PIPELINE, METRICS_PATH); the other settings are read from the module.
+
+    Parameters:
+    ------------
+        - archive (str | bytes): Path to the zip archive or its contents (see fetch).
+        - config (dict, optional): Connection parameters; defaults to db_config().
+        - mode (str): 'incremental' or 'full' (see INGEST_MODE). An incremental ingest raises
+          functions.ManifestMissingError on a database whose matches are not in load_manifest.
+        - writer_pool_size (int): Connections writing matches (see writer_pool.WriterPool); 1 writes over the main
+          connection. Unmeasured against MySQL, so off by default.
+        - metrics_path (str, optional): Where the metrics summary is written when COLLECT_METRICS is True.
+
+    Returns:
+    -----------
+        - dict mapping table name to [rows_written, rows_skipped]
+    """
+    from collections import deque
+    from functools import partial
+
+    from functions import (DELIVERY_DETAIL_TABLES, ROLLUP_TABLES, DimensionCache, InningsBulkLoader, ManifestFilter,
+                           ManifestMissingError, check_load_manifest, clear_contents, create_load_manifest, delete_match,
+                           parse_match_members, read_load_manifest, record_load_manifest, write_parsed_match)
+    from metrics import IngestMetrics
+    from pipeline import FlushBudget, pipelined_parse
+    from reports import (SUMMARY_DELTA_TABLES, SUMMARY_TABLES, add_match_to_summaries, create_summary_tables,
+                         ensure_summary_tables, fold_summary_deltas, remove_match_from_summaries)
+    from report_cache import bump_data_version, create_data_version_table
+    from schema import create_tables, create_secondary_indexes, drop_secondary_indexes
+    from sources import iter_archive_members
+    from writer_pool import WriterPool, ingest_match_unit
+
+    config = db_config() if config is None else config
+    mode = INGEST_MODE if mode is None else mode
+    bulk_load = BULK_LOAD if bulk_load is None else bulk_load
+    parse_workers = PARSE_WORKERS if parse_workers is None else parse_workers
+    writer_pool_size = 1 if writer_pool_size is None else writer_pool_size
+    pipeline = PIPELINE if pipeline is None else pipeline
+    metrics_path = METRICS_PATH if metrics_path is None else metrics_path
+
+    cnx = connect(config, allow_local_infile=bulk_load)
+
+    #create any missing tables and indexes, and clear contents on a full rebuild
+    create_tables(cnx)
+    create_load_manifest(cnx = cnx)
+    if mode != 'full':
+        #a database loaded before the manifest existed needs one full reload (see README.md)
+        try:
+            check_load_manifest(cnx)
+        except ManifestMissingError:
+            cnx.close()
+            raise
+    create_data_version_table(cnx)
+    if mode == 'full':
+        create_summary_tables(cnx)
+        clear_contents(cnx = cnx, tables = ['players','teams','match_info','innings_info'] + DELIVERY_DETAIL_TABLES + ROLLUP_TABLES
+                                           + ['load_manifest'] + SUMMARY_TABLES + SUMMARY_DELTA_TABLES)
+        bump_data_version(cnx)
+    elif ensure_summary_tables(cnx):
+        #summary tables added to (or emptied on) a loaded database are rebuilt from it before any match is added
+        logger.info("Summary tables rebuilt from the stored matches")
+    elif fold_summary_deltas(cnx):
+        #summary changes journaled by a pooled run that stopped before folding them
+        bump_data_version(cnx)
+    cnx.commit()
+
+    #load the team/player ids once; unseen teams and players are inserted as they appear
+    dimension_cache = DimensionCache()
+    dimension_cache.load(cnx)
+
+    #only parse files that are new or changed since the last load; they are hashed as the archive is read
+    manifest_filter = ManifestFilter(read_load_manifest(cnx))
+
+    metrics = IngestMetrics(enabled=COLLECT_METRICS)
+    writer_pool = None
+    if writer_pool_size > 1 and not bulk_load:
+        writer_pool = WriterPool(partial(connect, config), pool_size=writer_pool_size, dimension_cnx=cnx,
+                                 dimension_cache=dimension_cache, batch_size=BATCH_SIZE or 1000)
+    pending_writes = deque() #(timings, future, replace) of matches handed to the writer pool, in submission order
+    unfolded_matches = 0 #pooled matches written since their summary deltas were last folded
+    unannounced_changes = False #matches written, replaced or deleted since the data version was last bumped
+    batched = BATCH_SIZE is not None
+    commit_budget = FlushBudget(max_matches=COMMIT_EVERY_N_MATCHES, max_rows=COMMIT_EVERY_N_ROWS, max_bytes=COMMIT_EVERY_N_BYTES)
+    innings_loader = InningsBulkLoader(cnx, rows_per_load=BULK_LOAD_ROWS) if bulk_load else None
+    #a full bulk load fills innings_info from empty, so its secondary indexes are built once afterwards
+    #(an interrupted load gets them back from create_tables on the next run)
+    rebuild_indexes = bulk_load and mode == 'full'
+    if rebuild_indexes:
+        drop_secondary_indexes(cnx, tables=['innings_info'])
+    members = manifest_filter.filter(metrics.timed_iter('read', iter_archive_members(archive)))
+    if pipeline:
+        parse_stage = pipelined_parse(members, max_workers=parse_workers, chunk_size=PARSE_CHUNK_SIZE, decoder=PARSE_DECODER,
+                                      timed=COLLECT_METRICS, read_ahead=PIPELINE_READ_AHEAD, parse_ahead=PIPELINE_PARSE_AHEAD,
+                                      read_ahead_bytes=PIPELINE_READ_AHEAD_BYTES, parse_ahead_bytes=PIPELINE_PARSE_AHEAD_BYTES)
+        #time the writer spends waiting on the parse stage; near zero when the database is the bottleneck
+        parsed_matches = metrics.timed_iter('wait_parse', parse_stage)
+    else:
+        parse_stage = parse_match_members(members, max_workers=parse_workers, chunk_size=PARSE_CHUNK_SIZE, decoder=PARSE_DECODER,
+                                          timed=COLLECT_METRICS)
+        parsed_matches = parse_stage
+    if not COLLECT_METRICS:
+        parsed_matches = ((parsed, None) for parsed in parsed_matches)
+    #an error anywhere below, in the parse stage included, rolls back the open transaction, cancels the matches queued
+    #for the writer pool and removes the bulk load staging file
+    try:
+        for idx, (parsed, timings) in enumerate(parsed_matches):
+
+            file, file_hash, changed = manifest_filter.selected.popleft()
+            logger.debug("file no. {},  writing file {}...".format(idx, file))
+            team_df, player_df, match_info_df, innings_df, delivery_details, rollups = parsed
+
+            if writer_pool is not None:
+                future = writer_pool.submit(parsed, unit=ingest_match_unit, timings=timings, file_name=file,
+                                            content_hash=file_hash, replace=changed)
+                pending_writes.append((timings, future, changed))
+                while pending_writes and pending_writes[0][1].done():
+                    written_timings, written, replaced = pending_writes.popleft()
+                    written_counts = written.result()
+                    unannounced_changes |= replaced or written_counts['match_info'][0] > 0
+                    unfolded_matches += 1
+                    if unfolded_matches >= WRITER_POOL_FOLD_EVERY_N_MATCHES:
+                        #the fold changes the summary tables, which the matches' own bump did not cover
+                        if metrics.time(written_timings, 'summaries', fold_summary_deltas, cnx):
+                            unannounced_changes = True
+                        unfolded_matches = 0
+                    metrics.add_file(written_timings, written_counts)
+                #the workers leave the data version alone; it moves here, on this connection, once per batch of matches
+                #found committed, so results cached from the raw tables go stale by one submission at most
+                if unannounced_changes:
+                    bump_data_version(cnx)
+                    metrics.time(timings, 'commit', cnx.commit)
+                    unannounced_changes = False
+                if (idx + 1) % 100 == 0:
+                    logger.info("{} files submitted".format(idx + 1))
+                continue
+
+            #write team, player, match and innings info to cricket_db; a changed file replaces its match in the same transaction
+            if changed:
+                match_id = match_info_df['match_id'].iloc[0]
+                metrics.time(timings, 'summaries', remove_match_from_summaries, match_id = match_id, cnx = cnx)
+                metrics.time(timings, 'delete_match', delete_match, match_id = match_id, cnx = cnx)
+            counts = write_parsed_match(team_df, player_df, match_info_df, innings_df, delivery_details, rollups, cnx=cnx, batch_size=BATCH_SIZE, commit=not batched,
+                                        dimension_cache=dimension_cache, innings_loader=innings_loader, timings=timings)
+            if counts['match_info'][0]:
+                metrics.time(timings, 'summaries', add_match_to_summaries, match_info_df, innings_df, cnx)
+            metrics.time(timings, 'manifest', record_load_manifest, file, file_hash, match_info_df, cnx = cnx)
+            unannounced_changes |= changed or counts['match_info'][0] > 0
+
+            #one transaction per match (or per COMMIT_EVERY_N_* budget) in batched mode, per bulk load in bulk mode; each
+            #one that writes, replaces or deletes a match bumps the data version, which invalidates cached report results
+            #(see report_cache.py)
+            if innings_loader is not None:
+                if innings_loader.staged_rows == 0:
+                    if unannounced_changes:
+                        bump_data_version(cnx)
+                        unannounced_changes = False
+                    metrics.time(timings, 'commit', cnx.commit)
+            elif not batched or commit_budget.add(parsed):
+                if unannounced_changes:
+                    bump_data_version(cnx)
+                    unannounced_changes = False
+                metrics.time(timings, 'commit', cnx.commit)
+                commit_budget.reset()
+            metrics.add_file(timings, counts)
+
+            if (idx + 1) % 100 == 0:
+                logger.info("{} files written".format(idx + 1))
+
+        if writer_pool is not None:
+            writer_pool.close()
+            for timings, future, replaced in pending_writes:
+                written_counts = future.result()
+                unannounced_changes |= replaced or written_counts['match_info'][0] > 0
+                metrics.add_file(timings, written_counts)
+            if fold_summary_deltas(cnx):
+                unannounced_changes = True
+        if innings_loader is not None:
+            metrics.add_rows({'innings_info': (innings_loader.flush(), 0)})
+        if unannounced_changes:
+            bump_data_version(cnx)
+        cnx.commit()
+        if rebuild_indexes:
+            create_secondary_indexes(cnx, tables=['innings_info'])
+    except BaseException:
+        cnx.rollback()
+        if writer_pool is not None:
+            writer_pool.close(cancel=True)
+        raise
+    finally:
+        parse_stage.close()
+        if innings_loader is not None:
+            innings_loader.close()
+        metrics.stop()
+        cnx.close()
+
+    logger.info("{} new, {} changed, {} unchanged files".format(manifest_filter.new_files, manifest_filter.changed_files,
+                                                                 manifest_filter.unchanged_files))
+    for table, (rows_written, rows_skipped) in metrics.rows.items():
+        logger.info("{}: {} rows written, {} rows skipped".format(table, rows_written, rows_skipped))
+    if COLLECT_METRICS:
+        summary = metrics.write_summary(metrics_path)
+        logger.info("{} files in {:.1f}s, {:.0%} of it in the database; metrics written to {}".format(
+            summary['files'], summary['total_seconds'], summary['db_share'] or 0, metrics_path))
+    logger.info("Successfully Completed Task")
+    return {table: list(counts) for table, counts in metrics.rows.items()}
+
+
+def report(config: dict = None, season: str = None, use_summary_tables: bool = None, rebuild_summary_tables: bool = None,
+           reports: list = None, cache_dir: str = None, use_cache: bool = True):
+    """
+    Runs the season reports against the database. Only reports.py (and pandas, for the results) is imported.
+    Arguments left as None take the REPORT_SEASON, USE_SUMMARY_TABLES, REBUILD_SUMMARY_TABLES, REPORTS and
+    REPORT_CACHE_DIR settings. Results are served from the report cache while the data version is unchanged,
+    unless use_cache is False.
+
+    Returns:
+    -----------
+        - dict mapping report name to its pd.DataFrame, in the order of reports
+    """
+    import reports as report_queries
+    from report_cache import ReportCache
+
+    season = REPORT_SEASON if season is None else season
+    cache_dir = REPORT_CACHE_DIR if cache_dir is None else cache_dir
+    cache = ReportCache(cache_dir) if use_cache and cache_dir is not None else None
+    use_summary_tables = USE_SUMMARY_TABLES if use_summary_tables is None else use_summary_tables
+    rebuild_summary_tables = REBUILD_SUMMARY_TABLES if rebuild_summary_tables is None else rebuild_summary_tables
+    cnx = connect(db_config() if config is None else config)
+    if rebuild_summary_tables:
+        logger.info("Rebuilding summary tables...")
+        report_queries.rebuild_summary_tables(cnx)
+    elif use_summary_tables and report_queries.ensure_summary_tables(cnx):
+        logger.info("Summary tables were empty; rebuilt them from the stored matches")
+
+    results = {}
+    for name in REPORTS if reports is None else reports:
+        logger.info("Running the {} report...".format(name))
+        if name == 'win_percentage':
+            results[name] = report_queries.win_percentage_report(cnx, use_summary_tables=use_summary_tables, cache=cache)
+        else:
+            results[name] = getattr(report_queries, name + '_report')(cnx, season=season, use_summary_tables=use_summary_tables,
+                                                                      cache=cache)
+    cnx.close()
+    if cache is not None:
+        logger.info("Report cache: {hits} hits, {misses} misses, {invalidations} invalidated".format(**cache.stats()))
+    return results
+
+
+def check_report_plans(config: dict = None, season: str = None):
+    """
+    Checks that the report queries are served by the indexes (see schema.check_report_query_plans), creating any
+    missing tables and indexes first. Raises schema.FullScanError naming the queries that read a table in full.
+
+    Returns:
+    -----------
+        - dict: query name -> EXPLAIN plan
+    """
+    from schema import check_report_query_plans, create_tables
+
+    cnx = connect(db_config() if config is None else config)
+    try:
+        create_tables(cnx)
+        return check_report_query_plans(cnx, season=REPORT_SEASON if season is None else season)
+    finally:
+        cnx.close()
+
+
+###############################################
+def main(argv: list = None):
+    """
+    Command line entry point; see python cricket_parser.py --help.
+    """
+    parser = argparse.ArgumentParser(description="Load Cricsheet ODI matches into MySQL and report on them.")
+    parser.add_argument('--config', help="MySQL option file with a [client] section (default {}); "
+                                         "the {} environment variables override it".format(DB_CONFIG_PATH, ', '.join(DB_ENV_VARS.values())))
+    parser.add_argument('-v', '--verbose', action='store_true', help="log every file written")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fetch_parser = commands.add_parser('fetch', help="download the Cricsheet archive")
+    fetch_parser.add_argument('--url', default=ARCHIVE_URL)
+    fetch_parser.add_argument('--output', default='odis_json.zip', help="where to save the archive")
+
+    ingest_parser = commands.add_parser('ingest', help="load the archive into the database")
+    ingest_parser.add_argument('--archive', default=ARCHIVE_PATH, help="pre-fetched archive (default: download ARCHIVE_URL)")
+    ingest_parser.add_argument('--mode', choices=['incremental', 'full'], default=INGEST_MODE)
+    ingest_parser.add_argument('--workers', type=int, default=PARSE_WORKERS, help="parse worker processes")
+    ingest_parser.add_argument('--bulk-load', action='store_true', default=BULK_LOAD, help="stage deliveries for LOAD DATA LOCAL INFILE")
+    ingest_parser.add_argument('--no-pipeline', dest='pipeline', action='store_false', default=PIPELINE,
+                               help="read and parse on the writing thread")
+    ingest_parser.add_argument('--metrics', default=METRICS_PATH, help="where to write the metrics summary")
+
+    report_parser = commands.add_parser('report', help="run the season reports")
+    report_parser.add_argument('--season', default=REPORT_SEASON)
+    report_parser.add_argument('--reports', nargs='+', choices=REPORTS, default=REPORTS)
+    report_parser.add_argument('--no-summary-tables', dest='use_summary_tables', action='store_false', default=USE_SUMMARY_TABLES,
+                               help="query match_info/innings_info instead of the summary tables")
+    report_parser.add_argument('--rebuild-summary-tables', action='store_true', default=REBUILD_SUMMARY_TABLES)
+    report_parser.add_argument('--cache-dir', default=REPORT_CACHE_DIR, help="report result cache directory")
+    report_parser.add_argument('--no-cache', dest='use_cache', action='store_false', help="always run the queries")
+    report_parser.add_argument('--check-plans', action='store_true',
+                               help="instead of running the reports, EXPLAIN their queries and exit with status 1 if "
+                                    "any reads a table in full")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(stream = sys.stderr, format = '%(levelname)s: %(name)s: %(message)s')
+    logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    if args.command == 'fetch':
+        fetch(url=args.url, output_path=args.output)
+    elif args.command == 'ingest':
+        from functions import ManifestMissingError
+
+        #match files are streamed straight out of the archive, nothing is extracted to disk
+        archive = fetch(url=ARCHIVE_URL, archive_path=args.archive)
+        try:
+            ingest(archive, config=db_config(args.config), mode=args.mode, bulk_load=args.bulk_load, parse_workers=args.workers,
+                   pipeline=args.pipeline, metrics_path=args.metrics)
+        except ManifestMissingError as error:
+            parser.exit(1, "{}\n".format(error))
+    elif args.check_plans:
+        from schema import FullScanError
+
+        try:
+            plans = check_report_plans(config=db_config(args.config), season=args.season)
+        except FullScanError as error:
+            parser.exit(1, "full scans in report query plans: {}\n".format(error))
+        for name, plan in plans.items():
+            print(name)
+            for row in plan:
+                print("    {table}: type={type}, key={key}, rows={rows}".format(**row))
+    else:
+        results = report(config=db_config(args.config), season=args.season, use_summary_tables=args.use_summary_tables,
+                         rebuild_summary_tables=args.rebuild_summary_tables, reports=args.reports, cache_dir=args.cache_dir,
+                         use_cache=args.use_cache)
+        for name, df in results.items():
+            print(name)
+            print(df)
+
+
+#only main() runs when executed as a script, so worker processes can import this module safely
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import io
+import json
+
+
+#fields of a Cricsheet match the parsers read (see functions.parse_match_data). A dict lists the keys to keep,
+#True keeps the whole value; for an array the spec applies to each item.
+INFO_SPEC = {key: True for key in [
+    'balls_per_over', 'city', 'dates', 'event', 'gender', 'match_type', 'match_type_number', 'officials', 'outcome',
+    'overs', 'player_of_match', 'players', 'registry', 'season', 'team_type', 'teams', 'toss', 'venue',
+]}
+
+DELIVERY_SPEC = {
+    'batter': True,
+    'bowler': True,
+    'non_striker': True,
+    'runs': {'batter': True, 'extras': True, 'non_boundary': True},
+    'extras': True,
+    'wickets': True,
+}
+
+OVER_SPEC = {'over': True, 'deliveries': DELIVERY_SPEC}
+
+INNINGS_SPEC = {'team': True, 'overs': OVER_SPEC, 'target': True, 'super_over': True}
+
+
+###############################################
+def decode_json(raw: bytes):
+    """
+    Decodes a whole match with the standard library.
+    """
+    return json.loads(raw)
+
+
+def decode_orjson(raw: bytes):
+    """
+    Decodes a whole match with orjson, a faster drop-in for json.loads.
+    """
+    import orjson
+
+    return orjson.loads(raw)
+
+
+def decode_streaming(raw: bytes):
+    """
+    Decodes a match incrementally with ijson, materializing only the fields in INFO_SPEC, INNINGS_SPEC, OVER_SPEC and
+    DELIVERY_SPEC.
+
+    'info' is built as a dict; info.registry.people is kept whole, since substitute fielders are only listed there.
+    'innings' is a generator: each innings is yielded as {'team': ..., 'overs': <generator of overs>}, each over as a
+    dict holding a list of pruned deliveries, so the full delivery tree is never held in memory.
+
+    Notes:
+    ------------
+        - The innings must be consumed once and in order, after 'info' is read (as parse_match_data does).
+        - Cricsheet files list 'info' before 'innings' and an innings' 'team' before its 'overs'. A file in another
+          order still decodes, with the affected parts materialized instead of streamed.
+        - The keys an innings lists after its 'overs' (e.g. 'target') are added to its dict once the overs are
+          consumed, so read them after the innings loop.
+        - An innings without 'overs' is passed through as it is, like the other decoders do.
+    """
+    import ijson
+
+    events = ijson.parse(io.BytesIO(raw), use_float=True)
+    match = {}
+    for _, event, key in events:
+        if event != 'map_key':
+            continue
+        _, event, value = next(events)
+        if key == 'info':
+            match['info'] = _build(events, event, value, INFO_SPEC)
+        elif key == 'innings' and 'info' in match:
+            match['innings'] = _iter_innings(events)
+            return match
+        elif key == 'innings':
+            match['innings'] = _build(events, event, value, INNINGS_SPEC)
+        else:
+            _skip(events, event)
+    match.setdefault('innings', [])
+    return match
+
+
+DECODERS = {
+    'json': decode_json,
+    'orjson': decode_orjson,
+    'ijson': decode_streaming,
+}
+
+
+def register_decoder(name: str, decoder):
+    """
+    Makes decoder (a function from the raw bytes of a match file to the decoded match) available as decode_match(raw, name).
+    """
+    DECODERS[name] = decoder
+
+
+def default_decoder():
+    """
+    orjson when it is installed, otherwise the standard library.
+    """
+    try:
+        import orjson
+    except ImportError:
+        return 'json'
+    return 'orjson'
+
+
+def decode_match(raw: bytes, decoder: str = None):
+    """
+    Decodes the raw bytes of a match file.
+
+    Parameters:
+    ------------
+        - raw (bytes): Contents of a Cricsheet match JSON file.
+        - decoder (str, optional): A name in DECODERS. Defaults to default_decoder().
+
+    Returns:
+    -----------
+        - dict with the 'info' and 'innings' layout the parsers read
+    """
+    return DECODERS[decoder or default_decoder()](raw)
+
+
+###############################################
+def _skip(events, event: str):
+    """
+    Consumes the rest of a value whose first event was event.
+    """
+    depth = 1 if event in ('start_map', 'start_array') else 0
+    while depth:
+        _, event, _ = next(events)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+
+
+def _build(events, event: str, value, spec=True):
+    """
+    Builds the value whose first event was (event, value), keeping only what spec selects.
+    """
+    if event == 'start_map':
+        obj = {}
+        for _, event, key in events:
+            if event == 'end_map':
+                return obj
+            _, event, value = next(events)
+            if spec is True:
+                obj[key] = _build(events, event, value)
+            elif key in spec:
+                obj[key] = _build(events, event, value, spec[key])
+            else:
+                _skip(events, event)
+    if event == 'start_array':
+        items = []
+        for _, event, value in events:
+            if event == 'end_array':
+                return items
+            items.append(_build(events, event, value, spec))
+    return value
+
+
+def _iter_innings(events):
+    for _, event, _ in events:
+        if event == 'end_array':
+            return
+        innings = {}
+        for _, event, key in events:
+            if event == 'end_map':
+                break
+            _, event, value = next(events)
+            if key == 'overs' and 'team' in innings:
+                overs = _iter_overs(events)
+                innings['overs'] = overs
+                yield innings
+                #drain whatever the consumer left, so the next innings starts in the right place
+                for _ in overs:
+                    pass
+            elif key in INNINGS_SPEC:
+                innings[key] = _build(events, event, value, INNINGS_SPEC[key])
+            else:
+                _skip(events, event)
+        if not hasattr(innings.get('overs'), '__next__'):
+            #not streamed: 'overs' came before 'team', or is missing (e.g. a forfeited innings)
+            yield innings
+
+
+def _iter_overs(events):
+    for _, event, value in events:
+        if event == 'end_array':
+            return
+        yield _build(events, event, value, OVER_SPEC)
@@ -0,0 +1,235 @@
+import json
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from functions import INNINGS_STATE_COLUMNS, delivery_state, innings_state_columns, run_rate
+
+
+INNINGS_COLUMNS = (['team', 'over_num', 'batter', 'bowler', 'non_striker', 'batter_runs', 'extra_runs', 'wickets', 'delivery_num']
+                   + INNINGS_STATE_COLUMNS + ['match_id'])
+
+#integer innings state columns, stored as is; run_rate is recomputed from team_score, legal_balls and balls_per_over
+_STATE_TYPECODES = {
+    'innings_num': 'b',
+    'ball_in_over': 'b',
+    'is_legal': 'b',
+    'legal_balls': 'h',
+    'team_score': 'h',
+    'team_wickets': 'b',
+    'is_dot': 'b',
+    'is_boundary': 'b',
+}
+
+
+###############################################
+def _extend(column: array, values):
+    column.frombytes(np.ascontiguousarray(values, dtype=column.typecode).tobytes())
+
+
+class DeliveryStore:
+    """
+    Compact in-memory store of deliveries for many matches: one typed array per column, with players interned to
+    int32 codes (keyed by their registry.people id and name), teams to int16 codes and the rare wickets kept as an
+    index into a list of JSON strings. A delivery costs 44 bytes (innings state columns included) instead of the
+    ~250 of an object-dtype row.
+
+    to_frame() rebuilds the frame parse_innings_info produces (concatenated over the stored matches), or a
+    categorical one that keeps the codes.
+
+    Example:
+    -----------
+        store = DeliveryStore()
+        for member_name, raw in iter_archive_members('odis_json.zip'):
+            store.add_match(json.loads(raw), match_id_from_file_name(member_name))
+        innings_df = store.to_frame()
+    """
+
+    def __init__(self):
+        self.player_codes = {} #(registryID, player name) -> code
+        self.player_names = []
+        self.player_registry_ids = []
+        self.team_codes = {}
+        self.team_names = []
+        self.wickets = [] #JSON strings; the wicket column indexes into this list, -1 for none
+        self._columns = {
+            'match_id': array('q'),
+            'team': array('h'),
+            'over_num': array('h'),
+            'batter': array('i'),
+            'bowler': array('i'),
+            'non_striker': array('i'),
+            'batter_runs': array('b'),
+            'extra_runs': array('b'),
+            'wicket': array('i'),
+            'delivery_num': array('h'),
+            'balls_per_over': array('b'),
+            **{name: array(typecode) for name, typecode in _STATE_TYPECODES.items()},
+        }
+
+    def __len__(self):
+        return len(self._columns['match_id'])
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by the column arrays (the interning tables are shared by every match and are not counted).
+        """
+        return sum(column.itemsize * len(column) for column in self._columns.values())
+
+    def clear(self):
+        """
+        Drops the stored deliveries, keeping the interning tables so codes stay stable across batches.
+        """
+        for name, column in self._columns.items():
+            self._columns[name] = array(column.typecode)
+        self.wickets = []
+
+    def player_code(self, player_name: str, registry_id: str = None):
+        key = (registry_id, player_name)
+        code = self.player_codes.get(key)
+        if code is None:
+            code = self.player_codes[key] = len(self.player_names)
+            self.player_names.append(player_name)
+            self.player_registry_ids.append(registry_id)
+        return code
+
+    def team_code(self, team: str):
+        code = self.team_codes.get(team)
+        if code is None:
+            code = self.team_codes[team] = len(self.team_names)
+            self.team_names.append(team)
+        return code
+
+    def add_match(self, json_data: dict, match_id: int):
+        """
+        Appends the deliveries of a decoded match, read straight from the JSON (see decoding.decode_match)
+        with the same fields as parse_innings_info.
+
+        Returns:
+        -----------
+            number of deliveries added
+        """
+        people = json_data['info']['registry']['people']
+        codes = {}
+
+        def code(player_name):
+            player = codes.get(player_name)
+            if player is None:
+                player = codes[player_name] = self.player_code(player_name, people.get(player_name))
+            return player
+
+        columns = self._columns
+        n_before = len(self)
+        innings_nums, is_legal, wickets_fallen, non_boundary = [], [], [], []
+        for innings_num, innings in enumerate(json_data['innings'], 1):
+            team = self.team_code(innings['team'])
+            for over in innings.get('overs', ()):
+                for delivery in over['deliveries']:
+                    legal, fallen, not_boundary = delivery_state(delivery)
+                    innings_nums.append(innings_num)
+                    is_legal.append(legal)
+                    wickets_fallen.append(fallen)
+                    non_boundary.append(not_boundary)
+                    columns['team'].append(team)
+                    columns['over_num'].append(over['over'])
+                    columns['batter'].append(code(delivery['batter']))
+                    columns['bowler'].append(code(delivery['bowler']))
+                    columns['non_striker'].append(code(delivery['non_striker']))
+                    columns['batter_runs'].append(delivery['runs']['batter'])
+                    columns['extra_runs'].append(delivery['runs']['extras'])
+                    if delivery.get('wickets'):
+                        columns['wicket'].append(len(self.wickets))
+                        self.wickets.append(json.dumps(delivery['wickets'][0]))
+                    else:
+                        columns['wicket'].append(-1)
+        n_added = len(columns['team']) - n_before
+        columns['match_id'].extend([match_id] * n_added)
+        columns['delivery_num'].extend(range(n_added))
+        balls_per_over = json_data['info'].get('balls_per_over', 6)
+        columns['balls_per_over'].extend([balls_per_over] * n_added)
+        if n_added:
+            state = innings_state_columns(np.array(innings_nums, dtype=np.int64), self.codes('over_num')[n_before:].astype(np.int64),
+                                          self.codes('batter_runs')[n_before:].astype(np.int64),
+                                          self.codes('extra_runs')[n_before:].astype(np.int64), np.array(is_legal, dtype=bool),
+                                          np.array(wickets_fallen, dtype=np.int64), np.array(non_boundary, dtype=bool), balls_per_over)
+            for name in _STATE_TYPECODES:
+                _extend(columns[name], state[name])
+        return n_added
+
+    def add_frame(self, innings_df: pd.DataFrame, player_df: pd.DataFrame = None, balls_per_over: int = 6):
+        """
+        Appends an innings_info frame (the output of parse_innings_info), interning its players against the
+        registry ids in player_df (the matching parse_team_player_info output) when it is given. balls_per_over
+        is the one the frame's run_rate was computed with.
+
+        Returns:
+        -----------
+            number of deliveries added
+        """
+        registry_ids = {} if player_df is None else dict(zip(player_df['player_name'], player_df['registryID']))
+        columns = self._columns
+        for name in ['batter', 'bowler', 'non_striker']:
+            values, uniques = pd.factorize(innings_df[name])
+            codes = np.array([self.player_code(player, registry_ids.get(player)) for player in uniques], dtype=np.int32)
+            _extend(columns[name], codes[values])
+        values, uniques = pd.factorize(innings_df['team'])
+        _extend(columns['team'], np.array([self.team_code(team) for team in uniques], dtype=np.int16)[values])
+
+        wicket = np.full(len(innings_df), -1, dtype=np.int32)
+        has_wicket = innings_df['wickets'].notna().to_numpy()
+        wicket[has_wicket] = np.arange(len(self.wickets), len(self.wickets) + has_wicket.sum())
+        self.wickets.extend(innings_df['wickets'][has_wicket])
+        _extend(columns['wicket'], wicket)
+
+        _extend(columns['over_num'], innings_df['over_num'].to_numpy())
+        _extend(columns['batter_runs'], innings_df['batter_runs'].to_numpy())
+        _extend(columns['extra_runs'], innings_df['extra_runs'].to_numpy())
+        _extend(columns['match_id'], innings_df['match_id'].to_numpy())
+        _extend(columns['delivery_num'], innings_df['delivery_num'].to_numpy())
+        _extend(columns['balls_per_over'], np.full(len(innings_df), balls_per_over))
+        for name in _STATE_TYPECODES:
+            _extend(columns[name], innings_df[name].to_numpy())
+        return len(innings_df)
+
+    def codes(self, name: str):
+        """
+        A column's values as a numpy array, without copying (batter/bowler/non_striker/team are codes).
+        """
+        column = self._columns[name]
+        return np.frombuffer(column, dtype=column.typecode) if len(column) else np.array([], dtype=column.typecode)
+
+    def to_frame(self, categorical: bool = False):
+        """
+        Builds an innings_info frame of the stored deliveries.
+
+        Parameters:
+        ------------
+            categorical (bool): False rebuilds the object/int64 columns of parse_innings_info exactly; True keeps the
+                                names as pandas categoricals and the integers in their compact dtypes.
+        """
+        wickets = np.array(self.wickets + [None], dtype=object)[self.codes('wicket')] #-1 picks the trailing None
+        frame = {}
+        for name in ['team', 'over_num', 'batter', 'bowler', 'non_striker', 'batter_runs', 'extra_runs']:
+            values = self.codes(name)
+            if name in ('team', 'batter', 'bowler', 'non_striker'):
+                frame[name] = self._names(name, values, categorical)
+            else:
+                frame[name] = values.copy() if categorical else values.astype(np.int64)
+        frame['wickets'] = wickets
+        for name in ['delivery_num'] + INNINGS_STATE_COLUMNS:
+            if name == 'run_rate':
+                frame[name] = run_rate(self.codes('team_score'), self.codes('legal_balls'), self.codes('balls_per_over').astype(np.int64))
+            else:
+                frame[name] = self.codes(name).copy() if categorical else self.codes(name).astype(np.int64)
+        frame['match_id'] = self.codes('match_id').astype(np.int64)
+        return pd.DataFrame(frame, columns=INNINGS_COLUMNS)
+
+    def _names(self, name: str, codes: np.ndarray, categorical: bool):
+        names = self.team_names if name == 'team' else self.player_names
+        if not categorical:
+            return np.array(names, dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+        #a name can have several codes (same name, different registry id), so categories are the distinct names
+        name_codes, categories = pd.factorize(np.array(names, dtype=object))
+        return pd.Categorical.from_codes(name_codes[codes] if len(codes) else codes, categories=categories)
@@ -1,9 +1,34 @@
+from __future__ import annotations
+
 import pandas as pd
 import numpy as np
 import json
-import sys
+import hashlib
 import os
-import mysql.connector
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from decoding import decode_match
+from metrics import time_stage
+from sources import match_id_from_file_name
+
+#mysql is only needed to talk to MySQL; the parsing functions and the other storage backends (see storage.py) work without it
+try:
+    import mysql.connector
+    from mysql.connector import IntegrityError
+except ImportError:
+    mysql = None
+
+    class IntegrityError(Exception):
+        """
+        Raised by non-MySQL connections (see storage.LocalDatabase) for duplicate keys, so the per-row write paths
+        can skip duplicates the same way.
+        """
 
 
 ###############################################
@@ -41,6 +66,70 @@ import mysql.connector
 #     return row_exists
 
 
+###############################################
+def _df_to_rows(df: pd.DataFrame) -> list:
+    """
+    Converts a DataFrame to a list of row lists with native Python values, turning NaN into None
+    so the rows can be passed straight to the MySQL driver.
+    """
+    values = df.to_numpy(dtype=object, copy=True)
+    missing = pd.isna(values)
+    if missing.any():
+        values[missing] = None
+    return values.tolist()
+
+
+def insert_rows_batched(table_name: str, df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                        batch_size: int = 1000, commit: bool = True):
+    """
+    Inserts the rows of a DataFrame into a table with multi-row INSERT statements, skipping rows whose key is already stored.
+
+    Parameters:
+    ------------
+        table_name (str): The name of the database table.
+        df (pd.DataFrame): DataFrame whose columns match the table columns (excluding any auto-incremented key).
+        cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        batch_size (int): Number of rows sent to the server per statement.
+        commit (bool): Commit once after all batches are sent. Pass False to let the caller
+                       commit once per match (or once per N matches).
+
+    Returns:
+    -----------
+        rows_written (int): Number of rows inserted.
+        rows_skipped (int): Number of rows ignored because they duplicate an existing key.
+
+    Notes:
+    ------------
+        - executemany rewrites the INSERT into a single multi-row statement per batch, so each batch
+          is one round trip instead of one per row.
+        - ON DUPLICATE KEY UPDATE with a no-op assignment lets the server drop duplicate keys, so no IntegrityError
+          is raised and caught per row. Unlike INSERT IGNORE it does not turn other errors (truncation, NULL in a NOT
+          NULL column, a missing foreign key) into warnings, so those still raise instead of counting as skipped.
+        - A duplicate counts as 0 affected rows, which rows_skipped relies on; a connection opened with the
+          FOUND_ROWS client flag would count it as 1.
+    """
+
+    if len(df) == 0:
+        return 0, 0
+
+    columns = ', '.join(df.columns)
+    sql = (f"INSERT INTO {table_name} ({columns}) VALUES ({', '.join(['%s'] * len(df.columns))}) "
+           f"ON DUPLICATE KEY UPDATE {df.columns[0]} = {df.columns[0]}")
+    rows = _df_to_rows(df)
+
+    rows_written = 0
+    cursor = cnx.cursor()
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(sql, rows[start:start + batch_size])
+        rows_written += cursor.rowcount
+    cursor.close()
+
+    if commit:
+        cnx.commit()
+
+    return rows_written, len(rows) - rows_written
+
+
 ###############################################
 def parse_team_player_info(json_data: dict):
     """
@@ -56,29 +145,24 @@ def parse_team_player_info(json_data: dict):
         player_df (pandas DataFrame): DataFrame containing player information with columns 'player_name' and 'registryID'.
     """
 
-    player_columns = [
-        "team",
-        "player_name",
-        "registryID"
-    ]
-
     temp_people = json_data['info']['registry']['people']
     temp_teams = json_data['info']['teams']
-    
-    player_df = pd.DataFrame(columns = player_columns)
-    for team in temp_teams:
-        #for each team, get the players on that team, for each player, get their registry id as well
-
-        for player in json_data['info']['players'][team]: 
 
-            registryId = temp_people[player]
+    #for each team, get the players on that team, for each player, get their registry id as well
+    team_lst = []
+    player_lst = []
+    for team in temp_teams:
+        team_players = json_data['info']['players'][team]
+        team_lst.extend([team] * len(team_players))
+        player_lst.extend(team_players)
 
-            # print("team: {}, player: {}, registryId: {} ".format(team,player, registryId))
-            
-            temp_df = pd.DataFrame({"team": [team], "player_name": [player], "registryID": [registryId]})
+    #built in one go; the all-zero index matches the frame the old row-by-row concat produced
+    player_df = pd.DataFrame({
+        "team": team_lst,
+        "player_name": player_lst,
+        "registryID": [temp_people[player] for player in player_lst]
+    }, index = np.zeros(len(player_lst), dtype = np.int64), dtype = object)
 
-            player_df = pd.concat([player_df,temp_df], axis = 0)
-        
     team_df = player_df[['team']].drop_duplicates() #drop duplicates
     player_df = player_df[['player_name','registryID']]
     return team_df, player_df
@@ -88,7 +172,8 @@ def parse_team_player_info(json_data: dict):
 
 
 
-def write_players_to_cricket_db(player_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection):
+def write_players_to_cricket_db(player_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                                batch_size: int = None, commit: bool = True):
     """
     Writes player data to the 'players' table in the cricket_db database.
 
@@ -96,10 +181,13 @@ def write_players_to_cricket_db(player_df: pd.DataFrame, cnx: mysql.connector.co
     ------------
         player_df (pd.DataFrame): Pandas DataFrame containing the player data.
         cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        batch_size (int, optional): When set, rows are written with batched multi-row inserts
+                                    (see insert_rows_batched) instead of one INSERT and commit per row.
+        commit (bool): Only used in batched mode; pass False to defer the commit to the caller.
 
     Returns:
     -----------
-        None
+        rows_written (int), rows_skipped (int)
 
     Raises:
     ------------
@@ -124,33 +212,43 @@ def write_players_to_cricket_db(player_df: pd.DataFrame, cnx: mysql.connector.co
     """
 
     table_name = 'players'
+    if batch_size is not None:
+        return insert_rows_batched(table_name, player_df, cnx, batch_size=batch_size, commit=commit)
+
     columns = ', '.join(player_df.columns)
     sql = f"INSERT INTO {table_name} ({columns}) VALUES ({', '.join(['%s'] * len(player_df.columns))})"
 
     # Execute the INSERT statement for each row
+    rows_written, rows_skipped = 0, 0
     cursor = cnx.cursor()
     for row in player_df.itertuples(index=False):
         try:
             cursor.execute(sql, row)
             cnx.commit()
+            rows_written += 1
             # print(f"1 row inserted successfully into {table_name} table!")
-        except mysql.connector.IntegrityError:
+        except IntegrityError:
             # print("Duplicate! Skipping...")
-            pass
+            rows_skipped += 1
 
     cursor.close()
+    return rows_written, rows_skipped
 
 ########################################################
-def write_teams_to_cricket_db(team_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection):
+def write_teams_to_cricket_db(team_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                              batch_size: int = None, commit: bool = True):
     """
     Writes unique team data to the 'teams' table in the cricket_db database.
 
     Parameters:
         team_df (pd.DataFrame): Pandas DataFrame containing the team data.
         cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        batch_size (int, optional): When set, rows are written with batched multi-row inserts
+                                    (see insert_rows_batched) instead of one INSERT and commit per row.
+        commit (bool): Only used in batched mode; pass False to defer the commit to the caller.
 
     Returns:
-        None
+        rows_written (int), rows_skipped (int)
 
     Raises:
         mysql.connector.IntegrityError: If a duplicate entry is encountered and insertion is attempted.
@@ -172,33 +270,173 @@ def write_teams_to_cricket_db(team_df: pd.DataFrame, cnx: mysql.connector.connec
     """
 
     table_name = 'teams'
+    if batch_size is not None:
+        return insert_rows_batched(table_name, team_df, cnx, batch_size=batch_size, commit=commit)
+
     columns = ', '.join(team_df.columns)
     sql = f"INSERT INTO {table_name} ({columns}) VALUES ({', '.join(['%s'] * len(team_df.columns))})"
 
     # Execute the INSERT statement for each row
+    rows_written, rows_skipped = 0, 0
     cursor = cnx.cursor()
     for row in team_df.itertuples(index=False):
         try:
             cursor.execute(sql, row)
             cnx.commit()
+            rows_written += 1
             # print(f"1 row inserted successfully into {table_name} table!")
-        except mysql.connector.IntegrityError:
+        except IntegrityError:
             # print("Duplicate! Skipping...")
-            pass
+            rows_skipped += 1
 
     cursor.close()
+    return rows_written, rows_skipped
 
 
 
 ################################################
-def parse_match_info(json_data: dict, cnx: mysql.connector.connection_cext.CMySQLConnection):
+def lookup_team_id(team: str, cnx: mysql.connector.connection_cext.CMySQLConnection):
+    """
+    Returns the team_id of a team already written to the 'teams' table.
+
+    Parameters:
+        team (str): The team name.
+        cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+        team_id (int)
+    """
+    cursor = cnx.cursor()
+    cursor.execute("SELECT team_id FROM teams WHERE team = %s", (team,))
+    result = cursor.fetchall()  # Fetch any remaining results
+    cursor.close()
+    return result[0][0]
+
+
+def lookup_latest_match_id(cnx: mysql.connector.connection_cext.CMySQLConnection):
+    """
+    Returns the most recently written match_id from the 'match_info' table.
+
+    Parameters:
+        cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+        match_id (int)
+    """
+    cursor = cnx.cursor()
+    query = """
+    SELECT MAX(match_id) -- this will be the most recent match_id
+    FROM match_info 
+    """
+
+    cursor.execute(query)
+    match_id = cursor.fetchall()[0][0]
+    cursor.close()
+    return match_id
+
+
+################################################
+class DimensionCache:
+    """
+    In-memory copy of the 'teams' and 'players' dimension tables that resolves names to surrogate ids
+    and only inserts members it has not seen before.
+
+    Attributes:
+    ------------
+        team_ids (dict): team -> team_id
+        player_ids (dict): registryID -> player_id
+
+    Notes:
+    ------------
+        - Call load() once per run (after clear_contents, if the tables were truncated).
+        - Ids of newly inserted members are cached before the caller commits; if that transaction is
+          rolled back, call load() again to drop them.
+
+    Example:
+    -----------
+        dimension_cache = DimensionCache()
+        dimension_cache.load(cnx)
+        dimension_cache.add_teams(team_df, cnx)
+        team1_id = dimension_cache.team_id('India')
+    """
+
+    def __init__(self):
+        self.team_ids = {}
+        self.player_ids = {}
+
+    def load(self, cnx: mysql.connector.connection_cext.CMySQLConnection):
+        """
+        Reads every team and player id from the database, replacing the cached contents.
+        """
+        cursor = cnx.cursor()
+        cursor.execute("SELECT team, team_id FROM teams")
+        self.team_ids = dict(cursor.fetchall())
+        cursor.execute("SELECT registryID, player_id FROM players")
+        self.player_ids = dict(cursor.fetchall())
+        cursor.close()
+
+    def team_id(self, team: str):
+        """
+        Returns the cached team_id of a team. Raises KeyError if the team has not been added.
+        """
+        return self.team_ids[team]
+
+    def add_teams(self, team_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                  batch_size: int = 1000, commit: bool = True):
+        """
+        Inserts the teams in team_df that are not cached yet and caches their ids.
+
+        Returns:
+        -----------
+            rows_written (int), rows_skipped (int)
+        """
+        return self._add_members('teams', 'team_id', 'team', team_df, self.team_ids, cnx, batch_size, commit)
+
+    def add_players(self, player_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                    batch_size: int = 1000, commit: bool = True):
+        """
+        Inserts the players in player_df whose registryID is not cached yet and caches their ids.
+
+        Returns:
+        -----------
+            rows_written (int), rows_skipped (int)
+        """
+        return self._add_members('players', 'player_id', 'registryID', player_df, self.player_ids, cnx, batch_size, commit)
+
+    @staticmethod
+    def _add_members(table_name: str, id_column: str, key_column: str, df: pd.DataFrame, ids: dict,
+                     cnx: mysql.connector.connection_cext.CMySQLConnection, batch_size: int, commit: bool):
+        new_df = df[~df[key_column].isin(ids.keys())].drop_duplicates(key_column)
+        if len(new_df) == 0:
+            return 0, len(df)
+
+        rows_written, _ = insert_rows_batched(table_name, new_df, cnx, batch_size=batch_size, commit=commit)
+
+        #read the ids back rather than trusting lastrowid, which is not guaranteed to be consecutive for multi-row inserts
+        keys = new_df[key_column].tolist()
+        cursor = cnx.cursor()
+        cursor.execute(f"SELECT {key_column}, {id_column} FROM {table_name} WHERE {key_column} IN ({', '.join(['%s'] * len(keys))})", keys)
+        ids.update(cursor.fetchall())
+        cursor.close()
+        return rows_written, len(df) - rows_written
+
+
+################################################
+def parse_match_info(json_data: dict, cnx: mysql.connector.connection_cext.CMySQLConnection = None,
+                     dimension_cache: DimensionCache = None, match_id: int = None):
 
     """
     Parses match information from the provided JSON data and returns a DataFrame.
 
     Parameters:
         json_data (dict): JSON data as a dictionary.
-        cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        cnx (mysql.connector.connection_cext.CMySQLConnection, optional): MySQL database connection object.
+            When omitted no database access is made and team1_id/team2_id are left as None,
+            to be filled in by the writer (see write_parsed_match).
+        dimension_cache (DimensionCache, optional): When given, team ids are resolved from the cache
+            instead of querying the 'teams' table.
+        match_id (int, optional): Explicit match id (see match_id_from_file_name). When given it is stored
+            in a leading 'match_id' column so the row is written with that id instead of an auto-increment one.
 
     Returns:
         match_info_df (pd.DataFrame): DataFrame containing the parsed match information.
@@ -278,14 +516,11 @@ def parse_match_info(json_data: dict, cnx: mysql.connector.connection_cext.CMySQ
     #team1
     team1 = list(json_data['info']['players'].keys())[0]
 
-    print("team1", team1)
-
     #team1_players
     team1_players = json_data['info']['players'][team1]
 
     #team2
     team2 = list(json_data['info']['players'].keys())[1]
-    print("team2: ", team2)
 
 
     #team2_players
@@ -309,18 +544,14 @@ def parse_match_info(json_data: dict, cnx: mysql.connector.connection_cext.CMySQ
     
 
     #get the team1 and team2 id— team data is always written first so this should always exist before writing the match info data
-    cursor = cnx.cursor()
-    cursor.execute("SELECT team_id FROM cricket_db.teams WHERE team = '{}'".format(team1))
-    result = cursor.fetchall()  # Fetch any remaining results
-    cursor.close()
-    print(result)
-    team1_id = result[0][0]
-
-    cursor = cnx.cursor()
-    cursor.execute("SELECT team_id FROM cricket_db.teams WHERE team = '{}'".format(team2))
-    result = cursor.fetchall()  # Fetch any remaining results
-    cursor.close()
-    team2_id = result[0][0]
+    if dimension_cache is not None:
+        team1_id = dimension_cache.team_id(team1)
+        team2_id = dimension_cache.team_id(team2)
+    elif cnx is not None:
+        team1_id = lookup_team_id(team1, cnx)
+        team2_id = lookup_team_id(team2, cnx)
+    else:
+        team1_id, team2_id = None, None
 
 
     # match_info_df = pd.DataFrame(columns = match_info_columns)
@@ -353,12 +584,15 @@ def parse_match_info(json_data: dict, cnx: mysql.connector.connection_cext.CMySQ
         "venue": [venue]
 
     })
+    if match_id is not None:
+        match_info_df.insert(0, 'match_id', match_id)
     return match_info_df
 
 
 
 ######################################################
-def write_match_info(match_info_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection):
+def write_match_info(match_info_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                     batch_size: int = None, commit: bool = True):
 
     """
     Writes match information DataFrame to the 'match_info' table in the cricket_db database.
@@ -367,11 +601,17 @@ def write_match_info(match_info_df: pd.DataFrame, cnx: mysql.connector.connectio
     ------------
         - match_info_df (pd.DataFrame): DataFrame containing match information.
         - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - batch_size (int, optional): When set, rows are written with batched multi-row inserts
+                                      (see insert_rows_batched) instead of one INSERT and commit per row.
+        - commit (bool): Only used in batched mode; pass False to defer the commit to the caller.
 
     Returns:
     ------------
-        - None
+        - rows_written (int), rows_skipped (int)
     """
+    if batch_size is not None:
+        return insert_rows_batched('match_info', match_info_df, cnx, batch_size=batch_size, commit=commit)
+
     match_info_tuples = match_info_df.values.tolist()
 
     #write to database
@@ -380,6 +620,7 @@ def write_match_info(match_info_df: pd.DataFrame, cnx: mysql.connector.connectio
     sql = f"INSERT INTO {table_name} ({columns}) VALUES ({', '.join(['%s'] * len(match_info_df.columns))})"
 
     # Execute the INSERT statement for each row
+    rows_written, rows_skipped = 0, 0
     cursor = cnx.cursor()
     for row in match_info_tuples:
         #check if the row exists:
@@ -387,19 +628,44 @@ def write_match_info(match_info_df: pd.DataFrame, cnx: mysql.connector.connectio
         try:
             cursor.execute(sql, row)
             cnx.commit()
+            rows_written += 1
             # print(f"1 row inserted successfully into {table_name} table!")
-        except mysql.connector.IntegrityError:
+        except IntegrityError:
             # print("Duplicate! Skipping...")
-            pass
+            rows_skipped += 1
 
     cursor.close()
+    return rows_written, rows_skipped
+
+
+
+
+
 
+#per-delivery detail tables filled by parse_innings_info(delivery_details=...) and written by write_delivery_details
+DELIVERY_DETAIL_TABLES = ['wickets', 'wicket_fielders', 'extras']
 
+EXTRAS_KINDS = ['wides', 'noballs', 'byes', 'legbyes', 'penalty']
 
+#wicket kinds Cricsheet records that are not dismissals, so they do not count towards team_wickets
+NON_DISMISSAL_KINDS = {'retired hurt', 'retired not out'}
 
+#ball-by-ball columns parse_innings_info derives for every delivery (see innings_state_columns)
+INNINGS_STATE_COLUMNS = ['innings_num', 'ball_in_over', 'is_legal', 'legal_balls', 'team_score', 'team_wickets', 'run_rate',
+                         'is_dot', 'is_boundary']
 
+#per-over and per-innings rollup tables filled by parse_innings_info(rollups=...) and written by write_rollups
+ROLLUP_TABLES = ['over_summary', 'innings_summary']
 
-def parse_innings_info(json_data: dict, match_info_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection):
+OVER_SUMMARY_COLUMNS = ['match_id', 'innings_num', 'over_num', 'team', 'bowler', 'runs', 'extra_runs', 'wickets', 'legal_balls',
+                        'dot_balls', 'boundaries', 'team_score', 'team_wickets']
+
+INNINGS_SUMMARY_COLUMNS = ['match_id', 'innings_num', 'team', 'runs', 'wickets', 'legal_balls', 'overs', 'extra_runs', 'dot_balls',
+                           'boundaries', 'run_rate', 'target_runs', 'target_overs', 'super_over', 'won']
+
+
+def parse_innings_info(json_data: dict, match_info_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection = None,
+                       match_id: int = None, delivery_details: dict = None, rollups: dict = None):
 
     """
     Parse innings information from the JSON data and return a DataFrame.
@@ -408,90 +674,366 @@ def parse_innings_info(json_data: dict, match_info_df: pd.DataFrame, cnx: mysql.
     -----------
         - json_data (dict): JSON data containing innings information.
         - match_info_df (pd.DataFrame): DataFrame containing match information.
-        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - cnx (mysql.connector.connection_cext.CMySQLConnection, optional): MySQL database connection object.
+          Only used to look up the latest match_id when neither match_id nor a match_info_df 'match_id'
+          column is available.
+        - match_id (int, optional): Explicit match id. Defaults to the 'match_id' column of match_info_df.
+        - delivery_details (dict, optional): When given, it is filled with the 'wickets', 'wicket_fielders' and
+          'extras' frames of the match, read in the same pass. Deliveries are keyed by (match_id, delivery_num)
+          and people carry their registry.people id, to be resolved to player ids by write_delivery_details.
+        - rollups (dict, optional): When given, it is filled with the 'over_summary' and 'innings_summary' frames of
+          the match (see rollup_frames).
 
     Returns:
     ----------
-        - pd.DataFrame: DataFrame containing innings information.
+        - pd.DataFrame: DataFrame containing innings information. delivery_num numbers the deliveries of the
+          match from 0 in file order; the INNINGS_STATE_COLUMNS describe the state of the innings after each
+          delivery (see innings_state_columns).
 """
 
-    # get distinct match_id from the match_info table
-    cursor = cnx.cursor()
-    query = """
-    SELECT MAX(match_id) -- this will be the most recent match_id
-    FROM match_info 
-    """
+    #the match_id that needs to be written to the innings table
+    if match_id is None and 'match_id' in match_info_df.columns:
+        match_id = match_info_df['match_id'].iloc[0]
+    elif match_id is None and cnx is not None:
+        # get distinct match_id from the match_info table
+        match_id = lookup_latest_match_id(cnx)
+
+    #single pass over the overs, appending each delivery's values straight to the columns, so the delivery
+    #dicts can be dropped as they are read (see decoding.decode_streaming, which yields the overs lazily)
+    over_teams, over_innings, over_nums, over_lengths, over_bowlers = [], [], [], [], []
+    batters, bowlers, non_strikers, batter_runs, extra_runs, wickets = [], [], [], [], [], []
+    is_legal, wickets_fallen, non_boundary = [], [], []
+    wicket_rows, fielder_rows, extras_rows = [], [], []
+    collect_details = delivery_details is not None
+    innings_list = []
+    for innings_num, innings in enumerate(json_data['innings'], 1): #len is pretty much always 2
+        innings_list.append(innings)
+        for over in innings.get('overs', ()):
+            over_deliveries = over['deliveries']
+            over_teams.append(innings['team'])
+            over_innings.append(innings_num)
+            over_nums.append(over['over'])
+            over_lengths.append(len(over_deliveries))
+            over_bowlers.append(over_deliveries[0]['bowler'] if over_deliveries else None)
+            for delivery in over_deliveries:
+                if collect_details:
+                    _collect_delivery_details(delivery, len(batters), wicket_rows, fielder_rows, extras_rows)
+                batters.append(delivery['batter'])
+                bowlers.append(delivery['bowler'])
+                non_strikers.append(delivery['non_striker'])
+                batter_runs.append(delivery['runs']['batter'])
+                extra_runs.append(delivery['runs']['extras'])
+                wickets.append(json.dumps(delivery['wickets'][0]) if delivery.get('wickets') else None)
+                legal, fallen, not_boundary = delivery_state(delivery)
+                is_legal.append(legal)
+                wickets_fallen.append(fallen)
+                non_boundary.append(not_boundary)
+
+    #integer columns are built as typed arrays
+    balls_per_over = json_data['info'].get('balls_per_over', 6)
+    over_num = np.repeat(np.array(over_nums, dtype=np.int64), over_lengths)
+    batter_runs = np.array(batter_runs, dtype=np.int64)
+    extra_runs = np.array(extra_runs, dtype=np.int64)
+    wickets_fallen = np.array(wickets_fallen, dtype=np.int64)
+    state = innings_state_columns(np.repeat(np.array(over_innings, dtype=np.int64), over_lengths), over_num, batter_runs, extra_runs,
+                                  np.array(is_legal, dtype=bool), wickets_fallen, np.array(non_boundary, dtype=bool), balls_per_over)
+    if rollups is not None:
+        rollups.update(rollup_frames(match_id, innings_list, over_innings, over_nums, over_bowlers, over_lengths, batter_runs,
+                                     extra_runs, wickets_fallen, state, balls_per_over, json_data['info'].get('outcome', {}).get('winner')))
+    if len(batters) == 0:
+        #keep the dtypes an empty list-built frame has
+        over_num, batter_runs, extra_runs = [], [], []
+        state = {column: [] for column in INNINGS_STATE_COLUMNS}
 
-    cursor.execute(query)
-    match_id = cursor.fetchall()[0][0]
-    print("cursor.fetchall():", match_id)
-     #this is the match_id that needs to be written to the innings table
-    cursor.close()
+    innings_df = pd.DataFrame({
+    "team": np.repeat(np.array(over_teams, dtype=object), over_lengths).tolist(),
+    "over_num": over_num,
+    "batter": batters,
+    "bowler": bowlers,
+    "non_striker": non_strikers,
+    "batter_runs": batter_runs,
+    "extra_runs": extra_runs,
+    "wickets": wickets,
+    "delivery_num": np.arange(len(batters), dtype=np.int64) if len(batters) else [],
+    **state
+    })
+    innings_df['match_id'] = match_id
 
-    #get the team ids by querying the teams table
-    team_lst = []
-    over_lst = []
-    batter_lst = []
-    bowler_lst = []
-    non_striker_lst = []
-    batter_runs_lst = []
-    extra_runs_lst = [] 
-    extras_lst = []
-    wicket_lst = []
-    wicket_info_lst = []
+    if collect_details:
+        delivery_details.update(_delivery_detail_frames(json_data['info']['registry']['people'], match_id,
+                                                        wicket_rows, fielder_rows, extras_rows))
+    return innings_df
 
-    #add match_id and match_number to the dataframe at the end
 
+def delivery_state(delivery: dict):
+    """
+    Returns what innings_state_columns needs from a delivery: whether it was a legal ball (neither a wide nor a
+    no-ball), how many batters were dismissed on it, and whether its batter runs are flagged non_boundary.
+    """
+    extras = delivery.get('extras')
+    legal = not extras or ('wides' not in extras and 'noballs' not in extras)
+    fallen = sum(1 for wicket in delivery.get('wickets', ()) if wicket['kind'] not in NON_DISMISSAL_KINDS)
+    return legal, fallen, delivery['runs'].get('non_boundary', False)
 
 
-    #loop through all the overs for both teams #TODO 3 for loops is disgusting
-    for i in range(len(json_data['innings'])): #len is pretty much always 2
-        #i will correspond to the team: 0 is team 1, 1 is team 2
-        for over_idx, over in enumerate(json_data['innings'][i]['overs']):
+def _grouped_cumsum(values: np.ndarray, starts: np.ndarray):
+    """
+    Running sum of values restarting wherever starts is True. values must be non-negative, so the offset
+    subtracted at each start is at least the previous one and can be carried forward with a running maximum.
+    """
+    total = np.cumsum(values)
+    return total - np.maximum.accumulate(np.where(starts, total - values, 0))
 
-            for delivery in over['deliveries']:
 
-                team_lst.append(json_data['innings'][i]['team']) 
-            
-                over_lst.append(over['over']) #the over
-                
-                batter_lst.append(delivery['batter']) #get batter
+def run_rate(team_score: np.ndarray, legal_balls: np.ndarray, balls_per_over=6):
+    """
+    Runs per over of legal balls; NaN where no legal ball has been bowled yet.
+    """
+    rates = np.full(len(team_score), np.nan)
+    np.divide(np.asarray(team_score, dtype=np.int64) * balls_per_over, legal_balls, out=rates, where=np.asarray(legal_balls) > 0)
+    return rates
+
 
-                bowler_lst.append(delivery['bowler']) #get bowler
+def innings_state_columns(innings_num: np.ndarray, over_num: np.ndarray, batter_runs: np.ndarray, extra_runs: np.ndarray,
+                          is_legal: np.ndarray, wickets_fallen: np.ndarray, non_boundary: np.ndarray, balls_per_over: int = 6):
+    """
+    Derives the INNINGS_STATE_COLUMNS of a match's deliveries, given in file order, in one vectorized pass.
+
+    Parameters:
+    ------------
+        - innings_num, over_num, batter_runs, extra_runs (np.ndarray): One value per delivery.
+        - is_legal, wickets_fallen, non_boundary (np.ndarray): The values of delivery_state, one per delivery.
+        - balls_per_over (int): Legal balls per over, for the run rate.
 
-                # extras_lst.append(delivery['extras']) #the extras list
-                
-                non_striker_lst.append(delivery['non_striker']) #get non_striker
+    Returns:
+    -----------
+        - dict of column -> np.ndarray:
+            innings_num: 1 for the first innings (super overs follow as 3, 4, ...)
+            ball_in_over: legal balls of the over so far, this one included (a wide or no-ball repeats the count)
+            is_legal: 1 unless the delivery was a wide or a no-ball
+            legal_balls: legal balls of the innings so far, this one included
+            team_score, team_wickets: runs and dismissals of the innings after the delivery
+            run_rate: team_score per over of legal balls (NaN before the first legal ball)
+            is_dot: 1 for a legal ball off which nothing was scored
+            is_boundary: 1 when the batter hit a four or a six
+    """
+    n_deliveries = len(innings_num)
+    innings_start = np.ones(n_deliveries, dtype=bool)
+    innings_start[1:] = innings_num[1:] != innings_num[:-1]
+    over_start = innings_start.copy()
+    over_start[1:] |= over_num[1:] != over_num[:-1]
+
+    legal = is_legal.astype(np.int64)
+    runs = batter_runs + extra_runs
+    legal_balls = _grouped_cumsum(legal, innings_start)
+    team_score = _grouped_cumsum(runs, innings_start)
+    return {
+        'innings_num': innings_num,
+        'ball_in_over': _grouped_cumsum(legal, over_start),
+        'is_legal': legal,
+        'legal_balls': legal_balls,
+        'team_score': team_score,
+        'team_wickets': _grouped_cumsum(wickets_fallen, innings_start),
+        'run_rate': run_rate(team_score, legal_balls, balls_per_over),
+        'is_dot': (is_legal & (runs == 0)).astype(np.int64),
+        'is_boundary': (((batter_runs == 4) | (batter_runs == 6)) & ~non_boundary).astype(np.int64),
+    }
+
+
+def rollup_frames(match_id: int, innings_list: list, over_innings: list, over_nums: list, over_bowlers: list, over_lengths: list,
+                  batter_runs: np.ndarray, extra_runs: np.ndarray, wickets_fallen: np.ndarray, state: dict, balls_per_over: int = 6,
+                  winner: str = None):
+    """
+    Sums the deliveries of a match, as gathered by parse_innings_info, into its 'over_summary' and 'innings_summary'
+    rows. Overs and innings are contiguous runs of deliveries, so every total is one np.bincount over the group ids.
 
-                
-                batter_runs_lst.append(delivery['runs']['batter'])
-                extra_runs_lst.append(delivery['runs']['extras'])
+    Parameters:
+    ------------
+        - match_id (int): The match the rows belong to.
+        - innings_list (list): The innings of the match JSON; their 'team', 'target' and 'super_over' are read.
+        - over_innings, over_nums, over_bowlers, over_lengths (list): One value per over: its innings_num, over
+          number, first bowler and number of deliveries.
+        - batter_runs, extra_runs, wickets_fallen (np.ndarray): One value per delivery.
+        - state (dict): The innings_state_columns of the deliveries.
+        - balls_per_over (int): Legal balls per over, for the run rate and overs.
+        - winner (str, optional): The match winner, for innings_summary.won.
 
-                try:
-                    wicket_lst.append(json.dumps(delivery['wickets'][0]))
-                except:
-                    wicket_lst.append(None)
-            
-      
+    Returns:
+    -----------
+        - dict with the 'over_summary' frame (one row per over: match_id, innings_num, over_num, team, bowler,
+          runs, extra_runs, wickets, legal_balls, dot_balls, boundaries, and the team_score and team_wickets at the
+          end of the over) and the 'innings_summary' frame (one row per innings, including innings without
+          deliveries: match_id, innings_num, team, runs, wickets, legal_balls, overs in cricket notation, extra_runs,
+          dot_balls, boundaries, run_rate, target_runs, target_overs, super_over, and won, which is NULL when the
+          match has no winner).
+    """
+    over_lengths = np.array(over_lengths, dtype=np.int64)
+    n_overs, n_innings = len(over_lengths), len(innings_list)
+    over_ids = np.repeat(np.arange(n_overs), over_lengths)
+    innings_ids = np.repeat(np.array(over_innings, dtype=np.int64) - 1, over_lengths)
+    runs = batter_runs + extra_runs
+
+    def totals(values, group_ids, n_groups):
+        return np.bincount(group_ids, weights=values, minlength=n_groups).astype(np.int64)
+
+    if len(runs) == 0:
+        over_df = pd.DataFrame(columns=OVER_SUMMARY_COLUMNS)
+    else:
+        #end-of-over state is the state after the last delivery of the over
+        over_ends = np.maximum(np.cumsum(over_lengths) - 1, 0)
+        over_df = pd.DataFrame({
+            'match_id': match_id,
+            'innings_num': np.array(over_innings, dtype=np.int64),
+            'over_num': np.array(over_nums, dtype=np.int64),
+            'team': [innings_list[innings_num - 1]['team'] for innings_num in over_innings],
+            'bowler': over_bowlers,
+            'runs': totals(runs, over_ids, n_overs),
+            'extra_runs': totals(extra_runs, over_ids, n_overs),
+            'wickets': totals(wickets_fallen, over_ids, n_overs),
+            'legal_balls': totals(state['is_legal'], over_ids, n_overs),
+            'dot_balls': totals(state['is_dot'], over_ids, n_overs),
+            'boundaries': totals(state['is_boundary'], over_ids, n_overs),
+            'team_score': state['team_score'][over_ends],
+            'team_wickets': state['team_wickets'][over_ends],
+        }, columns=OVER_SUMMARY_COLUMNS)
+        #an over listed without deliveries has no end state and nothing to sum
+        over_df = over_df[over_lengths > 0].reset_index(drop=True)
+
+    innings_runs = totals(runs, innings_ids, n_innings)
+    legal_balls = totals(state['is_legal'], innings_ids, n_innings)
+    targets = [innings.get('target', {}) for innings in innings_list]
     innings_df = pd.DataFrame({
-    "team": team_lst,
-    "over_num": over_lst,
-    "batter": batter_lst,
-    "bowler": bowler_lst,
-    "non_striker": non_striker_lst,
-    "batter_runs": batter_runs_lst,
-    "extra_runs": extra_runs_lst,
-    "wickets": wicket_lst
-    # "wicket_info": wicket_info_lst
-    })
-    innings_df['match_id'] = match_id
+        'match_id': match_id,
+        'innings_num': np.arange(1, n_innings + 1),
+        'team': [innings['team'] for innings in innings_list],
+        'runs': innings_runs,
+        'wickets': totals(wickets_fallen, innings_ids, n_innings),
+        'legal_balls': legal_balls,
+        'overs': legal_balls // balls_per_over + legal_balls % balls_per_over / 10,
+        'extra_runs': totals(extra_runs, innings_ids, n_innings),
+        'dot_balls': totals(state['is_dot'], innings_ids, n_innings),
+        'boundaries': totals(state['is_boundary'], innings_ids, n_innings),
+        'run_rate': run_rate(innings_runs, legal_balls, balls_per_over),
+        'target_runs': [target.get('runs') for target in targets],
+        'target_overs': [target.get('overs') for target in targets],
+        'super_over': [int(bool(innings.get('super_over', False))) for innings in innings_list],
+        'won': [None if winner is None else int(innings['team'] == winner) for innings in innings_list],
+    }, columns=INNINGS_SUMMARY_COLUMNS) if n_innings else pd.DataFrame(columns=INNINGS_SUMMARY_COLUMNS)
+    return {'over_summary': over_df, 'innings_summary': innings_df}
+
+
+def _collect_delivery_details(delivery: dict, delivery_num: int, wicket_rows: list, fielder_rows: list, extras_rows: list):
+    extras = delivery.get('extras')
+    if extras:
+        extras_rows.append((delivery_num, delivery['bowler']) + tuple(extras.get(kind, 0) for kind in EXTRAS_KINDS))
+    for wicket_num, wicket in enumerate(delivery.get('wickets', ())):
+        wicket_rows.append((delivery_num, wicket_num, wicket['kind'], delivery['bowler'], wicket['player_out']))
+        for fielder_num, fielder in enumerate(wicket.get('fielders', ())):
+            fielder_rows.append((delivery_num, wicket_num, fielder_num, fielder.get('name'), bool(fielder.get('substitute', False))))
+
+
+def _delivery_detail_frames(people: dict, match_id: int, wicket_rows: list, fielder_rows: list, extras_rows: list):
+    wickets_df = pd.DataFrame(wicket_rows, columns=['delivery_num', 'wicket_num', 'kind', 'bowler', 'player_out'])
+    fielders_df = pd.DataFrame(fielder_rows, columns=['delivery_num', 'wicket_num', 'fielder_num', 'fielder', 'substitute'])
+    extras_df = pd.DataFrame(extras_rows, columns=['delivery_num', 'bowler'] + EXTRAS_KINDS)
+    for df, person_columns in ((wickets_df, ['bowler', 'player_out']), (fielders_df, ['fielder']), (extras_df, ['bowler'])):
+        df.insert(0, 'match_id', match_id)
+        for column in person_columns:
+            df[column + '_registryID'] = [people.get(person) for person in df[column]]
+    return {'wickets': wickets_df, 'wicket_fielders': fielders_df, 'extras': extras_df}
+
+
+#the person columns of each delivery detail frame; each has a <column>_registryID companion
+_DELIVERY_DETAIL_PEOPLE = {'wickets': ['bowler', 'player_out'], 'wicket_fielders': ['fielder'], 'extras': ['bowler']}
+
+
+def delivery_detail_people(delivery_details: dict):
+    """
+    Returns the (player_name, registryID) pairs referenced by the frames of parse_innings_info(delivery_details=...),
+    for adding to 'players' before write_delivery_details resolves their ids. Substitute fielders can appear here
+    without being in the match squads.
+    """
+    people = {}
+    for table, columns in _DELIVERY_DETAIL_PEOPLE.items():
+        df = delivery_details[table]
+        for column in columns:
+            for player_name, registry_id in zip(df[column].tolist(), df[column + '_registryID'].tolist()):
+                if registry_id is not None:
+                    people.setdefault(registry_id, player_name)
+    return pd.DataFrame({'player_name': list(people.values()), 'registryID': list(people.keys())}, dtype=object)
 
 
-    return innings_df
+def delivery_detail_rows(delivery_details: dict, player_ids: dict):
+    """
+    Turns the frames of parse_innings_info(delivery_details=...) into the rows of the 'wickets', 'wicket_fielders'
+    and 'extras' tables, with people replaced by their player ids (player_ids maps registryID -> player_id;
+    people without a registry id get NULL).
+    """
+    def ids(df, column):
+        return [player_ids.get(registry_id) if registry_id is not None else None for registry_id in df[column + '_registryID'].tolist()]
+
+    wickets_df, fielders_df, extras_df = (delivery_details[table] for table in DELIVERY_DETAIL_TABLES)
+    return {
+        'wickets': pd.DataFrame({
+            **{column: wickets_df[column].to_numpy() for column in ['match_id', 'delivery_num', 'wicket_num', 'kind']},
+            'bowler_id': ids(wickets_df, 'bowler'),
+            'player_out_id': ids(wickets_df, 'player_out'),
+        }),
+        'wicket_fielders': pd.DataFrame({
+            **{column: fielders_df[column].to_numpy() for column in ['match_id', 'delivery_num', 'wicket_num', 'fielder_num']},
+            'fielder_id': ids(fielders_df, 'fielder'),
+            'substitute': fielders_df['substitute'].to_numpy(dtype=int),
+        }),
+        'extras': pd.DataFrame({
+            **{column: extras_df[column].to_numpy() for column in ['match_id', 'delivery_num']},
+            'bowler_id': ids(extras_df, 'bowler'),
+            **{column: extras_df[column].to_numpy() for column in EXTRAS_KINDS},
+        }),
+    }
+
+
+def write_delivery_details(delivery_details: dict, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                           dimension_cache: DimensionCache = None, batch_size: int = 1000, commit: bool = True):
+    """
+    Writes the 'wickets', 'wicket_fielders' and 'extras' rows of a match (see parse_innings_info(delivery_details=...)).
+    People are resolved to player ids through dimension_cache, adding any that 'players' does not have yet; rows are
+    inserted with insert_rows_batched, skipping duplicates of the (match_id, delivery_num, ...) primary keys.
+
+    Parameters:
+    ------------
+        - delivery_details (dict): The frames filled in by parse_innings_info.
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - dimension_cache (DimensionCache, optional): Defaults to an empty cache, which reads back only the ids it needs.
+        - batch_size (int): Rows per multi-row INSERT.
+        - commit (bool): Pass False to defer the commit to the caller.
+
+    Returns:
+    -----------
+        - dict mapping table name ('players' included) to (rows_written, rows_skipped)
+    """
+    dimension_cache = DimensionCache() if dimension_cache is None else dimension_cache
+    counts = {'players': dimension_cache.add_players(delivery_detail_people(delivery_details), cnx, batch_size=batch_size, commit=commit)}
+    for table, df in delivery_detail_rows(delivery_details, dimension_cache.player_ids).items():
+        counts[table] = insert_rows_batched(table, df, cnx, batch_size=batch_size, commit=commit) if len(df) else (0, 0)
+    return counts
+
+
+def write_rollups(rollups: dict, cnx: mysql.connector.connection_cext.CMySQLConnection, batch_size: int = 1000, commit: bool = True):
+    """
+    Writes the 'over_summary' and 'innings_summary' rows of a match (see parse_innings_info(rollups=...)) with
+    insert_rows_batched, skipping duplicates of their (match_id, innings_num, ...) primary keys.
+
+    Returns:
+    -----------
+        - dict mapping table name to (rows_written, rows_skipped)
+    """
+    return {table: insert_rows_batched(table, rollups[table], cnx, batch_size=batch_size, commit=commit) if len(rollups[table]) else (0, 0)
+            for table in ROLLUP_TABLES}
 
 
 ########################################################
-def write_innings_info(innings_info_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection):
+def write_innings_info(innings_info_df: pd.DataFrame, cnx: mysql.connector.connection_cext.CMySQLConnection,
+                       batch_size: int = None, commit: bool = True):
 
     """
     Writes innings information DataFrame to the 'innings_info' table in the cricket_db database.
@@ -500,11 +1042,16 @@ def write_innings_info(innings_info_df: pd.DataFrame, cnx: mysql.connector.conne
     -----------
         - innings_info_df (pd.DataFrame): DataFrame containing innings information.
         - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - batch_size (int, optional): When set, deliveries are written with batched multi-row inserts
+                                      (see insert_rows_batched) instead of one INSERT per delivery.
+        - commit (bool): Only used in batched mode; pass False to defer the commit to the caller.
 
     Returns:
     -----------
-        - None
+        - rows_written (int), rows_skipped (int)
     """
+    if batch_size is not None:
+        return insert_rows_batched('innings_info', innings_info_df, cnx, batch_size=batch_size, commit=commit)
 
     innings_info_tuples = innings_info_df.values.tolist()
 
@@ -514,22 +1061,580 @@ def write_innings_info(innings_info_df: pd.DataFrame, cnx: mysql.connector.conne
     sql = f"INSERT INTO {table_name} ({columns}) VALUES ({', '.join(['%s'] * len(innings_info_df.columns))})"
 
     # Execute the INSERT statement for each row
+    rows_written, rows_skipped = 0, 0
     cursor = cnx.cursor()
     for row in innings_info_tuples:
         try:
             cursor.execute(sql, row)
+            rows_written += 1
             # print(f"1 row inserted successfully into {table_name} table!")
-        except mysql.connector.IntegrityError:
+        except IntegrityError:
             # print("Duplicate Data! Skipping...")
-            pass
+            rows_skipped += 1
 
     cnx.commit()
     cursor.close()
+    return rows_written, rows_skipped
+
+
+
+
+########################################################
+#LOAD DATA's default escaping: backslash-escape the escape character itself, the delimiters and NUL; NULL is \N
+_LOAD_DATA_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+
+
+def _load_data_field(value):
+    """
+    Formats one value as a field of a tab-delimited LOAD DATA file.
+    """
+    if value is None:
+        return '\\N'
+    return str(value).translate(_LOAD_DATA_ESCAPES)
+
+
+class InningsBulkLoader:
+    """
+    Bulk-load alternative to write_innings_info for full historical loads. Deliveries from many matches are
+    staged in a tab-delimited temporary file and loaded into 'innings_info' with LOAD DATA LOCAL INFILE
+    once rows_per_load rows have accumulated.
+
+    Parameters:
+    ------------
+        cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL connection opened with allow_local_infile=True
+            (the server also needs local_infile=ON).
+        rows_per_load (int): Number of staged rows that triggers a load.
+        table_name (str): Target table.
+
+    Notes:
+    ------------
+        - Values are escaped the way LOAD DATA expects (backslash, tab, newline, carriage return, NUL), so JSON
+          columns such as 'wickets' load byte-for-byte; None is written as \\N and loads as NULL.
+        - The loader never commits; the caller commits after a flush so matches and their deliveries land together.
+        - write_innings_info remains the per-row fallback and loads the same row set.
+
+    Example:
+    -----------
+        innings_loader = InningsBulkLoader(cnx)
+        for innings_df in ...:
+            innings_loader.add(innings_df)
+        innings_loader.flush()
+        innings_loader.close()
+        cnx.commit()
+    """
+
+    def __init__(self, cnx: mysql.connector.connection_cext.CMySQLConnection, rows_per_load: int = 200000,
+                 table_name: str = 'innings_info'):
+        self.cnx = cnx
+        self.rows_per_load = rows_per_load
+        self.table_name = table_name
+        self.columns = None
+        self.staged_rows = 0
+        self._file = None
+
+    def add(self, innings_df: pd.DataFrame):
+        """
+        Stages the deliveries of one match, loading the staged rows if rows_per_load is reached.
+
+        Returns:
+        -----------
+            rows_loaded (int): Rows loaded by a load this call triggered, 0 otherwise.
+        """
+        if self.columns is None:
+            self.columns = list(innings_df.columns)
+        elif list(innings_df.columns) != self.columns:
+            raise ValueError("innings_df columns {} do not match the staged columns {}".format(list(innings_df.columns), self.columns))
+
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n', suffix='.tsv', delete=False)
+        self._file.writelines('\t'.join(map(_load_data_field, row)) + '\n' for row in _df_to_rows(innings_df))
+        self.staged_rows += len(innings_df)
+
+        if self.staged_rows >= self.rows_per_load:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """
+        Loads every staged row into the table.
+
+        Returns:
+        -----------
+            rows_loaded (int)
+        """
+        if self._file is None:
+            return 0
+
+        self._file.close()
+        query = f"""
+        LOAD DATA LOCAL INFILE %s INTO TABLE {self.table_name}
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+        LINES TERMINATED BY '\\n'
+        ({', '.join(self.columns)}) """
+        try:
+            cursor = self.cnx.cursor()
+            cursor.execute(query, (self._file.name,))
+            rows_loaded = cursor.rowcount
+            cursor.close()
+        finally:
+            self.close()
+        return rows_loaded
+
+    def close(self):
+        """
+        Discards any staged rows and removes the staging file.
+        """
+        if self._file is not None:
+            self._file.close()
+            os.remove(self._file.name)
+        self._file = None
+        self.staged_rows = 0
+
+
+########################################################
+def parse_match_data(json_data: dict, match_id: int, timings: dict = None):
+    """
+    Runs the database-free parsing steps on a decoded match. Safe to run in a worker process.
+
+    Parameters:
+    ------------
+        - json_data (dict): The decoded match JSON.
+        - match_id (int): The match id (see match_id_from_file_name).
+        - timings (dict, optional): When given, the seconds spent in each parse step are added to it under the
+          step's function name (see metrics.IngestMetrics).
+
+    Returns:
+    ------------
+        - team_df, player_df, match_info_df, innings_df (pd.DataFrame): The parsed frames. team1_id and
+          team2_id are left as None and are resolved by write_parsed_match.
+        - delivery_details (dict): The 'wickets', 'wicket_fielders' and 'extras' frames (see parse_innings_info).
+        - rollups (dict): The 'over_summary' and 'innings_summary' frames (see parse_innings_info).
+    """
+    delivery_details, rollups = {}, {}
+    team_df, player_df = time_stage(timings, 'parse_team_player_info', parse_team_player_info, json_data = json_data)
+    match_info_df = time_stage(timings, 'parse_match_info', parse_match_info, json_data = json_data, match_id = match_id)
+    innings_df = time_stage(timings, 'parse_innings_info', parse_innings_info, json_data = json_data, match_info_df = match_info_df,
+                            delivery_details = delivery_details, rollups = rollups)
+    return team_df, player_df, match_info_df, innings_df, delivery_details, rollups
+
+
+def parse_match_file(file_path: str, decoder: str = None):
+    """
+    Loads a match JSON file and parses it with parse_match_data, taking match_id from the file name.
+    decoder names a decoding.DECODERS entry (defaults to decoding.default_decoder()).
+    """
+    with open(file_path, 'rb') as file:
+        json_data = decode_match(file.read(), decoder)
+
+    return parse_match_data(json_data, match_id_from_file_name(file_path))
+
+
+def parse_match_member(member: tuple, decoder: str = None):
+    """
+    Decodes an archive member (see sources.iter_archive_members) and parses it with parse_match_data,
+    taking match_id from the member name.
+
+    Parameters:
+    ------------
+        - member (tuple): (member_name, raw_bytes)
+        - decoder (str, optional): A decoding.DECODERS entry, e.g. 'ijson' to stream the deliveries.
+    """
+    member_name, raw = member
+    return parse_match_data(decode_match(raw, decoder), match_id_from_file_name(member_name))
+
+
+def parse_match_member_timed(member: tuple, decoder: str = None):
+    """
+    parse_match_member that also times each step.
+
+    Returns:
+    ------------
+        - (parsed, timings): the parse_match_data tuple, and a dict of seconds per step ('decode' and the
+          parse_* functions). A streaming decoder defers part of its work to parse_innings_info.
+    """
+    member_name, raw = member
+    timings = {}
+    json_data = time_stage(timings, 'decode', decode_match, raw, decoder)
+    return parse_match_data(json_data, match_id_from_file_name(member_name), timings = timings), timings
+
+
+def _parse_chunk(parse_function, chunk: list):
+    return [parse_function(item) for item in chunk]
+
+
+def _process_pool_context():
+    """
+    Start method for the parse workers. Forking while other threads run can leave a child holding a lock that one of
+    them held (pipelined_parse starts the pool from its parse thread, next to the reader thread), so forkserver, or
+    spawn where it is not available, is used then; otherwise the platform default.
+    """
+    if threading.active_count() == 1:
+        return None
+    return multiprocessing.get_context('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def _parse_in_order(parse_function, items, max_workers: int, chunk_size: int):
+    """
+    Applies parse_function to items, optionally across worker processes, yielding results in input order.
+    Only a couple of chunks per worker are in flight at a time, so items can be a lazy generator.
+    """
+    if max_workers == 1:
+        yield from map(parse_function, items)
+        return
+
+    max_workers = max_workers or os.cpu_count()
+    items = iter(items)
+    with ProcessPoolExecutor(max_workers = max_workers, mp_context = _process_pool_context()) as executor:
+        pending = deque()
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if chunk:
+                pending.append(executor.submit(_parse_chunk, parse_function, chunk))
+            if not pending:
+                break
+            if not chunk or len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+
+
+def parse_match_files(file_paths: list, max_workers: int = 1, chunk_size: int = 1, decoder: str = None):
+    """
+    Parses match files with parse_match_file, optionally across worker processes, and yields the results
+    in the same order as file_paths so a single writer can consume them.
+
+    Parameters:
+    ------------
+        - file_paths (list): Paths to Cricsheet match JSON files.
+        - max_workers (int): Number of worker processes. 1 parses in the current process; None uses one worker per core.
+        - chunk_size (int): Number of files handed to a worker at a time.
+        - decoder (str, optional): A decoding.DECODERS entry (see parse_match_file).
+
+    Returns:
+    ------------
+        - generator of (team_df, player_df, match_info_df, innings_df, delivery_details, rollups) tuples
+    """
+    yield from _parse_in_order(partial(parse_match_file, decoder = decoder), file_paths, max_workers, chunk_size)
+
+
+def parse_match_members(members, max_workers: int = 1, chunk_size: int = 1, decoder: str = None, timed: bool = False):
+    """
+    Same as parse_match_files, for (member_name, raw_bytes) pairs streamed out of an archive
+    (see sources.iter_archive_members). members may be a lazy generator. With timed=True it yields
+    the (parsed, timings) pairs of parse_match_member_timed instead.
+    """
+    parse_function = parse_match_member_timed if timed else parse_match_member
+    yield from _parse_in_order(partial(parse_function, decoder = decoder), members, max_workers, chunk_size)
+
+
+def write_parsed_match(team_df: pd.DataFrame, player_df: pd.DataFrame, match_info_df: pd.DataFrame, innings_df: pd.DataFrame,
+                       delivery_details: dict = None, rollups: dict = None, cnx: mysql.connector.connection_cext.CMySQLConnection = None,
+                       batch_size: int = None, commit: bool = True, dimension_cache: DimensionCache = None,
+                       innings_loader: InningsBulkLoader = None, timings: dict = None):
+    """
+    Writes the frames produced by parse_match_file to cricket_db, resolving team1_id and team2_id as it goes.
+    If match_info_df carries a 'match_id' column the deliveries are written under that id and skipped when the
+    match is already present; otherwise the id is looked up after the match row is written.
+
+    Parameters:
+    ------------
+        - team_df, player_df, match_info_df, innings_df (pd.DataFrame): Output of parse_match_file.
+        - delivery_details (dict, optional): The fifth item of parse_match_file's output. When given, the wickets,
+          wicket_fielders and extras rows are written too (see write_delivery_details).
+        - rollups (dict, optional): The last item of parse_match_file's output. When given, the over_summary and
+          innings_summary rows are written too (see write_rollups).
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - batch_size (int, optional): Passed through to the write_* functions.
+        - commit (bool): Passed through to the write_* functions in batched mode.
+        - dimension_cache (DimensionCache, optional): When given, only unseen teams/players are inserted
+          and team ids are resolved in memory instead of with a SELECT per team.
+        - innings_loader (InningsBulkLoader, optional): When given, deliveries are staged for a bulk load instead
+          of written with write_innings_info; innings_info counts then only include rows loaded by a flush
+          this call triggered.
+        - timings (dict, optional): When given, the seconds spent writing each table are added to it under
+          'write_<table>' (see metrics.IngestMetrics).
+
+    Returns:
+    ------------
+        - dict mapping table name to (rows_written, rows_skipped)
+    """
+    counts = {}
+    match_info_df = match_info_df.copy()
+    team1, team2 = match_info_df['team1'].iloc[0], match_info_df['team2'].iloc[0]
+    if dimension_cache is not None:
+        counts['players'] = time_stage(timings, 'write_players', dimension_cache.add_players, player_df, cnx,
+                                       batch_size = batch_size or 1000, commit = commit)
+        counts['teams'] = time_stage(timings, 'write_teams', dimension_cache.add_teams, team_df, cnx,
+                                     batch_size = batch_size or 1000, commit = commit)
+        match_info_df['team1_id'] = dimension_cache.team_id(team1)
+        match_info_df['team2_id'] = dimension_cache.team_id(team2)
+    else:
+        counts['players'] = time_stage(timings, 'write_players', write_players_to_cricket_db, player_df = player_df, cnx = cnx,
+                                       batch_size = batch_size, commit = commit)
+        counts['teams'] = time_stage(timings, 'write_teams', write_teams_to_cricket_db, team_df = team_df, cnx = cnx,
+                                     batch_size = batch_size, commit = commit)
+        match_info_df['team1_id'] = lookup_team_id(team1, cnx)
+        match_info_df['team2_id'] = lookup_team_id(team2, cnx)
+
+    counts['match_info'] = time_stage(timings, 'write_match_info', write_match_info, match_info_df = match_info_df, cnx = cnx,
+                                      batch_size = batch_size, commit = commit)
+
+    if 'match_id' in match_info_df.columns:
+        if counts['match_info'][0] == 0:
+            #the match is already loaded, so its deliveries are too
+            counts['innings_info'] = (0, len(innings_df))
+            for table in DELIVERY_DETAIL_TABLES if delivery_details is not None else []:
+                counts[table] = (0, len(delivery_details[table]))
+            for table in ROLLUP_TABLES if rollups is not None else []:
+                counts[table] = (0, len(rollups[table]))
+            return counts
+    else:
+        innings_df = innings_df.copy()
+        innings_df['match_id'] = lookup_latest_match_id(cnx)
+        if delivery_details is not None:
+            delivery_details = {table: df.assign(match_id=innings_df['match_id'].iloc[0] if len(innings_df) else None)
+                                for table, df in delivery_details.items()}
+        if rollups is not None:
+            rollups = {table: df.assign(match_id=innings_df['match_id'].iloc[0] if len(innings_df) else None)
+                       for table, df in rollups.items()}
+
+    if delivery_details is not None:
+        detail_counts = time_stage(timings, 'write_delivery_details', write_delivery_details, delivery_details, cnx,
+                                   dimension_cache = dimension_cache, batch_size = batch_size or 1000, commit = commit)
+        players_written, players_skipped = counts['players']
+        counts['players'] = (players_written + detail_counts['players'][0], players_skipped)
+        for table in DELIVERY_DETAIL_TABLES:
+            counts[table] = detail_counts[table]
+
+    if rollups is not None:
+        counts.update(time_stage(timings, 'write_rollups', write_rollups, rollups, cnx, batch_size = batch_size or 1000, commit = commit))
+
+    if innings_loader is not None:
+        counts['innings_info'] = (time_stage(timings, 'write_innings_info', innings_loader.add, innings_df), 0)
+    else:
+        counts['innings_info'] = time_stage(timings, 'write_innings_info', write_innings_info, innings_info_df = innings_df, cnx = cnx,
+                                            batch_size = batch_size, commit = commit)
+    return counts
+
+
+########################################################
+def create_load_manifest(cnx: mysql.connector.connection_cext.CMySQLConnection):
+    """
+    Creates the 'load_manifest' table if it does not exist. The manifest records every loaded match file
+    so that incremental runs can skip files that have not changed.
+
+    Parameters:
+    ------------
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+    -----------
+       -  None
+    """
+    query = """
+    CREATE TABLE IF NOT EXISTS load_manifest (
+        file_name VARCHAR(255) NOT NULL PRIMARY KEY,
+        content_hash CHAR(64) NOT NULL,
+        match_type_number INT,
+        match_id INT NOT NULL,
+        loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) """
+    cursor = cnx.cursor()
+    cursor.execute(query)
+    cursor.close()
+
+
+def content_hash(raw: bytes):
+    """
+    Returns the SHA-256 hex digest of a match file's raw contents.
+    """
+    return hashlib.sha256(raw).hexdigest()
+
+
+def file_content_hash(file_path: str):
+    """
+    Returns the SHA-256 hex digest of a file's contents.
+    """
+    with open(file_path, 'rb') as file:
+        return content_hash(file.read())
+
+
+def read_load_manifest(cnx: mysql.connector.connection_cext.CMySQLConnection):
+    """
+    Reads the load manifest.
+
+    Parameters:
+    ------------
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+    -----------
+       -  dict mapping file_name to content_hash
+    """
+    cursor = cnx.cursor()
+    cursor.execute("SELECT file_name, content_hash FROM load_manifest")
+    manifest = dict(cursor.fetchall())
+    cursor.close()
+    return manifest
+
+
+class ManifestMissingError(Exception):
+    """
+    Raised by check_load_manifest when match_info holds matches that load_manifest does not describe.
+    """
+
+
+def check_load_manifest(cnx: mysql.connector.connection_cext.CMySQLConnection):
+    """
+    Checks that an incremental ingest can run on the database. A database loaded before the load manifest existed has
+    matches under auto-incremented match_ids and an empty manifest, so an incremental run would load every match again
+    under its Cricsheet id and duplicate all deliveries; such a database needs one full reload (ingest --mode full).
+
+    Parameters:
+    ------------
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+    -----------
+       -  None; raises ManifestMissingError if match_info has rows while load_manifest is empty
+    """
+    cursor = cnx.cursor()
+    cursor.execute("SELECT 1 FROM load_manifest LIMIT 1")
+    has_manifest = bool(cursor.fetchall())
+    cursor.execute("SELECT 1 FROM match_info LIMIT 1")
+    has_matches = bool(cursor.fetchall())
+    cursor.close()
+    if has_matches and not has_manifest:
+        raise ManifestMissingError("match_info has matches but load_manifest is empty: the database was loaded without "
+                                   "a load manifest, so an incremental ingest would load every match again; reload it "
+                                   "once with ingest --mode full")
+
+
+def split_by_manifest(file_hashes: dict, manifest: dict):
+    """
+    Compares match files against the load manifest.
+
+    Parameters:
+    ------------
+        - file_hashes (dict): Maps file path to content hash (see file_content_hash).
+        - manifest (dict): Output of read_load_manifest, keyed by file name.
+
+    Returns:
+    -----------
+       -  new_files, changed_files, unchanged_files (list): File paths, in the order of file_hashes.
+    """
+    new_files, changed_files, unchanged_files = [], [], []
+    for file_path, content_hash in file_hashes.items():
+        loaded_hash = manifest.get(os.path.basename(file_path))
+        if loaded_hash is None:
+            new_files.append(file_path)
+        elif loaded_hash != content_hash:
+            changed_files.append(file_path)
+        else:
+            unchanged_files.append(file_path)
+    return new_files, changed_files, unchanged_files
+
+
+class ManifestFilter:
+    """
+    Single-pass form of split_by_manifest for archive members: hashes each (member_name, raw_bytes) pair as it is
+    read and passes on only the new and changed files, so an incremental run decompresses the archive once instead
+    of once to hash it and again to parse it.
+
+    Parameters:
+    ------------
+        manifest (dict): Output of read_load_manifest, keyed by file name.
+
+    Attributes:
+    ------------
+        selected (deque): (member_name, content_hash, changed) of each member passed on, in order; the writer pops
+                          one per parsed match, since parse_match_members keeps the member order.
+        new_files, changed_files, unchanged_files (int): Members seen so far, by kind.
+
+    Example:
+    -----------
+        manifest_filter = ManifestFilter(read_load_manifest(cnx))
+        for parsed in parse_match_members(manifest_filter.filter(iter_archive_members(archive))):
+            file_name, file_hash, changed = manifest_filter.selected.popleft()
+            ...
+    """
+
+    def __init__(self, manifest: dict):
+        self.manifest = manifest
+        self.selected = deque()
+        self.new_files = 0
+        self.changed_files = 0
+        self.unchanged_files = 0
+
+    def filter(self, members):
+        """
+        Yields the members that are new or changed since the manifest was read.
+        """
+        for member_name, raw in members:
+            file_hash = content_hash(raw)
+            loaded_hash = self.manifest.get(os.path.basename(member_name))
+            if loaded_hash == file_hash:
+                self.unchanged_files += 1
+                continue
+            changed = loaded_hash is not None
+            if changed:
+                self.changed_files += 1
+            else:
+                self.new_files += 1
+            self.selected.append((member_name, file_hash, changed))
+            yield member_name, raw
+
+
+def delete_match(match_id: int, cnx: mysql.connector.connection_cext.CMySQLConnection):
+    """
+    Deletes a match, its deliveries, their details and its rollups so a changed file can be reloaded. Does not
+    commit, so the delete and the reload can share one transaction.
+
+    Parameters:
+    ------------
+        - match_id (int): The match to delete.
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+    -----------
+       -  None
+    """
+    cursor = cnx.cursor()
+    for table in DELIVERY_DETAIL_TABLES + ROLLUP_TABLES + ['innings_info', 'match_info']:
+        cursor.execute(f"DELETE FROM {table} WHERE match_id = %s", (int(match_id),))
+    cursor.close()
 
 
+def record_load_manifest(file_path: str, content_hash: str, match_info_df: pd.DataFrame,
+                         cnx: mysql.connector.connection_cext.CMySQLConnection):
+    """
+    Inserts or updates the manifest entry of a loaded match file. Does not commit, so the entry is
+    committed together with the match it describes.
+
+    Parameters:
+    ------------
+        - file_path (str): Path of the loaded match file; the manifest stores its base name.
+        - content_hash (str): Content hash of the file (see file_content_hash).
+        - match_info_df (pd.DataFrame): The parsed match info, for match_type_number and match_id.
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+    -----------
+       -  None
+    """
+    query = """
+    INSERT INTO load_manifest (file_name, content_hash, match_type_number, match_id)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash), match_type_number = VALUES(match_type_number),
+        match_id = VALUES(match_id) """
+    match_type_number = match_info_df['match_type_number'].iloc[0]
+    cursor = cnx.cursor()
+    cursor.execute(query, (os.path.basename(file_path), content_hash,
+                           None if pd.isna(match_type_number) else int(match_type_number),
+                           int(match_info_df['match_id'].iloc[0])))
+    cursor.close()
 
 
-def clear_contents(cnx: mysql.connector.connection_cext.CMySQLConnection ):
+def clear_contents(cnx: mysql.connector.connection_cext.CMySQLConnection, tables: list = None):
 
     """
     Clears the contents of specific tables in the cricket_db database.
@@ -537,6 +1642,9 @@ def clear_contents(cnx: mysql.connector.connection_cext.CMySQLConnection ):
     Parameters:
     ------------
         - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - tables (list, optional): Tables to truncate. Defaults to players, teams, match_info, innings_info,
+          the delivery detail tables (wickets, wicket_fielders, extras) and the rollup tables (over_summary,
+          innings_summary).
 
     Returns:
     -----------
@@ -544,7 +1652,8 @@ def clear_contents(cnx: mysql.connector.connection_cext.CMySQLConnection ):
     """
 
 
-    tables = ['players','teams','match_info','innings_info']
+    if tables is None:
+        tables = ['players','teams','match_info','innings_info'] + DELIVERY_DETAIL_TABLES + ROLLUP_TABLES
     for table in tables:
         cursor = cnx.cursor()
 
@@ -0,0 +1,162 @@
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+
+
+#stages that talk to the database; their time is reported as db_seconds / db_share
+DB_STAGES = {
+    'write_players', 'write_teams', 'write_match_info', 'write_innings_info', 'write_delivery_details', 'write_rollups',
+    'delete_match', 'summaries', 'manifest', 'commit',
+}
+
+
+###############################################
+def time_stage(timings: dict, stage: str, function, *args, **kwargs):
+    """
+    Calls function, adding its wall time to timings[stage] unless timings is None.
+    """
+    if timings is None:
+        return function(*args, **kwargs)
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+    return result
+
+
+class IngestMetrics:
+    """
+    Per-stage timers and per-table row counters for an ingest run.
+
+    Per file, the parse stages (decode, parse_team_player_info, parse_match_info, parse_innings_info) are timed in the
+    parse workers (see functions.parse_match_members with timed=True), the writes by write_parsed_match(timings=...),
+    and anything else with time(). Each file's timings dict is handed to add_file.
+
+    Parameters:
+    ------------
+        enabled (bool): When False the caller parses untimed and passes timings=None, so the timed functions skip their
+                        clock calls; time() then calls straight through and timed_iter returns its iterable unchanged.
+                        Row counts are kept either way.
+
+    Example:
+    -----------
+        metrics = IngestMetrics()
+        for parsed, timings in parse_match_members(members, timed=True):
+            counts = write_parsed_match(*parsed, cnx=cnx, timings=timings)
+            metrics.time(timings, 'commit', cnx.commit)
+            metrics.add_file(timings, counts)
+        metrics.write_summary('ingest_metrics.json')
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.files = 0
+        self.samples = defaultdict(list) #stage -> seconds per file
+        self.rows = defaultdict(lambda: [0, 0]) #table -> [rows written, rows skipped]
+        self._start = time.perf_counter()
+        self._stop = None
+
+    def time(self, timings: dict, stage: str, function, *args, **kwargs):
+        """
+        See time_stage.
+        """
+        return time_stage(timings, stage, function, *args, **kwargs)
+
+    def timed_iter(self, stage: str, iterable):
+        """
+        Yields from iterable, recording the time each item takes to produce as one sample of stage.
+        """
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(stage, iterable)
+
+    def _timed_iter(self, stage: str, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.samples[stage].append(time.perf_counter() - start)
+            yield item
+
+    def add_rows(self, counts: dict):
+        """
+        Adds a table -> (rows_written, rows_skipped) dict, as returned by write_parsed_match.
+        """
+        for table, (rows_written, rows_skipped) in counts.items():
+            self.rows[table][0] += rows_written
+            self.rows[table][1] += rows_skipped
+
+    def add_file(self, timings: dict, counts: dict = None):
+        """
+        Records one file: its stage timings (None when disabled) and optionally its row counts.
+        """
+        self.files += 1
+        if timings:
+            for stage, seconds in timings.items():
+                self.samples[stage].append(seconds)
+        if counts:
+            self.add_rows(counts)
+
+    def stop(self):
+        """
+        Fixes the end of the run for total_seconds; summary() calls it if it has not been called.
+        """
+        if self._stop is None:
+            self._stop = time.perf_counter()
+
+    def summary(self):
+        """
+        Returns a JSON-serializable summary of the run.
+
+        Notes:
+        ------------
+            - share_of_total is a stage's total over the run's wall time. The parse stages run in worker processes
+              alongside the main loop, so their shares can add up to more than 1.
+            - rows_per_second is over the run's wall time, write_rows_per_second over the table's own write stage.
+        """
+        self.stop()
+        total_seconds = self._stop - self._start
+        stages = {}
+        for stage, samples in self.samples.items():
+            p50, p95 = np.percentile(samples, [50, 95])
+            stages[stage] = {
+                "files": len(samples),
+                "total_seconds": float(sum(samples)),
+                "p50_seconds": float(p50),
+                "p95_seconds": float(p95),
+                "share_of_total": float(sum(samples)) / total_seconds if total_seconds else None,
+            }
+
+        tables = {}
+        for table, (rows_written, rows_skipped) in self.rows.items():
+            write_seconds = stages.get('write_' + table, {}).get('total_seconds')
+            tables[table] = {
+                "rows_written": rows_written,
+                "rows_skipped": rows_skipped,
+                "rows_per_second": rows_written / total_seconds if total_seconds else None,
+                "write_rows_per_second": rows_written / write_seconds if write_seconds else None,
+            }
+
+        db_seconds = sum(stage["total_seconds"] for name, stage in stages.items() if name in DB_STAGES)
+        return {
+            "files": self.files,
+            "total_seconds": total_seconds,
+            "files_per_second": self.files / total_seconds if total_seconds else None,
+            "db_seconds": db_seconds if self.enabled else None,
+            "db_share": db_seconds / total_seconds if self.enabled and total_seconds else None,
+            "stages": stages,
+            "tables": tables,
+        }
+
+    def write_summary(self, path: str):
+        """
+        Writes summary() to path as JSON and returns it.
+        """
+        summary = self.summary()
+        with open(path, 'w') as file:
+            json.dump(summary, file, indent=2)
+        return summary
@@ -0,0 +1,230 @@
+import os
+import argparse
+from urllib.parse import quote
+
+import pandas as pd
+
+from deliveries import DeliveryStore
+
+
+PARTITION_COLUMNS = ['season', 'gender']
+
+#compact dtypes: categoricals for repeated names, small ints for runs and overs
+MATCH_INFO_DTYPES = {
+    "match_id": "int64",
+    "balls_per_over": "int8",
+    "city": "category",
+    "match_name": "category",
+    "match_number": "Int16",
+    "match_type": "category",
+    "match_type_number": "Int32",
+    "winner": "category",
+    "decision_by": "category",
+    "overs": "int16",
+    "player_of_match": "category",
+    "team1": "category",
+    "team1_id": "Int32",
+    "team2": "category",
+    "team2_id": "Int32",
+    "team_type": "category",
+    "toss_decision": "category",
+    "toss_winner": "category",
+    "venue": "category",
+}
+
+INNINGS_INFO_DTYPES = {
+    "team": "category",
+    "over_num": "int16",
+    "batter": "category",
+    "bowler": "category",
+    "non_striker": "category",
+    "batter_runs": "int8",
+    "extra_runs": "int8",
+    "delivery_num": "int16",
+    "innings_num": "int8",
+    "ball_in_over": "int8",
+    "is_legal": "int8",
+    "legal_balls": "int16",
+    "team_score": "int16",
+    "team_wickets": "int8",
+    "run_rate": "float32",
+    "is_dot": "int8",
+    "is_boundary": "int8",
+    "match_id": "int64",
+}
+
+PLAYER_DTYPES = {
+    "player_name": "category",
+}
+
+
+###############################################
+def compact_frame(df: pd.DataFrame, dtypes: dict):
+    """
+    Casts the columns of df that appear in dtypes to their compact dtype; other columns are left alone.
+    """
+    dtypes = {column: dtype for column, dtype in dtypes.items() if column in df.columns}
+    for column, dtype in dtypes.items():
+        #rows merged from a partition written before the column existed are missing, which needs a nullable integer
+        if dtype.startswith('int') and df[column].isna().any():
+            dtypes[column] = dtype.capitalize()
+    df = df.astype(dtypes)
+    for column, dtype in dtypes.items():
+        if dtype == 'category' and column in df.columns:
+            df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def _write_parquet(df: pd.DataFrame, path: str):
+    """
+    Writes df to path through a temporary file so readers never see a half-written partition.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    df.to_parquet(temp_path, index=False)
+    os.replace(temp_path, path)
+
+
+class ParquetSink:
+    """
+    Columnar alternative to the write_* functions. Buffers parsed matches and writes 'match_info' and 'innings_info'
+    as Parquet datasets partitioned by season and gender (hive layout, e.g. match_info/season=2018%2F19/gender=male/),
+    plus unpartitioned 'players' and 'teams' tables.
+
+    Parameters:
+    ------------
+        root_dir (str): Directory holding one sub-directory per table.
+        rows_per_flush (int): Number of buffered deliveries that triggers a flush.
+
+    Notes:
+    ------------
+        - Only partitions that receive matches in a flush are rewritten. A partition is merged with its existing file,
+          replacing any match with the same match_id, so re-exporting a changed match leaves every other partition untouched.
+        - match_info_df must carry a 'match_id' column (see functions.parse_match_data).
+        - Buffered deliveries are held in a deliveries.DeliveryStore, so a full buffer takes a fraction of the
+          memory of the innings frames it was given.
+
+    Example:
+    -----------
+        sink = ParquetSink('cricket_parquet')
+        for team_df, player_df, match_info_df, innings_df, _, _ in parse_match_members(iter_archive_members('odis_json.zip')):
+            sink.add(team_df, player_df, match_info_df, innings_df)
+        sink.flush()
+
+        deliveries = pd.read_parquet('cricket_parquet/innings_info', filters=[('season', '=', '2019')])
+    """
+
+    def __init__(self, root_dir: str, rows_per_flush: int = 500000):
+        self.root_dir = root_dir
+        self.rows_per_flush = rows_per_flush
+        self._buffers = {'teams': [], 'players': [], 'match_info': []}
+        self._deliveries = DeliveryStore()
+
+    def add(self, team_df: pd.DataFrame, player_df: pd.DataFrame, match_info_df: pd.DataFrame, innings_df: pd.DataFrame):
+        """
+        Buffers one parsed match, flushing if rows_per_flush is reached.
+
+        Returns:
+        -----------
+            list of the partition files rewritten by a flush this call triggered (empty otherwise)
+        """
+        if 'match_id' not in match_info_df.columns:
+            raise ValueError("match_info_df needs a 'match_id' column to be written to Parquet")
+
+        self._buffers['teams'].append(team_df)
+        self._buffers['players'].append(player_df)
+        self._buffers['match_info'].append(match_info_df)
+        balls_per_over = int(match_info_df['balls_per_over'].iloc[0]) if 'balls_per_over' in match_info_df.columns else 6
+        self._deliveries.add_frame(innings_df, player_df, balls_per_over=balls_per_over)
+
+        if len(self._deliveries) >= self.rows_per_flush:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """
+        Writes every buffered match.
+
+        Returns:
+        -----------
+            list of the files rewritten
+        """
+        if not self._buffers['match_info']:
+            return []
+
+        buffers = {table: pd.concat(frames, ignore_index=True) for table, frames in self._buffers.items()}
+        buffers['innings_info'] = self._deliveries.to_frame(categorical=True)
+        self._buffers = {table: [] for table in self._buffers}
+        self._deliveries.clear()
+
+        match_info_df = buffers['match_info']
+        innings_df = buffers['innings_info'].merge(match_info_df[['match_id'] + PARTITION_COLUMNS], on='match_id', how='left')
+
+        written = []
+        for (season, gender), partition_df in match_info_df.groupby(PARTITION_COLUMNS, sort=False):
+            written.append(self._merge_partition('match_info', season, gender, partition_df, MATCH_INFO_DTYPES))
+        for (season, gender), partition_df in innings_df.groupby(PARTITION_COLUMNS, sort=False):
+            written.append(self._merge_partition('innings_info', season, gender, partition_df, INNINGS_INFO_DTYPES))
+
+        written.append(self._merge_dimension('players', buffers['players'], 'registryID', PLAYER_DTYPES))
+        written.append(self._merge_dimension('teams', buffers['teams'], 'team', {}))
+        return written
+
+    def partition_path(self, table_name: str, season: str, gender: str):
+        """
+        Returns the file holding one season/gender partition of a table.
+        """
+        return os.path.join(self.root_dir, table_name, 'season={}'.format(quote(str(season), safe='')),
+                            'gender={}'.format(quote(str(gender), safe='')), 'part-0.parquet')
+
+    def _merge_partition(self, table_name: str, season: str, gender: str, partition_df: pd.DataFrame, dtypes: dict):
+        path = self.partition_path(table_name, season, gender)
+        partition_df = partition_df.drop(columns=PARTITION_COLUMNS)
+        if os.path.exists(path):
+            existing_df = pd.read_parquet(path)
+            existing_df = existing_df[~existing_df['match_id'].isin(partition_df['match_id'])]
+            partition_df = pd.concat([existing_df.astype(object), partition_df.astype(object)], ignore_index=True)
+
+        _write_parquet(compact_frame(partition_df.sort_values('match_id', kind='stable'), dtypes), path)
+        return path
+
+    def _merge_dimension(self, table_name: str, df: pd.DataFrame, key_column: str, dtypes: dict):
+        path = os.path.join(self.root_dir, table_name, 'part-0.parquet')
+        if os.path.exists(path):
+            df = pd.concat([pd.read_parquet(path).astype(object), df.astype(object)], ignore_index=True)
+
+        _write_parquet(compact_frame(df.drop_duplicates(key_column).reset_index(drop=True), dtypes), path)
+        return path
+
+
+def export_to_parquet(parsed_matches, root_dir: str, rows_per_flush: int = 500000):
+    """
+    Writes the tuples produced by functions.parse_match_members (or parse_match_files) to a ParquetSink rooted
+    at root_dir. The delivery detail frames (wickets, wicket_fielders, extras) and the rollups are not exported.
+
+    Returns:
+    -----------
+        number of matches written
+    """
+    sink = ParquetSink(root_dir, rows_per_flush=rows_per_flush)
+    n_matches = 0
+    for team_df, player_df, match_info_df, innings_df, _, _ in parsed_matches:
+        sink.add(team_df, player_df, match_info_df, innings_df)
+        n_matches += 1
+    sink.flush()
+    return n_matches
+
+
+if __name__ == "__main__":
+    from functions import parse_match_members
+    from sources import iter_archive_members
+
+    parser = argparse.ArgumentParser(description="Export a Cricsheet archive to partitioned Parquet datasets.")
+    parser.add_argument('archive', help="path to a Cricsheet zip archive, e.g. odis_json.zip")
+    parser.add_argument('root_dir', help="output directory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="parse worker processes")
+    parser.add_argument('--chunk-size', type=int, default=16, help="files handed to a worker at a time")
+    args = parser.parse_args()
+
+    parsed_matches = parse_match_members(iter_archive_members(args.archive), max_workers=args.workers, chunk_size=args.chunk_size)
+    print("{} matches written to {}".format(export_to_parquet(parsed_matches, args.root_dir), args.root_dir))
@@ -0,0 +1,256 @@
+import queue
+import threading
+
+import pandas as pd
+
+from functions import parse_match_members
+
+
+###############################################
+def parsed_rows(parsed: tuple):
+    """
+    Returns the number of rows in the frames of a parsed match (see functions.parse_match_data), deliveries, delivery
+    details and rollups included.
+    """
+    return sum(len(df) for df in _parsed_frames(parsed))
+
+
+def parsed_nbytes(parsed: tuple):
+    """
+    Returns the bytes held by the columns of the frames of a parsed match. Costs about a sixth of the parse time of
+    the match, so byte budgets are only measured when one is set.
+    """
+    return sum(column.nbytes for df in _parsed_frames(parsed) if len(df) for _, column in df.items())
+
+
+def _parsed_frames(parsed: tuple):
+    for item in parsed:
+        if isinstance(item, pd.DataFrame):
+            yield item
+        elif isinstance(item, dict):
+            yield from item.values()
+
+
+class FlushBudget:
+    """
+    Counts the parsed matches added since the last flush against a match, row and byte budget (see parsed_rows and
+    parsed_nbytes); a budget left as None is unbounded. The writer flushes (commits, or loads what it has staged)
+    whenever add() reports the budget reached, so what is pending between flushes stays bounded however large the
+    archive is, and a corpus of long-form matches does not build bigger transactions than one of ODIs.
+
+    Parameters:
+    ------------
+        max_matches (int, optional): Matches per flush.
+        max_rows (int, optional): Rows per flush, over every table of the matches.
+        max_bytes (int, optional): Bytes of parsed frames per flush.
+
+    Example:
+    -----------
+        budget = FlushBudget(max_rows=100000)
+        for parsed in parse_match_members(members):
+            backend.write_match(*parsed)
+            if budget.add(parsed):
+                backend.commit()
+                budget.reset()
+        backend.commit()
+    """
+
+    def __init__(self, max_matches: int = None, max_rows: int = None, max_bytes: int = None):
+        self.max_matches = max_matches
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.reset()
+
+    def add(self, parsed: tuple):
+        """
+        Counts a parsed match and returns whether the budget is reached.
+        """
+        self.matches += 1
+        self.rows += parsed_rows(parsed)
+        if self.max_bytes is not None:
+            self.nbytes += parsed_nbytes(parsed)
+        return self.reached()
+
+    def reached(self):
+        return any(limit is not None and used >= limit for used, limit in
+                   ((self.matches, self.max_matches), (self.rows, self.max_rows), (self.nbytes, self.max_bytes)))
+
+    def reset(self):
+        self.matches = 0
+        self.rows = 0
+        self.nbytes = 0
+
+
+###############################################
+class BackgroundIterator:
+    """
+    Runs an iterable in a background thread and hands its items over through a bounded queue, so the producer
+    works ahead of the consumer by at most max_buffered items (backpressure) instead of waiting for each next() call.
+    With max_buffered_bytes the items buffered are also bounded by their total size, as measured by sizeof, so a
+    run of large items (e.g. Test matches) holds no more memory than a run of small ones.
+
+    Parameters:
+    ------------
+        iterable: Any iterable; generators are closed in the background thread when it stops.
+        max_buffered (int): Queue size.
+        upstream (list, optional): BackgroundIterators feeding iterable, closed along with this one.
+        name (str, optional): Thread name.
+        max_buffered_bytes (int, optional): Size budget of the buffered items. An item larger than the whole budget
+            is still handed over, once the buffer is empty.
+        sizeof (optional): Function returning the size of an item; required with max_buffered_bytes.
+
+    Notes:
+    ------------
+        - An exception raised by the producer is re-raised by the consumer's next() call, after the items produced
+          before it.
+        - close() (or leaving a with block) stops the producer and every upstream stage. Call it when the consumer
+          fails, so the background threads do not stay blocked on a full queue.
+
+    Example:
+    -----------
+        with BackgroundIterator(iter_archive_members('odis_json.zip'), max_buffered=64) as members:
+            for member_name, raw in members:
+                ...
+    """
+
+    _ITEM, _DONE, _ERROR = range(3)
+
+    def __init__(self, iterable, max_buffered: int = 16, upstream: list = None, name: str = None,
+                 max_buffered_bytes: int = None, sizeof=None):
+        if max_buffered_bytes is not None and sizeof is None:
+            raise ValueError("max_buffered_bytes needs a sizeof function")
+        self.upstream = upstream or []
+        self.max_buffered_bytes = max_buffered_bytes
+        self.buffered_bytes = 0
+        self._sizeof = sizeof
+        self._room = threading.Condition()
+        self._queue = queue.Queue(maxsize=max_buffered)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._produce, args=(iterable,), name=name, daemon=True)
+        self._thread.start()
+
+    def _reserve(self, size: int):
+        #wait until size fits in the byte budget (or nothing is buffered), but give up once the consumer has closed
+        with self._room:
+            while self.buffered_bytes and self.buffered_bytes + size > self.max_buffered_bytes:
+                if self._stop.is_set():
+                    return False
+                self._room.wait(timeout=0.1)
+            self.buffered_bytes += size
+        return True
+
+    def _release(self, size: int):
+        with self._room:
+            self.buffered_bytes -= size
+            self._room.notify()
+
+    def _put(self, entry: tuple):
+        #wait for room, but give up once the consumer has closed the pipeline
+        while not self._stop.is_set():
+            try:
+                self._queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, iterable):
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                size = 0
+                if self.max_buffered_bytes is not None:
+                    size = self._sizeof(item)
+                    if not self._reserve(size):
+                        break
+                if not self._put((self._ITEM, item, size)):
+                    break
+            else:
+                self._put((self._DONE, None, 0))
+        except BaseException as error:
+            self._put((self._ERROR, error, 0))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        kind, value, size = self._queue.get()
+        if kind == self._ITEM:
+            if size:
+                self._release(size)
+            return value
+        self._finished = True
+        self._thread.join()
+        if kind == self._ERROR:
+            self.close()
+            raise value
+        raise StopIteration
+
+    def close(self):
+        """
+        Stops the producer thread and the upstream stages. Safe to call more than once.
+        """
+        self._finished = True
+        self._stop.set()
+        #unblock a producer waiting on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+        for stage in self.upstream:
+            stage.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def pipelined_parse(members, max_workers: int = 1, chunk_size: int = 1, decoder: str = None, timed: bool = False,
+                    read_ahead: int = 64, parse_ahead: int = 32, read_ahead_bytes: int = None, parse_ahead_bytes: int = None):
+    """
+    Overlaps reading, parsing and writing: a reader thread pulls (member_name, raw_bytes) pairs out of members,
+    a parse thread feeds them to functions.parse_match_members (worker processes when max_workers != 1), and the
+    caller writes the parsed matches as they arrive. Each hand-over is a bounded queue, so at most read_ahead raw
+    files and parse_ahead parsed matches (plus the chunks in the worker processes) are held at once, and the run
+    goes at the pace of its slowest stage. read_ahead_bytes and parse_ahead_bytes also bound the two queues by size
+    (raw file bytes, and parsed_nbytes of the parsed matches). The worker processes are started from the parse thread,
+    so they use the forkserver (or spawn) start method: a script calling this with max_workers != 1 needs an
+    if __name__ == "__main__" guard.
+
+    Parameters:
+    ------------
+        - members: (member_name, raw_bytes) pairs, e.g. sources.iter_archive_members(archive).
+        - max_workers, chunk_size, decoder, timed: Passed to functions.parse_match_members.
+        - read_ahead (int): Raw files buffered between the reader and the parser.
+        - parse_ahead (int): Parsed matches buffered between the parser and the writer.
+        - read_ahead_bytes, parse_ahead_bytes (int, optional): Size budgets of the same two queues.
+
+    Returns:
+    -----------
+        - BackgroundIterator over what parse_match_members yields, in member order. Close it (or use it in a with
+          block) if the writer fails, which stops the reader and the parser too.
+    """
+    reader = BackgroundIterator(members, max_buffered=read_ahead, name='ingest-reader', max_buffered_bytes=read_ahead_bytes,
+                                sizeof=_member_nbytes)
+    parsed_matches = parse_match_members(reader, max_workers=max_workers, chunk_size=chunk_size, decoder=decoder, timed=timed)
+    return BackgroundIterator(parsed_matches, max_buffered=parse_ahead, upstream=[reader], name='ingest-parser',
+                              max_buffered_bytes=parse_ahead_bytes, sizeof=_timed_parsed_nbytes if timed else parsed_nbytes)
+
+
+def _member_nbytes(member: tuple):
+    return len(member[1])
+
+
+def _timed_parsed_nbytes(item: tuple):
+    return parsed_nbytes(item[0])
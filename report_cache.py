@@ -0,0 +1,264 @@
+import os
+import uuid
+import pickle
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+
+#single-row table holding the data version watermark: ingest bumps it in every commit that writes, replaces or deletes
+#matches (see bump_data_version), so a cached report result is current exactly while the version it was computed at is.
+#Pooled matches are committed by the writer pool's connections and announced by the coordinating one as soon as it sees
+#them done, and again when their summary changes are folded in. The epoch is drawn at random when the row is created,
+#so two databases, or a database dropped and re-created, never share cache entries even at the same version
+DATA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS data_version (
+    id TINYINT NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    epoch CHAR(32)
+) """
+
+
+###############################################
+def create_data_version_table(cnx):
+    """
+    Creates the data_version table and its row, if they do not exist, and gives the row an epoch if it was created
+    without one. Does not commit.
+    """
+    cursor = cnx.cursor()
+    cursor.execute(DATA_VERSION_DDL)
+    try:
+        cursor.execute("SELECT epoch FROM data_version")
+        cursor.fetchall()
+    except Exception:
+        #a table created before the epoch was added
+        cursor.execute("ALTER TABLE data_version ADD COLUMN epoch CHAR(32)")
+    cursor.execute("INSERT IGNORE INTO data_version (id, version, epoch) VALUES (1, 0, %s)", (uuid.uuid4().hex,))
+    cursor.execute("UPDATE data_version SET epoch = %s WHERE id = 1 AND epoch IS NULL", (uuid.uuid4().hex,))
+    cursor.close()
+
+
+def bump_data_version(cnx):
+    """
+    Increments the data version. Does not commit: call it in the transaction whose changes it announces, just before
+    the commit, and from one connection only; concurrent writers (see writer_pool.WriterPool) would otherwise all
+    queue on its row lock.
+    """
+    cursor = cnx.cursor()
+    cursor.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+    cursor.close()
+
+
+def read_data_version(cnx):
+    """
+    Returns the current data version, or None when the data_version table does not exist yet (the database was
+    loaded before it was introduced).
+    """
+    watermark = read_data_watermark(cnx)
+    return None if watermark is None else watermark[1]
+
+
+def read_data_watermark(cnx):
+    """
+    Returns the (epoch, version) pair of the database, or None when the data_version table or its epoch does not
+    exist yet (see create_data_version_table); results are then not cached.
+    """
+    cursor = cnx.cursor()
+    try:
+        cursor.execute("SELECT epoch, version FROM data_version WHERE id = 1")
+        rows = cursor.fetchall()
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+    return tuple(rows[0]) if rows and rows[0][0] is not None else None
+
+
+###############################################
+class ReportCache:
+    """
+    Result cache of the report queries, keyed by the database's epoch, query text and parameters and tagged with the
+    data version the result was computed at (see read_data_watermark). A lookup at another version is a miss that
+    drops the stale entry, so a new ingest invalidates every result without any explicit call, and one directory can
+    serve several databases.
+
+    Results (the fetched rows) are kept pickled in memory and, when directory is given, in one file per entry on disk,
+    so later processes (e.g. a dashboard polling the report command) start warm. Both levels are LRU-bounded by size.
+
+    Parameters:
+    ------------
+        directory (str, optional): Where entries are persisted. None keeps them in memory only.
+        max_memory_bytes (int): Budget of the in-memory entries.
+        max_disk_bytes (int): Budget of the files under directory; least recently used files are removed first.
+
+    Attributes:
+    ------------
+        hits, misses (int): Lookups served from the cache / run against the database.
+        disk_hits (int): The hits that had to be read back from disk.
+        invalidations (int): Entries dropped because the data version moved on.
+        evictions (int): Entries dropped to stay within a size budget (memory and disk).
+
+    Example:
+    -----------
+        cache = ReportCache('.report_cache')
+        df = best_team_report(cnx, season='2019', cache=cache)  #runs the query
+        df = best_team_report(cnx, season='2019', cache=cache)  #served from memory until the next ingest commits
+        cache.stats()
+    """
+
+    def __init__(self, directory: str = None, max_memory_bytes: int = 16 * 1024 ** 2, max_disk_bytes: int = 256 * 1024 ** 2):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict() #key -> (version, pickled rows), least recently used first
+        self._memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.invalidations = 0
+        self.evictions = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(query: str, params: tuple, epoch: str = None):
+        return hashlib.sha256(repr((epoch, query, tuple(params))).encode('utf-8')).hexdigest()
+
+    def fetch(self, query: str, params: tuple, cnx, run):
+        """
+        Returns the rows of query at the current data version, calling run() (which fetches them from cnx) on a miss.
+        """
+        watermark = read_data_watermark(cnx)
+        if watermark is None:
+            self.misses += 1
+            return run()
+        epoch, version = watermark
+        key = self.key(query, params, epoch)
+        rows = self.get(key, version)
+        if rows is None:
+            self.misses += 1
+            rows = run()
+            self.put(key, version, rows)
+        else:
+            self.hits += 1
+        return rows
+
+    def get(self, key: str, version: int):
+        """
+        Returns the cached rows of key at version, or None.
+        """
+        entry = self._entries.get(key)
+        from_disk = entry is None and self.directory is not None
+        if from_disk:
+            entry = self._read_file(key)
+        if entry is None:
+            return None
+        entry_version, payload = entry
+        if entry_version != version:
+            self.invalidations += 1
+            self._discard(key)
+            return None
+        if from_disk:
+            self.disk_hits += 1
+            self._remember(key, entry)
+        else:
+            self._entries.move_to_end(key)
+            if self.directory is not None:
+                self._touch(key)
+        return pickle.loads(payload)
+
+    def put(self, key: str, version: int, rows: list):
+        entry = (version, pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL))
+        self._remember(key, entry)
+        if self.directory is not None:
+            self._write_file(key, entry)
+
+    def clear(self):
+        """
+        Drops every entry, in memory and on disk.
+        """
+        for key in list(self._entries) + self._file_keys():
+            self._discard(key)
+
+    def stats(self):
+        """
+        Returns the counters plus the entry count and bytes used in memory.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "disk_hits": self.disk_hits,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "memory_entries": len(self._entries),
+            "memory_bytes": self._memory_bytes,
+        }
+
+    def _remember(self, key: str, entry: tuple):
+        if key in self._entries:
+            self._memory_bytes -= len(self._entries.pop(key)[1])
+        self._entries[key] = entry
+        self._memory_bytes += len(entry[1])
+        while self._memory_bytes > self.max_memory_bytes and self._entries:
+            _, (_, payload) = self._entries.popitem(last=False)
+            self._memory_bytes -= len(payload)
+            self.evictions += 1
+
+    def _discard(self, key: str):
+        if key in self._entries:
+            self._memory_bytes -= len(self._entries.pop(key)[1])
+        if self.directory is not None:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _file_keys(self):
+        if self.directory is None:
+            return []
+        return [name[:-len('.pkl')] for name in os.listdir(self.directory) if name.endswith('.pkl')]
+
+    def _read_file(self, key: str):
+        try:
+            with open(self._path(key), 'rb') as file:
+                entry = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        self._touch(key)
+        return entry
+
+    def _touch(self, key: str):
+        #the file's mtime is its last use, which _evict_files orders by
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _write_file(self, key: str, entry: tuple):
+        #write to a temporary file and rename it, so a concurrent reader never sees a partial entry
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self._path(key))
+        self._evict_files()
+
+    def _evict_files(self):
+        files = []
+        for key in self._file_keys():
+            try:
+                stat = os.stat(self._path(key))
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, key))
+        total = sum(size for _, size, _ in files)
+        for _, size, key in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(self._path(key))
+            total -= size
+            self.evictions += 1
@@ -0,0 +1,636 @@
+#report queries for the ingest tables, plus the summary tables ingest maintains so the reports need not rescan them.
+#pandas is imported only inside the functions that build DataFrames, so running a report stays cheap to import.
+#the *_frame functions answer the same questions from parsed frames or the Parquet export, without a database.
+from report_cache import ReportCache, bump_data_version, read_data_version
+
+
+###############################################
+#Q2a: win percentage of every team by season and gender
+WIN_PERCENTAGE_QUERY = """ WITH temp AS(
+(SELECT
+	season,
+	gender,
+	team1 as team,
+	team1_id as team_id,
+	winner
+FROM match_info mi)
+UNION ALL
+(SELECT
+	season,
+	gender,
+	team2 as team,
+	team2_id as team_id,
+	winner
+FROM match_info))
+
+
+SELECT
+	season,
+	gender,
+	team,
+	SUM(CASE WHEN team = winner THEN 1 ELSE 0 END) as num_wins,
+	COUNT(*) as total_games_played_excluding,
+	SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 as win_percentage
+FROM temp
+GROUP BY 1,2,3
+ORDER BY season, gender, SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 DESC """
+
+#Q2b: team with the best win percentage per gender for a season
+BEST_TEAM_QUERY = """ WITH temp AS(
+(SELECT
+	season,
+	gender,
+	team1 as team,
+	team1_id as team_id,
+	winner
+FROM match_info mi)
+UNION ALL
+(SELECT
+	season,
+	gender,
+	team2 as team,
+	team2_id as team_id,
+	winner
+FROM match_info)),
+
+win_pct AS(
+SELECT
+	season,
+	gender,
+	team,
+	SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 as win_percentage,
+	ROW_NUMBER() OVER(PARTITION BY gender ORDER BY SUM(CASE WHEN team = winner THEN 1 ELSE 0 END)*1.0/COUNT(*)*1.0 DESC) as ranking
+FROM temp
+WHERE season = %s -- not sure how seasons work in cricket, i have 2019 alone and 2018/19 and 2019/20...
+GROUP BY 1,2,3)
+
+SELECT
+	season,
+	gender,
+	team as team_with_best_win_pctg
+FROM win_pct
+WHERE ranking = 1 """
+
+#Q2c: batter with the highest strike rate for a season
+TOP_STRIKE_RATE_QUERY = """ WITH temp AS(
+SELECT
+	season,
+	batter,
+	COUNT(innings_id) as times_bowled_to, -- each innings_id should represent a pitch/delivery
+	SUM(batter_runs) as runs_from_batting, -- extra runs are a separate column/FIELD
+	(SUM(batter_runs)*1.0/COUNT(innings_id)*1.0) as strike_rate,
+	ROW_NUMBER() OVER(ORDER BY SUM(batter_runs)*1.0/COUNT(innings_id)*1.0 DESC ) as ranking
+FROM innings_info
+LEFT JOIN match_info ON innings_info.match_id = match_info.match_id
+WHERE season = %s
+GROUP BY season, batter)
+
+SELECT
+	batter
+FROM temp
+WHERE ranking = 1"""
+
+
+###############################################
+#the same reports read from the summary tables
+SUMMARY_WIN_PERCENTAGE_QUERY = """
+SELECT
+	season,
+	gender,
+	team,
+	wins as num_wins,
+	games as total_games_played_excluding,
+	wins*1.0/games as win_percentage
+FROM team_season_summary
+WHERE games > 0
+ORDER BY season, gender, wins*1.0/games DESC """
+
+SUMMARY_BEST_TEAM_QUERY = """ WITH win_pct AS(
+SELECT
+	season,
+	gender,
+	team,
+	ROW_NUMBER() OVER(PARTITION BY gender ORDER BY wins*1.0/games DESC) as ranking
+FROM team_season_summary
+WHERE season = %s AND games > 0)
+
+SELECT
+	season,
+	gender,
+	team as team_with_best_win_pctg
+FROM win_pct
+WHERE ranking = 1 """
+
+SUMMARY_TOP_STRIKE_RATE_QUERY = """ WITH temp AS(
+SELECT
+	batter,
+	ROW_NUMBER() OVER(ORDER BY runs*1.0/balls_faced DESC) as ranking
+FROM batter_season_summary
+WHERE season = %s AND balls_faced > 0)
+
+SELECT
+	batter
+FROM temp
+WHERE ranking = 1"""
+
+
+###############################################
+SUMMARY_TABLES = ['team_season_summary', 'batter_season_summary']
+
+#journal of summary changes not yet applied to SUMMARY_TABLES (see queue_summary_deltas and fold_summary_deltas)
+SUMMARY_DELTA_TABLES = ['team_season_summary_delta', 'batter_season_summary_delta']
+
+SUMMARY_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS team_season_summary (
+        season VARCHAR(16) NOT NULL,
+        gender VARCHAR(16) NOT NULL,
+        team VARCHAR(128) NOT NULL,
+        wins INT NOT NULL DEFAULT 0,
+        games INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (season, gender, team)
+    ) """,
+    """
+    CREATE TABLE IF NOT EXISTS batter_season_summary (
+        season VARCHAR(16) NOT NULL,
+        batter VARCHAR(128) NOT NULL,
+        balls_faced INT NOT NULL DEFAULT 0,
+        runs INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (season, batter)
+    ) """,
+    """
+    CREATE TABLE IF NOT EXISTS team_season_summary_delta (
+        delta_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        season VARCHAR(16) NOT NULL,
+        gender VARCHAR(16) NOT NULL,
+        team VARCHAR(128) NOT NULL,
+        wins INT NOT NULL,
+        games INT NOT NULL
+    ) """,
+    """
+    CREATE TABLE IF NOT EXISTS batter_season_summary_delta (
+        delta_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        season VARCHAR(16) NOT NULL,
+        batter VARCHAR(128) NOT NULL,
+        balls_faced INT NOT NULL,
+        runs INT NOT NULL
+    ) """,
+]
+
+_UPSERT_TEAM_SUMMARY = """
+INSERT INTO team_season_summary (season, gender, team, wins, games) VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE wins = wins + VALUES(wins), games = games + VALUES(games) """
+
+_UPSERT_BATTER_SUMMARY = """
+INSERT INTO batter_season_summary (season, batter, balls_faced, runs) VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE balls_faced = balls_faced + VALUES(balls_faced), runs = runs + VALUES(runs) """
+
+_DELETE_EMPTY_TEAM_SUMMARY = """
+DELETE FROM team_season_summary WHERE season = %s AND gender = %s AND team = %s AND games = 0 """
+
+_DELETE_EMPTY_BATTER_SUMMARY = """
+DELETE FROM batter_season_summary WHERE season = %s AND batter = %s AND balls_faced = 0 """
+
+_QUEUE_TEAM_SUMMARY_DELTA = """
+INSERT INTO team_season_summary_delta (season, gender, team, wins, games) VALUES (%s, %s, %s, %s, %s) """
+
+_QUEUE_BATTER_SUMMARY_DELTA = """
+INSERT INTO batter_season_summary_delta (season, batter, balls_faced, runs) VALUES (%s, %s, %s, %s) """
+
+_REBUILD_TEAM_SUMMARY = """
+INSERT INTO team_season_summary (season, gender, team, wins, games)
+SELECT season, gender, team, SUM(CASE WHEN team = winner THEN 1 ELSE 0 END), COUNT(*)
+FROM (
+    SELECT season, gender, team1 as team, winner FROM match_info
+    UNION ALL
+    SELECT season, gender, team2 as team, winner FROM match_info
+) teams_by_match
+GROUP BY season, gender, team """
+
+_REBUILD_BATTER_SUMMARY = """
+INSERT INTO batter_season_summary (season, batter, balls_faced, runs)
+SELECT season, batter, COUNT(innings_id), SUM(batter_runs)
+FROM innings_info
+LEFT JOIN match_info ON innings_info.match_id = match_info.match_id
+GROUP BY season, batter """
+
+
+def create_summary_tables(cnx):
+    """
+    Creates the summary tables if they do not exist.
+
+    Parameters:
+    ------------
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+    """
+    cursor = cnx.cursor()
+    for query in SUMMARY_TABLES_DDL:
+        cursor.execute(query)
+    cursor.close()
+
+
+def ensure_summary_tables(cnx):
+    """
+    Creates the summary tables if they do not exist, and rebuilds them (see rebuild_summary_tables) when they are
+    empty while match_info is not, e.g. on a database loaded before they existed; ingest only adds the matches it
+    writes, so the reports would otherwise cover those alone.
+
+    Parameters:
+    ------------
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+
+    Returns:
+    -----------
+        - True if the summary tables were rebuilt (and committed)
+    """
+    create_summary_tables(cnx)
+    cursor = cnx.cursor()
+    cursor.execute("SELECT 1 FROM team_season_summary LIMIT 1")
+    has_summaries = bool(cursor.fetchall())
+    cursor.execute("SELECT 1 FROM match_info LIMIT 1")
+    has_matches = bool(cursor.fetchall())
+    cursor.close()
+    if has_matches and not has_summaries:
+        rebuild_summary_tables(cnx)
+        return True
+    return False
+
+
+def summary_deltas(match_info_df, innings_df):
+    """
+    Computes what one match adds to the summary tables.
+
+    Parameters:
+    ------------
+        - match_info_df (pd.DataFrame): Parsed match info (season, gender, team1, team2, winner).
+        - innings_df (pd.DataFrame): Parsed deliveries (batter, batter_runs).
+
+    Returns:
+    -----------
+        - team_rows (list): (season, gender, team, wins, games) tuples
+        - batter_rows (list): (season, batter, balls_faced, runs) tuples
+    """
+    team_rows = []
+    for match in match_info_df[['season', 'gender', 'team1', 'team2', 'winner']].itertuples(index=False):
+        for team in (match.team1, match.team2):
+            team_rows.append((match.season, match.gender, team, int(team == match.winner), 1))
+
+    season = match_info_df['season'].iloc[0]
+    batters = innings_df.groupby('batter', sort=False)['batter_runs'].agg(['size', 'sum'])
+    batter_rows = [(season, batter, int(balls_faced), int(runs)) for batter, balls_faced, runs in batters.itertuples()]
+    return team_rows, batter_rows
+
+
+def apply_summary_deltas(team_rows: list, batter_rows: list, cnx, sign: int = 1):
+    """
+    Adds (sign=1) or subtracts (sign=-1) summary rows from the summary tables. Does not commit, so the update
+    shares the transaction of the match it describes. Rows are applied in key order, so concurrent writers (see
+    writer_pool.WriterPool) lock the summary rows they share in the same order.
+    """
+    team_rows = [row[:3] + (sign * row[3], sign * row[4]) for row in sorted(team_rows, key=lambda row: row[:3])]
+    batter_rows = [row[:2] + (sign * row[2], sign * row[3]) for row in sorted(batter_rows, key=lambda row: row[:2])]
+    cursor = cnx.cursor()
+    if team_rows:
+        cursor.executemany(_UPSERT_TEAM_SUMMARY, team_rows)
+    if batter_rows:
+        cursor.executemany(_UPSERT_BATTER_SUMMARY, batter_rows)
+    #rows a removed match leaves empty (or a folded add and remove of one match nets to nothing) are dropped, as
+    #rebuild_summary_tables would not create them
+    emptied_teams = [row[:3] for row in team_rows if row[4] <= 0]
+    if emptied_teams:
+        cursor.executemany(_DELETE_EMPTY_TEAM_SUMMARY, emptied_teams)
+    emptied_batters = [row[:2] for row in batter_rows if row[2] <= 0]
+    if emptied_batters:
+        cursor.executemany(_DELETE_EMPTY_BATTER_SUMMARY, emptied_batters)
+    cursor.close()
+
+
+def queue_summary_deltas(team_rows: list, batter_rows: list, cnx, sign: int = 1):
+    """
+    Journals summary rows in the SUMMARY_DELTA_TABLES instead of applying them. Every row is a new insert, so match
+    transactions running side by side (see writer_pool.ingest_match_unit) share no summary row locks; the journal
+    is applied by fold_summary_deltas. Does not commit.
+    """
+    cursor = cnx.cursor()
+    if team_rows:
+        cursor.executemany(_QUEUE_TEAM_SUMMARY_DELTA, [row[:3] + (sign * row[3], sign * row[4]) for row in team_rows])
+    if batter_rows:
+        cursor.executemany(_QUEUE_BATTER_SUMMARY_DELTA, [row[:2] + (sign * row[2], sign * row[3]) for row in batter_rows])
+    cursor.close()
+
+
+def fold_summary_deltas(cnx):
+    """
+    Applies the journaled summary deltas (see queue_summary_deltas) to the summary tables and deletes them, in one
+    pass per table and without committing. Only the committed deltas are read and only those are deleted, by id, so
+    writers can keep journaling meanwhile; a single connection should fold at a time.
+
+    Returns:
+    -----------
+        - number of delta rows folded
+    """
+    cursor = cnx.cursor()
+    cursor.execute("SELECT delta_id, season, gender, team, wins, games FROM team_season_summary_delta")
+    team_deltas = cursor.fetchall()
+    cursor.execute("SELECT delta_id, season, batter, balls_faced, runs FROM batter_season_summary_delta")
+    batter_deltas = cursor.fetchall()
+    cursor.close()
+
+    apply_summary_deltas(_sum_deltas(team_deltas, 3), _sum_deltas(batter_deltas, 2), cnx, sign=1)
+    cursor = cnx.cursor()
+    for table, deltas in zip(SUMMARY_DELTA_TABLES, (team_deltas, batter_deltas)):
+        delta_ids = [row[0] for row in deltas]
+        for start in range(0, len(delta_ids), 1000):
+            batch = delta_ids[start:start + 1000]
+            cursor.execute("DELETE FROM {} WHERE delta_id IN ({})".format(table, ', '.join(['%s'] * len(batch))), tuple(batch))
+    cursor.close()
+    return len(team_deltas) + len(batter_deltas)
+
+
+def _sum_deltas(deltas: list, key_length: int):
+    #(delta_id, *key, *counts) rows -> one (*key, *summed counts) row per key
+    totals = {}
+    for row in deltas:
+        key, counts = row[1:1 + key_length], row[1 + key_length:]
+        totals[key] = [total + int(count) for total, count in zip(totals.get(key, [0] * len(counts)), counts)]
+    return [key + tuple(counts) for key, counts in totals.items()]
+
+
+def add_match_to_summaries(match_info_df, innings_df, cnx, deferred: bool = False):
+    """
+    Adds a newly written match to the summary tables, or to their journal if deferred is True (see
+    queue_summary_deltas). Call it in the transaction that writes the match.
+    """
+    team_rows, batter_rows = summary_deltas(match_info_df, innings_df)
+    if deferred:
+        queue_summary_deltas(team_rows, batter_rows, cnx, sign=1)
+    else:
+        apply_summary_deltas(team_rows, batter_rows, cnx, sign=1)
+
+
+def remove_match_from_summaries(match_id: int, cnx, deferred: bool = False):
+    """
+    Subtracts a stored match from the summary tables (or journals the subtraction if deferred is True), reading its
+    rows back from match_info and innings_info. Call it before the match is deleted (see functions.delete_match),
+    in the same transaction.
+    """
+    match_id = int(match_id)
+    cursor = cnx.cursor()
+    cursor.execute("SELECT season, gender, team1, team2, winner FROM match_info WHERE match_id = %s", (match_id,))
+    matches = cursor.fetchall()
+    if not matches:
+        cursor.close()
+        return
+    season = matches[0][0]
+    cursor.execute("""
+    SELECT batter, COUNT(*), SUM(batter_runs)
+    FROM innings_info
+    WHERE match_id = %s
+    GROUP BY batter """, (match_id,))
+    batter_rows = [(season, batter, int(balls_faced), int(runs)) for batter, balls_faced, runs in cursor.fetchall()]
+    cursor.close()
+
+    team_rows = [(season, gender, team, int(team == winner), 1)
+                 for season, gender, team1, team2, winner in matches for team in (team1, team2)]
+    if deferred:
+        queue_summary_deltas(team_rows, batter_rows, cnx, sign=-1)
+    else:
+        apply_summary_deltas(team_rows, batter_rows, cnx, sign=-1)
+
+
+def rebuild_summary_tables(cnx):
+    """
+    Recomputes the summary tables from scratch out of match_info and innings_info, and commits. Journaled deltas are
+    dropped, since the stored matches already account for them.
+    """
+    cursor = cnx.cursor()
+    for table in SUMMARY_TABLES + SUMMARY_DELTA_TABLES:
+        cursor.execute("DELETE FROM {}".format(table))
+    cursor.execute(_REBUILD_TEAM_SUMMARY)
+    cursor.execute(_REBUILD_BATTER_SUMMARY)
+    cursor.close()
+    if read_data_version(cnx) is not None:
+        bump_data_version(cnx)
+    cnx.commit()
+
+
+###############################################
+def _fetch_rows(query: str, params: tuple, cnx):
+    cursor = cnx.cursor()
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    result = cursor.fetchall()
+    cursor.close()
+    return result
+
+
+def _run_report(query: str, params: tuple, columns: list, cnx, cache: ReportCache = None):
+    import pandas as pd
+
+    if cache is None:
+        result = _fetch_rows(query, params, cnx)
+    else:
+        result = cache.fetch(query, params, cnx, lambda: _fetch_rows(query, params, cnx))
+    return pd.DataFrame(result, columns=columns)
+
+
+def win_percentage_report(cnx, use_summary_tables: bool = True, cache: ReportCache = None):
+    """
+    Q2a: win percentage of every team by season and gender.
+
+    Parameters:
+    ------------
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - use_summary_tables (bool): Read team_season_summary instead of scanning match_info.
+        - cache (ReportCache, optional): Serve the result from the cache while the data version is unchanged.
+
+    Returns:
+    -----------
+        - pd.DataFrame with columns season, gender, team, num_wins, total_games_played_excluding, win_percentage
+    """
+    query = SUMMARY_WIN_PERCENTAGE_QUERY if use_summary_tables else WIN_PERCENTAGE_QUERY
+    return _run_report(query, (), ['season', 'gender', 'team', 'num_wins', 'total_games_played_excluding', 'win_percentage'], cnx, cache)
+
+
+def best_team_report(cnx, season: str = '2019', use_summary_tables: bool = True, cache: ReportCache = None):
+    """
+    Q2b: team with the best win percentage per gender for a season.
+
+    Returns:
+    -----------
+        - pd.DataFrame with columns year, gender, team
+    """
+    query = SUMMARY_BEST_TEAM_QUERY if use_summary_tables else BEST_TEAM_QUERY
+    return _run_report(query, (season,), ['year', 'gender', 'team'], cnx, cache)
+
+
+def top_strike_rate_report(cnx, season: str = '2019', use_summary_tables: bool = True, cache: ReportCache = None):
+    """
+    Q2c: batter with the highest strike rate (batter runs per delivery faced) for a season.
+
+    Returns:
+    -----------
+        - pd.DataFrame with column batter_with_highest_strikerate_<season>
+    """
+    query = SUMMARY_TOP_STRIKE_RATE_QUERY if use_summary_tables else TOP_STRIKE_RATE_QUERY
+    return _run_report(query, (season,), ['batter_with_highest_strikerate_{}'.format(season.replace('/', '_'))], cnx, cache)
+
+
+###############################################
+#the same reports computed from frames: parse_match_info/parse_innings_info output or the ParquetSink datasets
+REPORT_MATCH_COLUMNS = ['match_id', 'season', 'gender', 'team1', 'team2', 'winner']
+REPORT_INNINGS_COLUMNS = ['match_id', 'batter', 'batter_runs']
+
+
+def load_report_frames(parsed_matches):
+    """
+    Collects the columns the reports need out of the tuples produced by functions.parse_match_members
+    or parse_match_files.
+
+    Returns:
+    -----------
+        - match_info_df (pd.DataFrame): REPORT_MATCH_COLUMNS, one row per match
+        - innings_df (pd.DataFrame): REPORT_INNINGS_COLUMNS, one row per delivery
+    """
+    import pandas as pd
+
+    match_frames, innings_frames = [], []
+    for _, _, match_info_df, innings_df, _, _ in parsed_matches:
+        match_frames.append(match_info_df[REPORT_MATCH_COLUMNS])
+        innings_frames.append(innings_df[REPORT_INNINGS_COLUMNS])
+    if not match_frames:
+        return pd.DataFrame(columns=REPORT_MATCH_COLUMNS), pd.DataFrame(columns=REPORT_INNINGS_COLUMNS)
+    return pd.concat(match_frames, ignore_index=True), pd.concat(innings_frames, ignore_index=True)
+
+
+def read_parquet_report_frames(root_dir: str, season: str = None):
+    """
+    Reads the columns the reports need from a parquet_sink.ParquetSink export. With a season, only that season's
+    partitions are read.
+
+    Returns:
+    -----------
+        - match_info_df (pd.DataFrame): REPORT_MATCH_COLUMNS
+        - innings_df (pd.DataFrame): REPORT_INNINGS_COLUMNS
+    """
+    import os
+    import pandas as pd
+
+    filters = [('season', '=', season)] if season is not None else None
+    match_info_df = pd.read_parquet(os.path.join(root_dir, 'match_info'), columns=REPORT_MATCH_COLUMNS, filters=filters)
+    innings_df = pd.read_parquet(os.path.join(root_dir, 'innings_info'), columns=REPORT_INNINGS_COLUMNS, filters=filters)
+    #partition columns come back as categoricals
+    match_info_df = match_info_df.astype({'season': object, 'gender': object})
+    return match_info_df, innings_df
+
+
+def _team_results(match_info_df):
+    """
+    One row per (match, team) with a 0/1 win flag, like the temp CTE of WIN_PERCENTAGE_QUERY.
+    """
+    import numpy as np
+    import pandas as pd
+
+    season = match_info_df['season'].to_numpy(dtype=object)
+    gender = match_info_df['gender'].to_numpy(dtype=object)
+    winner = match_info_df['winner'].to_numpy(dtype=object)
+    team = np.concatenate([match_info_df['team1'].to_numpy(dtype=object), match_info_df['team2'].to_numpy(dtype=object)])
+    return pd.DataFrame({
+        'season': np.concatenate([season, season]),
+        'gender': np.concatenate([gender, gender]),
+        'team': team,
+        'win': (team == np.concatenate([winner, winner])).astype(np.int64),
+    })
+
+
+def _win_percentages(match_info_df):
+    results = _team_results(match_info_df)
+    teams = results.groupby(['season', 'gender', 'team'], sort=False)['win'].agg(['sum', 'size']).reset_index()
+    teams.columns = ['season', 'gender', 'team', 'num_wins', 'total_games_played_excluding']
+    teams['win_percentage'] = teams['num_wins'] / teams['total_games_played_excluding']
+    return teams
+
+
+def win_percentage_frame(match_info_df):
+    """
+    Q2a from frames: win percentage of every team by season and gender.
+
+    Parameters:
+    ------------
+        - match_info_df (pd.DataFrame): At least season, gender, team1, team2 and winner.
+
+    Returns:
+    -----------
+        - pd.DataFrame with the columns of win_percentage_report
+    """
+    teams = _win_percentages(match_info_df)
+    teams = teams.sort_values(['season', 'gender', 'win_percentage'], ascending=[True, True, False], kind='stable')
+    return teams.reset_index(drop=True)
+
+
+def best_team_frame(match_info_df, season: str = '2019'):
+    """
+    Q2b from frames: team with the best win percentage per gender for a season.
+
+    Returns:
+    -----------
+        - pd.DataFrame with columns year, gender, team
+    """
+    teams = _win_percentages(match_info_df[match_info_df['season'] == season])
+    teams = teams.sort_values('win_percentage', ascending=False, kind='stable').drop_duplicates('gender')
+    teams = teams.rename(columns={'season': 'year'})[['year', 'gender', 'team']]
+    return teams.sort_values('gender', kind='stable').reset_index(drop=True)
+
+
+def top_strike_rate_frame(match_info_df, innings_df, season: str = '2019'):
+    """
+    Q2c from frames: batter with the highest strike rate (batter runs per delivery faced) for a season.
+
+    Parameters:
+    ------------
+        - match_info_df (pd.DataFrame): At least match_id and season.
+        - innings_df (pd.DataFrame): At least match_id, batter and batter_runs.
+
+    Returns:
+    -----------
+        - pd.DataFrame with column batter_with_highest_strikerate_<season>
+    """
+    import pandas as pd
+
+    column = 'batter_with_highest_strikerate_{}'.format(season.replace('/', '_'))
+    season_match_ids = match_info_df.loc[match_info_df['season'] == season, 'match_id']
+    deliveries = innings_df[innings_df['match_id'].isin(season_match_ids)]
+    if deliveries.empty:
+        return pd.DataFrame(columns=[column])
+
+    batters = deliveries.groupby('batter', sort=False, observed=True)['batter_runs'].agg(['sum', 'size'])
+    strike_rate = batters['sum'].to_numpy(dtype=float) / batters['size'].to_numpy()
+    return pd.DataFrame({column: [batters.index[strike_rate.argmax()]]})
+
+
+if __name__ == "__main__":
+    import os
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Answer the season reports from a Cricsheet archive or a Parquet export, without a database.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--archive', help="path to a Cricsheet zip archive, e.g. odis_json.zip")
+    source.add_argument('--parquet', help="root directory written by parquet_sink.py")
+    parser.add_argument('--season', default='2019')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="parse worker processes (with --archive)")
+    parser.add_argument('--chunk-size', type=int, default=16, help="files handed to a worker at a time (with --archive)")
+    args = parser.parse_args()
+
+    if args.archive:
+        from functions import parse_match_members
+        from sources import iter_archive_members
+        match_info_df, innings_df = load_report_frames(
+            parse_match_members(iter_archive_members(args.archive), max_workers=args.workers, chunk_size=args.chunk_size))
+    else:
+        match_info_df, innings_df = read_parquet_report_frames(args.parquet)
+
+    print(win_percentage_frame(match_info_df))
+    print(best_team_frame(match_info_df, season=args.season))
+    print(top_strike_rate_frame(match_info_df, innings_df, season=args.season))
@@ -0,0 +1,358 @@
+from reports import (WIN_PERCENTAGE_QUERY, BEST_TEAM_QUERY, TOP_STRIKE_RATE_QUERY, SUMMARY_WIN_PERCENTAGE_QUERY,
+                     SUMMARY_BEST_TEAM_QUERY, SUMMARY_TOP_STRIKE_RATE_QUERY)
+
+
+#MySQL DDL for the ingest tables, in creation order. The unique keys are what insert_rows_batched and the per-row
+#IntegrityError path de-duplicate on; match_id is the Cricsheet file id when it is supplied (see parse_match_data).
+#There are no foreign keys: a replaced match is removed with functions.delete_match, and bulk loads stay cheap.
+TABLES_DDL = {
+    'players': """
+    CREATE TABLE IF NOT EXISTS players (
+        player_id INT NOT NULL AUTO_INCREMENT,
+        player_name VARCHAR(128) NOT NULL,
+        registryID VARCHAR(16) NOT NULL,
+        PRIMARY KEY (player_id),
+        UNIQUE KEY uq_players_registryID (registryID)
+    ) """,
+    'teams': """
+    CREATE TABLE IF NOT EXISTS teams (
+        team_id INT NOT NULL AUTO_INCREMENT,
+        team VARCHAR(128) NOT NULL,
+        PRIMARY KEY (team_id),
+        UNIQUE KEY uq_teams_team (team)
+    ) """,
+    'match_info': """
+    CREATE TABLE IF NOT EXISTS match_info (
+        match_id BIGINT NOT NULL AUTO_INCREMENT,
+        balls_per_over TINYINT,
+        city VARCHAR(128),
+        date_start DATE,
+        date_end DATE,
+        match_name VARCHAR(255),
+        match_number SMALLINT,
+        gender VARCHAR(16),
+        match_type VARCHAR(16),
+        match_type_number INT,
+        official_data TEXT,
+        winner VARCHAR(128),
+        decision_by VARCHAR(32),
+        overs SMALLINT,
+        player_of_match VARCHAR(128),
+        team1 VARCHAR(128),
+        team1_id INT,
+        team1_players TEXT,
+        team2 VARCHAR(128),
+        team2_id INT,
+        team2_players TEXT,
+        season VARCHAR(16),
+        team_type VARCHAR(32),
+        toss_decision VARCHAR(16),
+        toss_winner VARCHAR(128),
+        venue VARCHAR(255),
+        PRIMARY KEY (match_id)
+    ) """,
+    'innings_info': """
+    CREATE TABLE IF NOT EXISTS innings_info (
+        innings_id BIGINT NOT NULL AUTO_INCREMENT,
+        match_id BIGINT,
+        team VARCHAR(128),
+        over_num SMALLINT,
+        batter VARCHAR(128),
+        bowler VARCHAR(128),
+        non_striker VARCHAR(128),
+        batter_runs TINYINT,
+        extra_runs TINYINT,
+        wickets TEXT,
+        delivery_num SMALLINT,
+        innings_num TINYINT,
+        ball_in_over TINYINT,
+        is_legal TINYINT,
+        legal_balls SMALLINT,
+        team_score SMALLINT,
+        team_wickets TINYINT,
+        run_rate FLOAT,
+        is_dot TINYINT,
+        is_boundary TINYINT,
+        PRIMARY KEY (innings_id)
+    ) """,
+    'wickets': """
+    CREATE TABLE IF NOT EXISTS wickets (
+        match_id BIGINT NOT NULL,
+        delivery_num SMALLINT NOT NULL,
+        wicket_num TINYINT NOT NULL,
+        kind VARCHAR(32),
+        bowler_id INT,
+        player_out_id INT,
+        PRIMARY KEY (match_id, delivery_num, wicket_num)
+    ) """,
+    'wicket_fielders': """
+    CREATE TABLE IF NOT EXISTS wicket_fielders (
+        match_id BIGINT NOT NULL,
+        delivery_num SMALLINT NOT NULL,
+        wicket_num TINYINT NOT NULL,
+        fielder_num TINYINT NOT NULL,
+        fielder_id INT,
+        substitute TINYINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (match_id, delivery_num, wicket_num, fielder_num)
+    ) """,
+    'extras': """
+    CREATE TABLE IF NOT EXISTS extras (
+        match_id BIGINT NOT NULL,
+        delivery_num SMALLINT NOT NULL,
+        bowler_id INT,
+        wides TINYINT NOT NULL DEFAULT 0,
+        noballs TINYINT NOT NULL DEFAULT 0,
+        byes TINYINT NOT NULL DEFAULT 0,
+        legbyes TINYINT NOT NULL DEFAULT 0,
+        penalty TINYINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (match_id, delivery_num)
+    ) """,
+    'over_summary': """
+    CREATE TABLE IF NOT EXISTS over_summary (
+        match_id BIGINT NOT NULL,
+        innings_num TINYINT NOT NULL,
+        over_num SMALLINT NOT NULL,
+        team VARCHAR(128),
+        bowler VARCHAR(128),
+        runs SMALLINT,
+        extra_runs SMALLINT,
+        wickets TINYINT,
+        legal_balls TINYINT,
+        dot_balls TINYINT,
+        boundaries TINYINT,
+        team_score SMALLINT,
+        team_wickets TINYINT,
+        PRIMARY KEY (match_id, innings_num, over_num)
+    ) """,
+    'innings_summary': """
+    CREATE TABLE IF NOT EXISTS innings_summary (
+        match_id BIGINT NOT NULL,
+        innings_num TINYINT NOT NULL,
+        team VARCHAR(128),
+        runs SMALLINT,
+        wickets TINYINT,
+        legal_balls SMALLINT,
+        overs FLOAT,
+        extra_runs SMALLINT,
+        dot_balls SMALLINT,
+        boundaries SMALLINT,
+        run_rate FLOAT,
+        target_runs SMALLINT,
+        target_overs FLOAT,
+        super_over TINYINT NOT NULL DEFAULT 0,
+        won TINYINT,
+        PRIMARY KEY (match_id, innings_num)
+    ) """,
+}
+
+#columns added to tables after their first release: table -> [(column, definition)]. create_tables adds the ones an
+#existing table lacks, so older databases pick them up without a manual migration. The innings state columns
+#(see functions.innings_state_columns) stay NULL on deliveries loaded before they existed, until a full reload.
+ADDED_COLUMNS = {
+    'innings_info': [('delivery_num', 'SMALLINT'), ('innings_num', 'TINYINT'), ('ball_in_over', 'TINYINT'),
+                     ('is_legal', 'TINYINT'), ('legal_balls', 'SMALLINT'), ('team_score', 'SMALLINT'),
+                     ('team_wickets', 'TINYINT'), ('run_rate', 'FLOAT'), ('is_dot', 'TINYINT'), ('is_boundary', 'TINYINT')],
+}
+
+#secondary indexes: table -> {index name: columns}. They can be dropped around a bulk load and rebuilt after it.
+#  - match_info (season, gender, teamN, winner) serve the season filter of the reports and cover the team/winner
+#    columns the win percentage queries read, so those never touch the table rows.
+#  - innings_info (match_id, batter, batter_runs) serves the join on match_id and delete_match, and covers the
+#    strike rate aggregation (InnoDB secondary indexes carry the primary key, so COUNT(innings_id) is covered too).
+#    (match_id, delivery_num) joins deliveries to their wickets and extras.
+#  - the player id columns of wickets, wicket_fielders and extras serve dismissal and bowling queries by player.
+#  - over_summary (bowler) and innings_summary (team) serve per-bowler and per-team rollup queries.
+SECONDARY_INDEXES = {
+    'match_info': {
+        'ix_match_info_season_team1': ['season', 'gender', 'team1', 'winner'],
+        'ix_match_info_season_team2': ['season', 'gender', 'team2', 'winner'],
+    },
+    'innings_info': {
+        'ix_innings_info_match_batter': ['match_id', 'batter', 'batter_runs'],
+        'ix_innings_info_delivery': ['match_id', 'delivery_num'],
+    },
+    'wickets': {
+        'ix_wickets_player_out': ['player_out_id'],
+        'ix_wickets_bowler': ['bowler_id'],
+    },
+    'wicket_fielders': {
+        'ix_wicket_fielders_fielder': ['fielder_id'],
+    },
+    'extras': {
+        'ix_extras_bowler': ['bowler_id'],
+    },
+    'over_summary': {
+        'ix_over_summary_bowler': ['bowler'],
+    },
+    'innings_summary': {
+        'ix_innings_summary_team': ['team'],
+    },
+}
+
+#report queries checked by check_report_query_plans: name -> (query, takes the season parameter, tables it may
+#read in full). The win percentage reports cover every season, so they read every match: the raw one all of
+#match_info (the summary tables exist to avoid that), the summary one all of team_season_summary.
+REPORT_QUERIES = {
+    'win_percentage': (WIN_PERCENTAGE_QUERY, False, ['match_info']),
+    'best_team': (BEST_TEAM_QUERY, True, []),
+    'top_strike_rate': (TOP_STRIKE_RATE_QUERY, True, []),
+    'summary_win_percentage': (SUMMARY_WIN_PERCENTAGE_QUERY, False, ['team_season_summary']),
+    'summary_best_team': (SUMMARY_BEST_TEAM_QUERY, True, []),
+    'summary_top_strike_rate': (SUMMARY_TOP_STRIKE_RATE_QUERY, True, []),
+}
+
+
+#EXPLAIN access types that read every row of a table
+FULL_SCAN_TYPES = ('ALL', 'index')
+
+
+class FullScanError(Exception):
+    """
+    Raised by check_report_query_plans when a report query would read a table in full.
+    """
+
+
+###############################################
+def create_tables(cnx, tables: list = None):
+    """
+    Creates the ingest tables that do not exist yet, adds the ADDED_COLUMNS an existing table lacks and any
+    missing secondary indexes, e.g. after a bulk load that failed before create_secondary_indexes ran.
+
+    Parameters:
+    ------------
+        - cnx (mysql.connector.connection_cext.CMySQLConnection): MySQL database connection object.
+        - tables (list, optional): Subset of TABLES_DDL to create. Defaults to all of them.
+    """
+    tables = list(TABLES_DDL) if tables is None else tables
+    cursor = cnx.cursor()
+    for table in tables:
+        cursor.execute(TABLES_DDL[table])
+        present = existing_columns(table, cnx)
+        for column, definition in ADDED_COLUMNS.get(table, []):
+            if column not in present:
+                cursor.execute("ALTER TABLE {} ADD COLUMN {} {}".format(table, column, definition))
+    cursor.close()
+    create_secondary_indexes(cnx, tables=tables)
+
+
+def existing_columns(table: str, cnx):
+    """
+    Returns the set of column names of a table.
+    """
+    cursor = cnx.cursor()
+    cursor.execute("SHOW COLUMNS FROM {}".format(table))
+    names = {row[0] for row in cursor.fetchall()} #Field
+    cursor.close()
+    return names
+
+
+def existing_indexes(table: str, cnx):
+    """
+    Returns the set of index names defined on a table.
+    """
+    cursor = cnx.cursor()
+    cursor.execute("SHOW INDEX FROM {}".format(table))
+    names = {row[2] for row in cursor.fetchall()} #Key_name
+    cursor.close()
+    return names
+
+
+def create_secondary_indexes(cnx, tables: list = None):
+    """
+    Adds the secondary indexes of SECONDARY_INDEXES that a table is missing, all of a table's indexes in a single
+    ALTER TABLE so it is rebuilt once.
+
+    Returns:
+    -----------
+        - list of the index names created
+    """
+    tables = list(SECONDARY_INDEXES) if tables is None else tables
+    created = []
+    cursor = cnx.cursor()
+    for table in tables:
+        present = existing_indexes(table, cnx)
+        missing = [(name, columns) for name, columns in SECONDARY_INDEXES.get(table, {}).items() if name not in present]
+        if missing:
+            cursor.execute("ALTER TABLE {} {}".format(table, ", ".join(
+                "ADD INDEX {} ({})".format(name, ", ".join(columns)) for name, columns in missing)))
+            created += [name for name, _ in missing]
+    cursor.close()
+    return created
+
+
+def drop_secondary_indexes(cnx, tables: list = None):
+    """
+    Drops the secondary indexes of SECONDARY_INDEXES, so a bulk load does not maintain them row by row. Primary and
+    unique keys are kept, since de-duplication relies on them. Rebuild with create_secondary_indexes after the load.
+
+    Returns:
+    -----------
+        - list of the index names dropped
+    """
+    tables = list(SECONDARY_INDEXES) if tables is None else tables
+    dropped = []
+    cursor = cnx.cursor()
+    for table in tables:
+        present = [name for name in SECONDARY_INDEXES.get(table, {}) if name in existing_indexes(table, cnx)]
+        if present:
+            cursor.execute("ALTER TABLE {} {}".format(table, ", ".join("DROP INDEX {}".format(name) for name in present)))
+            dropped += present
+    cursor.close()
+    return dropped
+
+
+###############################################
+def explain_query(query: str, params: tuple, cnx):
+    """
+    Runs EXPLAIN on a query.
+
+    Returns:
+    -----------
+        - list of dicts, one per row of the plan (keys as in MySQL's tabular EXPLAIN: table, type, key, rows, Extra, ...)
+    """
+    cursor = cnx.cursor()
+    cursor.execute("EXPLAIN " + query, params)
+    columns = [column[0] for column in cursor.description]
+    plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    cursor.close()
+    return plan
+
+
+def full_scans(plan: list, allowed_tables: list = ()):
+    """
+    Returns the rows of an EXPLAIN plan that read a base table in full: a table scan (access type ALL) or a full index
+    scan (type index), which reads every row too, only in index order. Derived tables and unions (<derived2>,
+    <union2,3>, ...) are the query's own intermediate results and are not counted.
+    """
+    return [row for row in plan
+            if row.get('type') in FULL_SCAN_TYPES and row.get('table') is not None
+            and not str(row['table']).startswith('<') and row['table'] not in allowed_tables]
+
+
+def check_report_query_plans(cnx, season: str = '2019'):
+    """
+    Runs EXPLAIN on every query in REPORT_QUERIES and raises FullScanError if any of them falls back to a full table or
+    index scan of a table it is not allowed to read in full.
+
+    Returns:
+    -----------
+        - dict: query name -> EXPLAIN plan, when every plan passes
+    """
+    plans, failures = {}, []
+    for name, (query, takes_season, allowed_tables) in REPORT_QUERIES.items():
+        plans[name] = explain_query(query, (season,) if takes_season else (), cnx)
+        failures += ["{}: full {} scan of {}".format(name, 'table' if row['type'] == 'ALL' else 'index', row['table'])
+                     for row in full_scans(plans[name], allowed_tables)]
+    if failures:
+        raise FullScanError("; ".join(failures))
+    return plans
+
+
+if __name__ == "__main__":
+    #same check as `python cricket_parser.py report --check-plans`, with the credentials from its db_config()
+    from cricket_parser import check_report_plans
+
+    for name, plan in check_report_plans().items():
+        print(name)
+        for row in plan:
+            print("    {table}: type={type}, key={key}, rows={rows}".format(**row))
@@ -0,0 +1,104 @@
+import io
+import os
+import zipfile
+
+from decoding import decode_match
+
+
+CRICSHEET_ODIS_URL = "https://cricsheet.org/downloads/odis_json.zip"
+
+
+###############################################
+def match_id_from_file_name(file_path: str):
+    """
+    Returns the match_id for a Cricsheet match file. Cricsheet names each file after its numeric match id
+    (e.g. '1336070.json'), so the id is stable across runs and needs no database round trip.
+
+    Parameters:
+        file_path (str): Path or archive member name of the match file.
+
+    Returns:
+        match_id (int)
+    """
+    return int(os.path.splitext(os.path.basename(file_path))[0])
+
+
+def _open_archive(archive):
+    """
+    Opens a Cricsheet zip archive given either a local path or the archive contents as bytes.
+    """
+    if isinstance(archive, (bytes, bytearray)):
+        archive = io.BytesIO(archive)
+    return zipfile.ZipFile(archive)
+
+
+def iter_archive_members(archive, member_filter=None):
+    """
+    Lazily yields the match files in a Cricsheet zip archive without extracting it.
+
+    Parameters:
+    ------------
+        archive (str | bytes): Path to the zip file, or its contents (e.g. requests.get(...).content).
+        member_filter (callable, optional): Called with each member name; members for which it returns
+                                            False are skipped without being decompressed.
+
+    Returns:
+    -----------
+        generator of (member_name, raw_bytes) tuples, one per '.json' member, in archive order.
+
+    Example:
+    -----------
+        for member_name, raw in iter_archive_members('odis_json.zip', member_filter=lambda name: name.startswith('13')):
+            ...
+    """
+    with _open_archive(archive) as zip_file:
+        for member in zip_file.infolist():
+            if member.is_dir() or not member.filename.endswith('.json'):
+                continue
+            if member_filter is not None and not member_filter(member.filename):
+                continue
+            yield member.filename, zip_file.read(member)
+
+
+def iter_archive_matches(archive, member_filter=None, decoder: str = None):
+    """
+    Lazily yields the decoded matches in a Cricsheet zip archive without extracting it.
+
+    Parameters:
+    ------------
+        archive (str | bytes): Path to the zip file, or its contents.
+        member_filter (callable, optional): See iter_archive_members.
+        decoder (str, optional): A decoding.DECODERS entry; defaults to decoding.default_decoder().
+
+    Returns:
+    -----------
+        generator of (match_file_id, json_data) tuples, where match_file_id is the numeric Cricsheet id
+        taken from the member name (see match_id_from_file_name).
+    """
+    for member_name, raw in iter_archive_members(archive, member_filter=member_filter):
+        yield match_id_from_file_name(member_name), decode_match(raw, decoder)
+
+
+def fetch_archive(url: str = CRICSHEET_ODIS_URL, archive_path: str = None):
+    """
+    Returns the archive to ingest: the local file at archive_path if given, otherwise the contents
+    downloaded from url (kept in memory, nothing is written to disk).
+
+    Parameters:
+    ------------
+        url (str): Download location of the archive.
+        archive_path (str, optional): Pre-fetched archive; no network access is made when it is set.
+
+    Returns:
+    -----------
+        str | bytes: Something iter_archive_members can read.
+    """
+    if archive_path is not None:
+        if not os.path.exists(archive_path):
+            raise FileNotFoundError(archive_path)
+        return archive_path
+
+    import requests
+    response = requests.get(url)
+    response.raise_for_status()
+    return response.content
@@ -0,0 +1,609 @@
+import re
+import sqlite3
+
+import pandas as pd
+
+from functions import *
+from pipeline import FlushBudget, pipelined_parse
+
+
+#sqlite versions of the ingest tables, with the keys the write_* functions rely on for de-duplication
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    player_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    player_name TEXT NOT NULL,
+    registryID TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS teams (
+    team_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS match_info (
+    match_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    balls_per_over INTEGER, city TEXT, date_start TEXT, date_end TEXT, match_name TEXT, match_number INTEGER,
+    gender TEXT, match_type TEXT, match_type_number INTEGER, official_data TEXT, winner TEXT, decision_by TEXT,
+    overs INTEGER, player_of_match TEXT, team1 TEXT, team1_id INTEGER, team1_players TEXT, team2 TEXT,
+    team2_id INTEGER, team2_players TEXT, season TEXT, team_type TEXT, toss_decision TEXT, toss_winner TEXT, venue TEXT
+);
+CREATE TABLE IF NOT EXISTS innings_info (
+    innings_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    match_id INTEGER, team TEXT, over_num INTEGER, batter TEXT, bowler TEXT, non_striker TEXT,
+    batter_runs INTEGER, extra_runs INTEGER, wickets TEXT, delivery_num INTEGER, innings_num INTEGER, ball_in_over INTEGER,
+    is_legal INTEGER, legal_balls INTEGER, team_score INTEGER, team_wickets INTEGER, run_rate REAL, is_dot INTEGER, is_boundary INTEGER
+);
+CREATE TABLE IF NOT EXISTS wickets (
+    match_id INTEGER NOT NULL, delivery_num INTEGER NOT NULL, wicket_num INTEGER NOT NULL,
+    kind TEXT, bowler_id INTEGER, player_out_id INTEGER,
+    PRIMARY KEY (match_id, delivery_num, wicket_num)
+);
+CREATE TABLE IF NOT EXISTS wicket_fielders (
+    match_id INTEGER NOT NULL, delivery_num INTEGER NOT NULL, wicket_num INTEGER NOT NULL, fielder_num INTEGER NOT NULL,
+    fielder_id INTEGER, substitute INTEGER,
+    PRIMARY KEY (match_id, delivery_num, wicket_num, fielder_num)
+);
+CREATE TABLE IF NOT EXISTS extras (
+    match_id INTEGER NOT NULL, delivery_num INTEGER NOT NULL, bowler_id INTEGER,
+    wides INTEGER, noballs INTEGER, byes INTEGER, legbyes INTEGER, penalty INTEGER,
+    PRIMARY KEY (match_id, delivery_num)
+);
+CREATE TABLE IF NOT EXISTS over_summary (
+    match_id INTEGER NOT NULL, innings_num INTEGER NOT NULL, over_num INTEGER NOT NULL, team TEXT, bowler TEXT,
+    runs INTEGER, extra_runs INTEGER, wickets INTEGER, legal_balls INTEGER, dot_balls INTEGER, boundaries INTEGER,
+    team_score INTEGER, team_wickets INTEGER,
+    PRIMARY KEY (match_id, innings_num, over_num)
+);
+CREATE TABLE IF NOT EXISTS innings_summary (
+    match_id INTEGER NOT NULL, innings_num INTEGER NOT NULL, team TEXT, runs INTEGER, wickets INTEGER, legal_balls INTEGER,
+    overs REAL, extra_runs INTEGER, dot_balls INTEGER, boundaries INTEGER, run_rate REAL, target_runs INTEGER,
+    target_overs REAL, super_over INTEGER NOT NULL DEFAULT 0, won INTEGER,
+    PRIMARY KEY (match_id, innings_num)
+);
+"""
+
+INGEST_TABLES = ['players', 'teams', 'match_info', 'innings_info'] + DELIVERY_DETAIL_TABLES + ROLLUP_TABLES
+
+
+###############################################
+_LOAD_DATA_QUERY = re.compile(r'\s*LOAD\s+DATA\s+LOCAL\s+INFILE\s+%s\s+INTO\s+TABLE\s+(\w+).*\(([^()]*)\)\s*$', re.DOTALL)
+_LOAD_DATA_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+_LOAD_DATA_UNESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+
+def _load_data_value(field: str):
+    """
+    Reads one field of a tab-delimited LOAD DATA file back the way MySQL does: \\N is NULL, and a backslash
+    escapes the character after it.
+    """
+    if field == '\\N':
+        return None
+    return _LOAD_DATA_ESCAPE.sub(lambda match: _LOAD_DATA_UNESCAPES.get(match.group(1), match.group(1)), field)
+
+
+class LocalCursor:
+    """
+    Cursor of LocalDatabase. Rewrites the MySQL dialect the ingest code uses into sqlite, and runs the
+    LOAD DATA LOCAL INFILE statement of functions.InningsBulkLoader by reading its staging file.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._cursor = connection.cursor()
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @staticmethod
+    def _translate(query: str):
+        query = query.replace('%s', '?').replace('cricket_db.', '')
+        query = re.sub(r'INSERT\s+IGNORE', 'INSERT OR IGNORE', query)
+        #the no-op ON DUPLICATE KEY UPDATE of insert_rows_batched, which only skips key conflicts
+        query = re.sub(r'ON\s+DUPLICATE\s+KEY\s+UPDATE\s+(\w+)\s*=\s*\1\s*$', 'ON CONFLICT DO NOTHING', query)
+        #other upserts (load_manifest, the summary tables): VALUES(column) is the row that was not inserted
+        query = re.sub(r'ON\s+DUPLICATE\s+KEY\s+UPDATE\s+(.*)$',
+                       lambda match: 'ON CONFLICT DO UPDATE SET ' + re.sub(r'VALUES\((\w+)\)', r'excluded.\1', match.group(1)),
+                       query, flags=re.DOTALL)
+        query = re.sub(r'TRUNCATE\s+TABLE', 'DELETE FROM', query)
+        #DDL of the tables outside SQLITE_SCHEMA (load_manifest, the summary journal)
+        query = re.sub(r'\w+\s+NOT\s+NULL\s+AUTO_INCREMENT\s+PRIMARY\s+KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT', query)
+        query = re.sub(r'\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP', '', query)
+        return query
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query: str, params=()):
+        if 'FOREIGN_KEY_CHECKS' in query:
+            return
+        load_data = _LOAD_DATA_QUERY.match(query)
+        if load_data is not None:
+            self._load_data(params[0], *load_data.groups())
+            return
+        try:
+            self._cursor.execute(self._translate(query), tuple(params))
+        except sqlite3.IntegrityError as error:
+            #the per-row write path de-duplicates by catching IntegrityError
+            raise IntegrityError(str(error)) from error
+        self.rowcount = self._cursor.rowcount
+        self.lastrowid = self._cursor.lastrowid
+
+    def executemany(self, query: str, rows):
+        try:
+            self._cursor.executemany(self._translate(query), [tuple(row) for row in rows])
+        except sqlite3.IntegrityError as error:
+            raise IntegrityError(str(error)) from error
+        self.rowcount = self._cursor.rowcount
+
+    def _load_data(self, file_name: str, table_name: str, columns: str):
+        #tab-delimited, backslash-escaped lines; LOCAL loads skip duplicate keys like INSERT IGNORE
+        with open(file_name, encoding='utf-8', newline='') as file:
+            rows = [[_load_data_value(field) for field in line.split('\t')] for line in file.read().split('\n')[:-1]]
+        placeholders = ', '.join(['%s'] * len(columns.split(',')))
+        self.executemany(f"INSERT IGNORE INTO {table_name} ({columns}) VALUES ({placeholders})", rows)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class LocalDatabase:
+    """
+    sqlite database that implements the subset of the MySQL connector API (cursor/commit/rollback) the parse and
+    write_* functions use, so they run unchanged without a MySQL server.
+
+    Parameters:
+    ------------
+        path (str): sqlite database file, or ':memory:'.
+        timeout (float): Seconds a write waits for another connection's transaction on the same file to end.
+
+    Notes:
+    ------------
+        - Transactions take the write lock with their first write (BEGIN IMMEDIATE), so connections writing the
+          same file (see writer_pool.WriterPool) queue on it instead of failing with "database is locked" when one
+          of them upgrades a read lock.
+    """
+
+    def __init__(self, path: str = ':memory:', timeout: float = 30.0):
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level='IMMEDIATE')
+        self._connection.executescript(SQLITE_SCHEMA)
+
+    def cursor(self):
+        return LocalCursor(self._connection)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+###############################################
+class StorageBackend:
+    """
+    Interface the ingest pipeline writes through. Implementations provide dimension upserts, match and delivery
+    inserts, deletes, clearing, reads and transactions; write_match combines them into one match-level unit.
+
+    Implementations:
+    ------------
+        MySQLBackend: the cricket_db MySQL database.
+        SQLiteBackend: a sqlite file or in-memory database, for local runs and CI.
+        MemoryBackend: plain Python containers, for the fastest runs and tests of the pipeline itself.
+    """
+
+    def upsert_teams(self, team_df: pd.DataFrame):
+        """
+        Adds the teams not stored yet. Returns (rows_written, rows_skipped).
+        """
+        raise NotImplementedError
+
+    def upsert_players(self, player_df: pd.DataFrame):
+        """
+        Adds the players (by registryID) not stored yet. Returns (rows_written, rows_skipped).
+        """
+        raise NotImplementedError
+
+    def team_id(self, team: str):
+        """
+        Returns the team_id of a stored team.
+        """
+        raise NotImplementedError
+
+    def insert_match(self, match_info_df: pd.DataFrame):
+        """
+        Inserts match rows, skipping match_ids that are already stored. Returns (rows_written, rows_skipped).
+        """
+        raise NotImplementedError
+
+    def insert_deliveries(self, innings_df: pd.DataFrame):
+        """
+        Inserts delivery rows in bulk. Returns (rows_written, rows_skipped).
+        """
+        raise NotImplementedError
+
+    def insert_delivery_details(self, delivery_details: dict):
+        """
+        Inserts the wickets, wicket_fielders and extras rows of a match (see functions.parse_innings_info), adding
+        the people they reference to players first. Returns a dict mapping table name ('players' included)
+        to (rows_written, rows_skipped).
+        """
+        raise NotImplementedError
+
+    def insert_rollups(self, rollups: dict):
+        """
+        Inserts the over_summary and innings_summary rows of a match (see functions.parse_innings_info). Returns a
+        dict mapping table name to (rows_written, rows_skipped).
+        """
+        raise NotImplementedError
+
+    def delete_match(self, match_id: int):
+        """
+        Deletes a match, its deliveries, their details and its rollups.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """
+        Deletes the contents of every ingest table.
+        """
+        raise NotImplementedError
+
+    def read_table(self, table_name: str):
+        """
+        Returns the contents of a table as a DataFrame.
+        """
+        raise NotImplementedError
+
+    def query(self, query: str, params: tuple = ()):
+        """
+        Runs a SQL query and returns its rows. Only SQL backends support this; use read_table otherwise.
+        """
+        raise NotImplementedError("{} does not run SQL; use read_table".format(type(self).__name__))
+
+    def commit(self):
+        raise NotImplementedError
+
+    def rollback(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def write_match(self, team_df: pd.DataFrame, player_df: pd.DataFrame, match_info_df: pd.DataFrame, innings_df: pd.DataFrame,
+                    delivery_details: dict = None, rollups: dict = None):
+        """
+        Writes one parsed match (see functions.parse_match_data): players and teams, then the match row with its
+        team ids, then its deliveries and, when given, their details and the match rollups. The deliveries are
+        skipped if the match is already stored. Does not commit.
+
+        Returns:
+        -----------
+            dict mapping table name to (rows_written, rows_skipped)
+        """
+        if 'match_id' not in match_info_df.columns:
+            raise ValueError("match_info_df needs a 'match_id' column to be written through a storage backend")
+
+        counts = {}
+        counts['players'] = self.upsert_players(player_df)
+        counts['teams'] = self.upsert_teams(team_df)
+
+        match_info_df = match_info_df.copy()
+        match_info_df['team1_id'] = self.team_id(match_info_df['team1'].iloc[0])
+        match_info_df['team2_id'] = self.team_id(match_info_df['team2'].iloc[0])
+        counts['match_info'] = self.insert_match(match_info_df)
+
+        if counts['match_info'][0] == 0:
+            #the match is already stored, so its deliveries are too
+            counts['innings_info'] = (0, len(innings_df))
+            for table in DELIVERY_DETAIL_TABLES if delivery_details is not None else []:
+                counts[table] = (0, len(delivery_details[table]))
+            for table in ROLLUP_TABLES if rollups is not None else []:
+                counts[table] = (0, len(rollups[table]))
+            return counts
+
+        counts['innings_info'] = self.insert_deliveries(innings_df)
+        if delivery_details is not None:
+            detail_counts = self.insert_delivery_details(delivery_details)
+            counts['players'] = (counts['players'][0] + detail_counts.pop('players')[0], counts['players'][1])
+            counts.update(detail_counts)
+        if rollups is not None:
+            counts.update(self.insert_rollups(rollups))
+        return counts
+
+
+class SQLBackend(StorageBackend):
+    """
+    Backend over a MySQL-connector-style connection, built on the functions in functions.py.
+
+    Parameters:
+    ------------
+        cnx: MySQL connection, or a LocalDatabase.
+        batch_size (int): Rows per multi-row INSERT.
+        bulk_load_rows (int, optional): When set, deliveries go through an InningsBulkLoader
+                                        and are loaded every bulk_load_rows rows; commit() flushes it first.
+    """
+
+    def __init__(self, cnx, batch_size: int = 1000, bulk_load_rows: int = None):
+        self.cnx = cnx
+        self.batch_size = batch_size
+        self.innings_loader = InningsBulkLoader(cnx, rows_per_load=bulk_load_rows) if bulk_load_rows else None
+        self.dimension_cache = DimensionCache()
+        self.dimension_cache.load(cnx)
+
+    def upsert_teams(self, team_df: pd.DataFrame):
+        return self.dimension_cache.add_teams(team_df, self.cnx, batch_size=self.batch_size, commit=False)
+
+    def upsert_players(self, player_df: pd.DataFrame):
+        return self.dimension_cache.add_players(player_df, self.cnx, batch_size=self.batch_size, commit=False)
+
+    def team_id(self, team: str):
+        return self.dimension_cache.team_id(team)
+
+    def insert_match(self, match_info_df: pd.DataFrame):
+        return insert_rows_batched('match_info', match_info_df, self.cnx, batch_size=self.batch_size, commit=False)
+
+    def insert_deliveries(self, innings_df: pd.DataFrame):
+        if self.innings_loader is not None:
+            return self.innings_loader.add(innings_df), 0
+        return insert_rows_batched('innings_info', innings_df, self.cnx, batch_size=self.batch_size, commit=False)
+
+    def insert_delivery_details(self, delivery_details: dict):
+        return write_delivery_details(delivery_details, self.cnx, dimension_cache=self.dimension_cache,
+                                      batch_size=self.batch_size, commit=False)
+
+    def insert_rollups(self, rollups: dict):
+        return write_rollups(rollups, self.cnx, batch_size=self.batch_size, commit=False)
+
+    def delete_match(self, match_id: int):
+        delete_match(match_id, self.cnx)
+
+    def clear(self):
+        clear_contents(self.cnx, tables=INGEST_TABLES)
+        self.dimension_cache.load(self.cnx)
+
+    def read_table(self, table_name: str):
+        cursor = self.cnx.cursor()
+        cursor.execute("SELECT * FROM {}".format(table_name))
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        cursor.close()
+        return pd.DataFrame(rows, columns=columns)
+
+    def query(self, query: str, params: tuple = ()):
+        cursor = self.cnx.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def commit(self):
+        if self.innings_loader is not None:
+            self.innings_loader.flush()
+        self.cnx.commit()
+
+    def rollback(self):
+        if self.innings_loader is not None:
+            self.innings_loader.close()
+        self.cnx.rollback()
+        #ids cached during the rolled-back transaction no longer exist
+        self.dimension_cache.load(self.cnx)
+
+    def close(self):
+        if self.innings_loader is not None:
+            self.innings_loader.close()
+        self.cnx.close()
+
+
+class MySQLBackend(SQLBackend):
+    """
+    Backend over the cricket_db MySQL database. Open the connection with allow_local_infile=True to use bulk_load_rows.
+
+    Example:
+    -----------
+        backend = MySQLBackend(mysql.connector.connect(user=..., password=..., database='cricket_db'))
+    """
+
+
+class SQLiteBackend(SQLBackend):
+    """
+    Backend over a sqlite database, created with the ingest tables if needed.
+
+    Parameters:
+    ------------
+        path (str): sqlite database file, or ':memory:'.
+        batch_size (int): Rows per multi-row INSERT.
+    """
+
+    def __init__(self, path: str = ':memory:', batch_size: int = 1000):
+        super().__init__(LocalDatabase(path), batch_size=batch_size)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Backend that keeps every table in Python containers. Changes since the last commit() are journaled so
+    rollback() can undo them.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._teams = {} #team -> team_id
+        self._players = {} #registryID -> (player_id, player_name)
+        self._matches = {} #match_id -> match_info row
+        self._deliveries = {} #match_id -> list of innings_info frames
+        self._details = {table: {} for table in DELIVERY_DETAIL_TABLES + ROLLUP_TABLES} #table -> match_id -> list of frames
+        self._journal = [] #undo entries since the last commit
+
+    def upsert_teams(self, team_df: pd.DataFrame):
+        rows_written = 0
+        for team in team_df['team'].drop_duplicates():
+            if team not in self._teams:
+                self._teams[team] = len(self._teams) + 1
+                self._journal.append((self._teams, team))
+                rows_written += 1
+        return rows_written, len(team_df) - rows_written
+
+    def upsert_players(self, player_df: pd.DataFrame):
+        rows_written = 0
+        for player_name, registry_id in player_df[['player_name', 'registryID']].drop_duplicates('registryID').itertuples(index=False):
+            if registry_id not in self._players:
+                self._players[registry_id] = (len(self._players) + 1, player_name)
+                self._journal.append((self._players, registry_id))
+                rows_written += 1
+        return rows_written, len(player_df) - rows_written
+
+    def team_id(self, team: str):
+        return self._teams[team]
+
+    def insert_match(self, match_info_df: pd.DataFrame):
+        rows_written = 0
+        for row in match_info_df.to_dict('records'):
+            if row['match_id'] not in self._matches:
+                self._matches[row['match_id']] = row
+                self._journal.append((self._matches, row['match_id']))
+                rows_written += 1
+        return rows_written, len(match_info_df) - rows_written
+
+    def insert_deliveries(self, innings_df: pd.DataFrame):
+        for match_id, match_deliveries in innings_df.groupby('match_id', sort=False):
+            if match_id not in self._deliveries:
+                self._deliveries[match_id] = []
+                self._journal.append((self._deliveries, match_id))
+            else:
+                self._journal.append(('restore', self._deliveries, match_id, list(self._deliveries[match_id])))
+            self._deliveries[match_id].append(match_deliveries)
+        return len(innings_df), 0
+
+    def insert_delivery_details(self, delivery_details: dict):
+        counts = {'players': self.upsert_players(delivery_detail_people(delivery_details))}
+        player_ids = {registry_id: player_id for registry_id, (player_id, _) in self._players.items()}
+        for table, df in delivery_detail_rows(delivery_details, player_ids).items():
+            counts[table] = self._insert_detail_rows(table, df)
+        return counts
+
+    def insert_rollups(self, rollups: dict):
+        return {table: self._insert_detail_rows(table, rollups[table]) for table in ROLLUP_TABLES}
+
+    def _insert_detail_rows(self, table: str, df: pd.DataFrame):
+        for match_id, match_rows in df.groupby('match_id', sort=False):
+            frames = self._details[table]
+            if match_id not in frames:
+                frames[match_id] = []
+                self._journal.append((frames, match_id))
+            else:
+                self._journal.append(('restore', frames, match_id, list(frames[match_id])))
+            frames[match_id].append(match_rows)
+        return len(df), 0
+
+    def delete_match(self, match_id: int):
+        for table in (self._matches, self._deliveries, *self._details.values()):
+            if match_id in table:
+                self._journal.append(('restore', table, match_id, table.pop(match_id)))
+
+    def read_table(self, table_name: str):
+        if table_name == 'teams':
+            return pd.DataFrame({'team_id': list(self._teams.values()), 'team': list(self._teams.keys())})
+        if table_name == 'players':
+            return pd.DataFrame([(player_id, player_name, registry_id) for registry_id, (player_id, player_name) in self._players.items()],
+                                columns=['player_id', 'player_name', 'registryID'])
+        if table_name == 'match_info':
+            return pd.DataFrame(list(self._matches.values()))
+        if table_name == 'innings_info':
+            frames = [frame for frames in self._deliveries.values() for frame in frames]
+            if not frames:
+                return pd.DataFrame()
+            innings_df = pd.concat(frames, ignore_index=True)
+            innings_df.insert(0, 'innings_id', range(1, len(innings_df) + 1))
+            return innings_df
+        if table_name in self._details:
+            frames = [frame for frames in self._details[table_name].values() for frame in frames]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        raise KeyError(table_name)
+
+    def commit(self):
+        self._journal = []
+
+    def rollback(self):
+        for entry in reversed(self._journal):
+            if entry[0] == 'restore':
+                _, table, key, value = entry
+                table[key] = value
+            else:
+                table, key = entry
+                table.pop(key, None)
+        self._journal = []
+
+
+###############################################
+def iter_ingest(members, backend: StorageBackend, max_workers: int = 1, chunk_size: int = 1, max_matches: int = None,
+                max_rows: int = None, max_bytes: int = None, pipelined: bool = False, read_ahead_bytes: int = None,
+                parse_ahead_bytes: int = None):
+    """
+    Generator form of ingest_members: streams (member_name, raw_bytes) pairs through parsing into backend.write_match
+    one match at a time, and commits whenever the matches written since the last commit reach max_matches, max_rows
+    rows or max_bytes bytes (see pipeline.FlushBudget). After each commit it yields the counts of the chunk just
+    committed, so the caller can report progress or stop early; the remainder is committed when members run out.
+
+    Only the match being written, the chunks in flight in the parse workers and, with pipelined=True, the queues
+    between the stages are held in memory, so peak RSS does not grow with the archive. read_ahead_bytes and
+    parse_ahead_bytes bound those queues by size (see pipeline.pipelined_parse); without them they are bounded
+    by count only.
+
+    Returns:
+    -----------
+        generator of dicts mapping table name to [rows_written, rows_skipped], one per commit
+    """
+    budget = FlushBudget(max_matches=max_matches, max_rows=max_rows, max_bytes=max_bytes)
+    if pipelined:
+        parsed_matches = pipelined_parse(members, max_workers=max_workers, chunk_size=chunk_size,
+                                         read_ahead_bytes=read_ahead_bytes, parse_ahead_bytes=parse_ahead_bytes)
+    else:
+        parsed_matches = parse_match_members(members, max_workers=max_workers, chunk_size=chunk_size)
+    counts = {table: [0, 0] for table in INGEST_TABLES}
+    try:
+        for parsed in parsed_matches:
+            for table, (rows_written, rows_skipped) in backend.write_match(*parsed).items():
+                counts[table][0] += rows_written
+                counts[table][1] += rows_skipped
+            if budget.add(parsed):
+                backend.commit()
+                budget.reset()
+                yield counts
+                counts = {table: [0, 0] for table in INGEST_TABLES}
+        backend.commit()
+    except BaseException:
+        #also reached when the caller closes the generator before the end: what was not committed is rolled back
+        backend.rollback()
+        if pipelined:
+            parsed_matches.close()
+        raise
+    if budget.matches:
+        yield counts
+
+
+def ingest_members(members, backend: StorageBackend, max_workers: int = 1, chunk_size: int = 1, commit_every: int = 1,
+                   pipelined: bool = False, max_rows: int = None, max_bytes: int = None, read_ahead_bytes: int = None,
+                   parse_ahead_bytes: int = None):
+    """
+    Runs the parse/write pipeline end to end against any storage backend: parses (member_name, raw_bytes) pairs
+    (see sources.iter_archive_members) with functions.parse_match_members and writes each match with
+    backend.write_match, committing every commit_every matches, or sooner once max_rows rows or max_bytes bytes
+    are pending (see iter_ingest). On error the open transaction is rolled back.
+    With pipelined=True reading and parsing run in background threads ahead of the writes (see pipeline.pipelined_parse),
+    with read_ahead_bytes and parse_ahead_bytes bounding the queues between them by size.
+
+    Returns:
+    -----------
+        dict mapping table name to [rows_written, rows_skipped]
+    """
+    totals = {table: [0, 0] for table in INGEST_TABLES}
+    for counts in iter_ingest(members, backend, max_workers=max_workers, chunk_size=chunk_size, max_matches=commit_every,
+                              max_rows=max_rows, max_bytes=max_bytes, pipelined=pipelined, read_ahead_bytes=read_ahead_bytes,
+                              parse_ahead_bytes=parse_ahead_bytes):
+        for table, (rows_written, rows_skipped) in counts.items():
+            totals[table][0] += rows_written
+            totals[table][1] += rows_skipped
+    return totals
@@ -0,0 +1,186 @@
+import io
+import json
+import random
+import zipfile
+
+
+TEAMS = [
+    "Afghanistan", "Australia", "Bangladesh", "England", "India", "Ireland", "Netherlands",
+    "New Zealand", "Pakistan", "Scotland", "South Africa", "Sri Lanka", "West Indies", "Zimbabwe",
+]
+
+VENUES = [
+    ("Melbourne Cricket Ground", "Melbourne"), ("Lord's, London", "London"), ("Eden Gardens", "Kolkata"),
+    ("Dubai International Cricket Stadium", None), ("Newlands", "Cape Town"), ("Sharjah Cricket Stadium", "Sharjah"),
+]
+
+SEASONS = ["2017", "2017/18", "2018", "2018/19", "2019", "2019/20"]
+
+EXTRAS_KINDS = ["wides", "noballs", "byes", "legbyes"]
+
+WICKET_KINDS = ["caught", "bowled", "lbw", "run out", "stumped", "caught and bowled"]
+
+
+###############################################
+def _registry_id(rng: random.Random):
+    return "{:08x}".format(rng.getrandbits(32))
+
+
+def _generate_innings(rng: random.Random, batting_team: str, batters: list, bowlers: list, overs: int,
+                      balls_per_over: int, wicket_rate: float, extras_rate: float):
+    """
+    Generates one innings: overs until the over limit or all out. Wides and no-balls are re-bowled, as in Cricsheet data.
+    """
+    striker, non_striker, next_batter = 0, 1, 2
+    wickets = 0
+    innings_overs = []
+    for over_num in range(overs):
+        bowler = bowlers[over_num % len(bowlers)]
+        deliveries = []
+        legal_balls = 0
+        while legal_balls < balls_per_over and wickets < len(batters) - 1:
+            batter_runs = rng.choices([0, 1, 2, 3, 4, 6], weights=[50, 30, 8, 1, 9, 2])[0]
+            delivery = {
+                "batter": batters[striker],
+                "bowler": bowler,
+                "non_striker": batters[non_striker],
+                "runs": {"batter": batter_runs, "extras": 0, "total": batter_runs},
+            }
+
+            legal = True
+            if rng.random() < extras_rate:
+                kind = rng.choice(EXTRAS_KINDS)
+                extra_runs = 1 if kind in ("wides", "noballs") else rng.choice([1, 2, 4])
+                delivery["extras"] = {kind: extra_runs}
+                delivery["runs"]["extras"] = extra_runs
+                delivery["runs"]["total"] += extra_runs
+                if kind == "wides":
+                    delivery["runs"]["batter"] = 0
+                    delivery["runs"]["total"] = extra_runs
+                legal = kind not in ("wides", "noballs")
+
+            if legal and rng.random() < wicket_rate:
+                kind = rng.choice(WICKET_KINDS)
+                wicket = {"player_out": batters[striker], "kind": kind}
+                if kind in ("caught", "run out", "stumped"):
+                    wicket["fielders"] = [{"name": rng.choice(bowlers)}]
+                delivery["wickets"] = [wicket]
+                wickets += 1
+                striker = next_batter
+                next_batter += 1
+
+            if delivery["runs"]["batter"] % 2 == 1:
+                striker, non_striker = non_striker, striker
+
+            deliveries.append(delivery)
+            legal_balls += legal
+
+        if not deliveries:
+            break
+        innings_overs.append({"over": over_num, "deliveries": deliveries})
+        striker, non_striker = non_striker, striker
+        if wickets >= len(batters) - 1:
+            break
+
+    return {"team": batting_team, "overs": innings_overs}
+
+
+def generate_match(match_type_number: int, seed: int = 0, overs: int = 50, balls_per_over: int = 6,
+                   wicket_rate: float = 0.03, extras_rate: float = 0.05, n_teams: int = len(TEAMS)):
+    """
+    Generates a Cricsheet-shaped ODI match (the JSON 'meta', 'info' and 'innings' layout the parsers read).
+
+    Parameters:
+    ------------
+        match_type_number (int): Used as the match number and, with seed, to seed the generator,
+                                 so the same arguments always produce the same match.
+        seed (int): Base seed.
+        overs (int): Overs per innings.
+        balls_per_over (int): Legal deliveries per over.
+        wicket_rate (float): Probability that a legal delivery takes a wicket.
+        extras_rate (float): Probability that a delivery concedes extras (wides and no-balls are re-bowled).
+        n_teams (int): Number of teams drawn from TEAMS, which bounds how many distinct teams and players a corpus has.
+
+    Returns:
+    -----------
+        dict: The match, ready for json.dumps.
+    """
+    rng = random.Random(seed * 1000003 + match_type_number)
+    team1, team2 = rng.sample(TEAMS[:n_teams], 2)
+
+    #squads are stable per team across matches, so dimension tables stay small as in the real corpus
+    players, people = {}, {}
+    for team in (team1, team2):
+        team_rng = random.Random("{}-{}".format(seed, team))
+        players[team] = ["{} Player {}".format(team, i) for i in range(1, 12)]
+        for player in players[team]:
+            people[player] = _registry_id(team_rng)
+    umpires = ["Umpire {}".format(rng.randint(1, 40)) for _ in range(2)]
+    for umpire in umpires:
+        people[umpire] = _registry_id(random.Random(umpire))
+
+    innings = [
+        _generate_innings(rng, team1, players[team1], players[team2][-5:], overs, balls_per_over, wicket_rate, extras_rate),
+        _generate_innings(rng, team2, players[team2], players[team1][-5:], overs, balls_per_over, wicket_rate, extras_rate),
+    ]
+
+    totals = [sum(d["runs"]["total"] for over in i["overs"] for d in over["deliveries"]) for i in innings]
+    if totals[0] == totals[1]:
+        outcome = {"result": "tie"}
+    elif totals[0] > totals[1]:
+        outcome = {"winner": team1, "by": {"runs": totals[0] - totals[1]}}
+    else:
+        outcome = {"winner": team2, "by": {"wickets": rng.randint(1, 10)}}
+
+    venue, city = rng.choice(VENUES)
+    season = rng.choice(SEASONS)
+    date = "{}-{:02d}-{:02d}".format(season[:4], rng.randint(1, 12), rng.randint(1, 28))
+    toss_winner = rng.choice([team1, team2])
+
+    info = {
+        "balls_per_over": balls_per_over,
+        "dates": [date],
+        "event": {"name": "Synthetic ODI Series", "match_number": rng.randint(1, 5)},
+        "gender": rng.choice(["male", "male", "female"]),
+        "match_type": "ODI",
+        "match_type_number": match_type_number,
+        "officials": {"umpires": umpires},
+        "outcome": outcome,
+        "overs": overs,
+        "player_of_match": [rng.choice(players[team1] + players[team2])],
+        "players": players,
+        "registry": {"people": people},
+        "season": season,
+        "team_type": "international",
+        "teams": [team1, team2],
+        "toss": {"decision": rng.choice(["bat", "field"]), "winner": toss_winner},
+        "venue": venue,
+    }
+    if city is not None:
+        info["city"] = city
+
+    return {"meta": {"data_version": "1.1.0", "created": date, "revision": 1}, "info": info, "innings": innings}
+
+
+def generate_archive(n_matches: int, seed: int = 0, first_match_id: int = 1000001, **match_options):
+    """
+    Generates a Cricsheet-style zip archive of n_matches matches, named '<match id>.json' like the real archive.
+
+    Parameters:
+    ------------
+        n_matches (int): Number of matches.
+        seed (int): Base seed; the same arguments always produce the same archive.
+        first_match_id (int): File id of the first match; ids are consecutive.
+        **match_options: Passed to generate_match (overs, balls_per_over, wicket_rate, extras_rate, n_teams).
+
+    Returns:
+    -----------
+        bytes: The archive, readable by sources.iter_archive_members.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for i in range(n_matches):
+            match = generate_match(i + 1, seed=seed, **match_options)
+            zip_file.writestr("{}.json".format(first_match_id + i), json.dumps(match))
+        zip_file.writestr("README.txt", "Synthetic Cricsheet-shaped ODI matches.\n")
+    return buffer.getvalue()
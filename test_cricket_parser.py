@@ -0,0 +1,128 @@
+import io
+import json
+import tempfile
+import threading
+import zipfile
+
+import pytest
+
+import cricket_parser
+from functions import DELIVERY_DETAIL_TABLES, ROLLUP_TABLES, ManifestMissingError
+from synthetic_cricsheet import generate_archive
+
+
+###############################################
+def count_rows(cnx, table: str):
+    cursor = cnx.cursor()
+    cursor.execute("SELECT COUNT(*) FROM {}".format(table))
+    count = cursor.fetchall()[0][0]
+    cursor.close()
+    return count
+
+
+def test_incremental_ingest_refuses_a_database_without_a_load_manifest(local_ingest):
+    archive = generate_archive(3, overs=5)
+    local_ingest(archive)
+    #a database loaded by the original script: matches, but no manifest entries
+    cnx = local_ingest.connect()
+    cnx.cursor().execute("DELETE FROM load_manifest")
+    cnx.commit()
+    deliveries = count_rows(cnx, 'innings_info')
+
+    with pytest.raises(ManifestMissingError):
+        local_ingest(archive)
+    assert count_rows(cnx, 'innings_info') == deliveries
+
+    local_ingest(archive, mode='full')
+    assert count_rows(cnx, 'load_manifest') == 3
+    assert count_rows(cnx, 'innings_info') == deliveries
+
+
+def replace_member(archive: bytes, member_name: str, edit):
+    #the archive with one match file rewritten by edit(match)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(archive)) as source, zipfile.ZipFile(buffer, 'w') as target:
+        for member in source.infolist():
+            raw = source.read(member)
+            if member.filename == member_name:
+                match = json.loads(raw)
+                edit(match)
+                raw = json.dumps(match)
+            target.writestr(member.filename, raw)
+    return buffer.getvalue()
+
+
+def rows_by_match(cnx, table: str):
+    #match_id -> sorted rows of the table, without the auto-incremented innings_id
+    cursor = cnx.cursor()
+    cursor.execute("SELECT * FROM {}".format(table))
+    columns = [column[0] for column in cursor.description]
+    rows = {}
+    for row in cursor.fetchall():
+        row = dict(zip(columns, row))
+        row.pop('innings_id', None)
+        row.pop('loaded_at', None)
+        rows.setdefault(row['match_id'], []).append(tuple(row.values()))
+    cursor.close()
+    return {match_id: sorted(match_rows, key=repr) for match_id, match_rows in rows.items()}
+
+
+MATCH_TABLES = ['match_info', 'innings_info', 'load_manifest'] + DELIVERY_DETAIL_TABLES + ROLLUP_TABLES
+
+
+def test_a_changed_file_replaces_only_its_match(local_ingest):
+    archive = generate_archive(4, overs=10, wicket_rate=0.1, extras_rate=0.1)
+    local_ingest(archive)
+    cnx = local_ingest.connect()
+    before = {table: rows_by_match(cnx, table) for table in MATCH_TABLES}
+    dimensions = {table: count_rows(cnx, table) for table in ['teams', 'players']}
+
+    def edit(match):
+        teams, outcome = match['info']['teams'], match['info']['outcome']
+        outcome['winner'] = teams[1] if outcome.get('winner') == teams[0] else teams[0]
+        match['innings'][0]['overs'][0]['deliveries'][0]['runs']['batter'] += 1
+    changed_archive = replace_member(archive, '1000002.json', edit)
+    counts = local_ingest(changed_archive)
+
+    assert counts['match_info'] == [1, 0]
+    after = {table: rows_by_match(cnx, table) for table in MATCH_TABLES}
+    for table in MATCH_TABLES:
+        #the other matches are untouched, and the changed one is back under its id with as many rows as before
+        assert after[table].keys() == before[table].keys(), table
+        for match_id in before[table]:
+            if match_id != 1000002:
+                assert after[table][match_id] == before[table][match_id], table
+            assert len(after[table][match_id]) == len(before[table][match_id]), table
+    for table in ['match_info', 'innings_info', 'load_manifest', 'innings_summary']:
+        assert after[table][1000002] != before[table][1000002], table
+    assert {table: count_rows(cnx, table) for table in dimensions} == dimensions
+
+    #once stored, the changed file is skipped like the others
+    assert local_ingest(changed_archive) == {}
+
+
+@pytest.mark.parametrize('pipeline', [False, True])
+@pytest.mark.parametrize('writer', ['batched', 'bulk_load', 'writer_pool'])
+def test_a_parse_error_rolls_back_and_cleans_up(local_ingest, tmp_path, monkeypatch, writer, pipeline):
+    buffer = io.BytesIO(generate_archive(4, overs=5))
+    with zipfile.ZipFile(buffer, 'a') as zip_file:
+        zip_file.writestr('1000009.json', '{"info": ')
+    archive = buffer.getvalue()
+    #every match so far is still in the open transaction when the bad file is reached
+    monkeypatch.setattr(cricket_parser, 'COMMIT_EVERY_N_MATCHES', 100)
+    monkeypatch.setattr(cricket_parser, 'BULK_LOAD_ROWS', 10 ** 6)
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    options = {'bulk_load': writer == 'bulk_load', 'writer_pool_size': 3 if writer == 'writer_pool' else 1}
+
+    with pytest.raises(ValueError):
+        local_ingest(archive, pipeline=pipeline, **options)
+
+    assert not list(tmp_path.glob('*.tsv'))
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('writer-')]
+    cnx = local_ingest.connect()
+    if writer != 'writer_pool':
+        #pooled matches commit one by one; the others were rolled back with the open transaction
+        assert count_rows(cnx, 'match_info') == 0
+    #nothing is left holding the database
+    cnx.cursor().execute("DELETE FROM load_manifest")
+    cnx.commit()
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from pandas.testing import assert_frame_equal
+
+from decoding import decode_match
+from functions import parse_match_data
+from synthetic_cricsheet import generate_match
+
+
+###############################################
+def assert_parsed_equal(parsed, expected):
+    for item, expected_item in zip(parsed, expected):
+        if isinstance(expected_item, dict):
+            assert list(item) == list(expected_item)
+            for table in expected_item:
+                assert_frame_equal(item[table], expected_item[table])
+        else:
+            assert_frame_equal(item, expected_item)
+
+
+def match_without_overs():
+    match = generate_match(1, seed=0, overs=5)
+    team1, team2 = match['info']['teams']
+    #an innings with no 'overs' key, before, between and after innings that have deliveries
+    match['innings'].insert(0, {'team': team2})
+    match['innings'].insert(2, {'team': team2, 'forfeited': True})
+    match['innings'].append({'team': team1, 'target': {'runs': 1}})
+    return match
+
+
+@pytest.mark.parametrize('decoder', ['orjson', 'ijson'])
+@pytest.mark.parametrize('make_match', [lambda: generate_match(1, seed=0), match_without_overs])
+def test_decoders_parse_the_same_frames(decoder, make_match):
+    raw = json.dumps(make_match()).encode()
+    expected = parse_match_data(decode_match(raw, 'json'), 1000001)
+    assert_parsed_equal(parse_match_data(decode_match(raw, decoder), 1000001), expected)
+
+
+def test_innings_without_overs_are_kept():
+    match = match_without_overs()
+    innings_df, _, rollups = parse_match_data(match, 1000001)[3:]
+    assert rollups['innings_summary']['innings_num'].tolist() == [1, 2, 3, 4, 5]
+    assert sorted(innings_df['innings_num'].unique()) == [2, 4]
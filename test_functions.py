@@ -0,0 +1,270 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from functions import (INNINGS_STATE_COLUMNS, InningsBulkLoader, _grouped_cumsum, insert_rows_batched, parse_innings_info,
+                       parse_match_data, parse_match_info, parse_team_player_info, run_rate, write_parsed_match)
+from storage import LocalDatabase
+from synthetic_cricsheet import generate_match
+
+
+###############################################
+#reference implementations: parse_team_player_info and parse_innings_info as they were before the single-pass
+#columnar rewrite, kept here to check that the rewrite returns the same frames
+def reference_parse_team_player_info(json_data: dict):
+    temp_people = json_data['info']['registry']['people']
+    player_df = pd.DataFrame(columns = ["team", "player_name", "registryID"])
+    for team in json_data['info']['teams']:
+        for player in json_data['info']['players'][team]:
+            temp_df = pd.DataFrame({"team": [team], "player_name": [player], "registryID": [temp_people[player]]})
+            player_df = pd.concat([player_df, temp_df], axis = 0)
+
+    team_df = player_df[['team']].drop_duplicates()
+    player_df = player_df[['player_name','registryID']]
+    return team_df, player_df
+
+
+def reference_parse_innings_info(json_data: dict, match_id: int):
+    team_lst, over_lst, batter_lst, bowler_lst, non_striker_lst = [], [], [], [], []
+    batter_runs_lst, extra_runs_lst, wicket_lst = [], [], []
+    for i in range(len(json_data['innings'])):
+        for over in json_data['innings'][i]['overs']:
+            for delivery in over['deliveries']:
+                team_lst.append(json_data['innings'][i]['team'])
+                over_lst.append(over['over'])
+                batter_lst.append(delivery['batter'])
+                bowler_lst.append(delivery['bowler'])
+                non_striker_lst.append(delivery['non_striker'])
+                batter_runs_lst.append(delivery['runs']['batter'])
+                extra_runs_lst.append(delivery['runs']['extras'])
+                try:
+                    wicket_lst.append(json.dumps(delivery['wickets'][0]))
+                except:
+                    wicket_lst.append(None)
+
+    innings_df = pd.DataFrame({
+        "team": team_lst,
+        "over_num": over_lst,
+        "batter": batter_lst,
+        "bowler": bowler_lst,
+        "non_striker": non_striker_lst,
+        "batter_runs": batter_runs_lst,
+        "extra_runs": extra_runs_lst,
+        "wickets": wicket_lst
+    })
+    innings_df['match_id'] = match_id
+    return innings_df
+
+
+###############################################
+MATCHES = {
+    'odi': lambda: generate_match(1, seed=0),
+    'eight_ball_overs': lambda: generate_match(2, seed=1, overs=20, balls_per_over=8),
+    'many_wickets_and_extras': lambda: generate_match(3, seed=2, wicket_rate=0.2, extras_rate=0.3),
+    'no_wickets': lambda: generate_match(4, seed=3, overs=5, wicket_rate=0.0),
+    'no_innings': lambda: dict(generate_match(5, seed=4), innings=[]),
+    'no_deliveries': lambda: dict(generate_match(6, seed=5), innings=[{'team': 'Australia', 'overs': []}]),
+}
+
+
+@pytest.mark.parametrize('name', MATCHES)
+def test_parse_team_player_info_matches_reference(name):
+    match = MATCHES[name]()
+    team_df, player_df = parse_team_player_info(match)
+    reference_team_df, reference_player_df = reference_parse_team_player_info(match)
+    assert_frame_equal(team_df, reference_team_df)
+    assert_frame_equal(player_df, reference_player_df)
+
+
+@pytest.mark.parametrize('name', MATCHES)
+def test_parse_innings_info_matches_reference(name):
+    match = MATCHES[name]()
+    match_info_df = parse_match_info(match, match_id=1000001)
+    innings_df = parse_innings_info(match, match_info_df)
+    reference_df = reference_parse_innings_info(match, match_id=1000001)
+
+    #later columns (delivery_num, the innings state) are added on; the reference ones keep their order and dtypes
+    assert [column for column in innings_df.columns if column in reference_df.columns] == list(reference_df.columns)
+    assert_frame_equal(innings_df[list(reference_df.columns)], reference_df)
+
+
+###############################################
+def read_innings_rows(cnx):
+    cursor = cnx.cursor()
+    cursor.execute("SELECT * FROM innings_info ORDER BY match_id, delivery_num")
+    rows = [row[1:] for row in cursor.fetchall()] #without the auto-incremented innings_id
+    cursor.close()
+    return rows
+
+
+def test_bulk_load_and_batched_inserts_load_the_same_rows():
+    innings_frames = []
+    for match_id, match in enumerate([generate_match(1, seed=0), generate_match(2, seed=1, wicket_rate=0.2),
+                                      generate_match(3, seed=2, overs=2, wicket_rate=0.3)], 1000001):
+        innings_frames.append(parse_match_data(match, match_id)[3])
+    #values the LOAD DATA file has to escape, a literal \N that must not load as NULL, and NULLs
+    awkward = innings_frames[2]
+    awkward.loc[0:5, 'batter'] = ['tab\there', 'new\nline', 'carriage\rreturn', 'back\\slash', '\\N', 'nul\0byte']
+    awkward.loc[6:7, 'non_striker'] = ['Ünïcødé', None]
+    awkward.loc[8, 'run_rate'] = float('nan')
+    assert awkward['wickets'].isna().any() and awkward['wickets'].str.contains('"').any()
+
+    batched = LocalDatabase()
+    for innings_df in innings_frames:
+        insert_rows_batched('innings_info', innings_df, batched)
+
+    bulk = LocalDatabase()
+    innings_loader = InningsBulkLoader(bulk, rows_per_load=500)
+    rows_loaded = sum(innings_loader.add(innings_df) for innings_df in innings_frames) + innings_loader.flush()
+    bulk.commit()
+
+    assert rows_loaded == sum(len(innings_df) for innings_df in innings_frames)
+    assert read_innings_rows(bulk) == read_innings_rows(batched)
+
+
+###############################################
+def delivery(batter: str, runs: int = 0, extras: dict = None, wicket: str = None, non_boundary: bool = False):
+    delivery = {'batter': batter, 'bowler': 'Bowler', 'non_striker': 'Partner',
+                'runs': {'batter': runs, 'extras': sum((extras or {}).values()), 'total': runs + sum((extras or {}).values())}}
+    if extras:
+        delivery['extras'] = extras
+    if wicket:
+        delivery['wickets'] = [{'player_out': batter, 'kind': wicket}]
+    if non_boundary:
+        delivery['runs']['non_boundary'] = True
+    return delivery
+
+
+def hand_computed_match():
+    #a first innings, a chase of 22 in 2 overs and two super overs, with the state after every delivery worked out by
+    #hand in HAND_COMPUTED_STATE
+    match = generate_match(1, seed=0)
+    team1, team2 = match['info']['teams']
+    match['info']['outcome'] = {'winner': team2, 'by': {'wickets': 9}}
+    match['innings'] = [
+        {'team': team1, 'overs': [
+            {'over': 0, 'deliveries': [delivery('A', 1), delivery('A', extras={'wides': 1}), delivery('A', 4),
+                                       delivery('A', wicket='bowled'), delivery('B', 6, extras={'noballs': 1}),
+                                       delivery('B'), delivery('B', extras={'legbyes': 1}), delivery('C', 2)]},
+            {'over': 1, 'deliveries': [delivery('C', 4, non_boundary=True), delivery('C', wicket='retired hurt'),
+                                       delivery('B', 1, wicket='run out')]}]},
+        {'team': team2, 'target': {'overs': 2, 'runs': 22}, 'overs': [
+            {'over': 0, 'deliveries': [delivery('D', extras={'wides': 5}), delivery('D', 6), delivery('D', wicket='caught')]}]},
+        {'team': team2, 'super_over': True, 'overs': [
+            {'over': 0, 'deliveries': [delivery('E', 1), delivery('F', 4)]}]},
+        {'team': team1, 'super_over': True, 'overs': [
+            {'over': 0, 'deliveries': [delivery('A', wicket='bowled')]}]},
+    ]
+    return match
+
+
+HAND_COMPUTED_STATE = pd.DataFrame([
+    #innings_num, ball_in_over, is_legal, legal_balls, team_score, team_wickets, run_rate, is_dot, is_boundary
+    (1, 1, 1, 1, 1, 0, 6.0, 0, 0),
+    (1, 1, 0, 1, 2, 0, 12.0, 0, 0),        #wide: the ball is bowled again
+    (1, 2, 1, 2, 6, 0, 18.0, 0, 1),
+    (1, 3, 1, 3, 6, 1, 12.0, 1, 0),        #bowled
+    (1, 3, 0, 3, 13, 1, 26.0, 0, 1),       #six off a no-ball: a boundary, but not a legal ball
+    (1, 4, 1, 4, 13, 1, 19.5, 1, 0),
+    (1, 5, 1, 5, 14, 1, 16.8, 0, 0),       #leg bye: a legal ball, but not a dot
+    (1, 6, 1, 6, 16, 1, 16.0, 0, 0),
+    (1, 1, 1, 7, 20, 1, 120 / 7, 0, 0),    #four all run
+    (1, 2, 1, 8, 20, 1, 15.0, 1, 0),       #retired hurt is not a dismissal
+    (1, 3, 1, 9, 21, 2, 14.0, 0, 0),       #run out after a single
+    (2, 0, 0, 0, 5, 0, np.nan, 0, 0),      #the chase opens with five wides: no legal ball yet
+    (2, 1, 1, 1, 11, 0, 66.0, 0, 1),
+    (2, 2, 1, 2, 11, 1, 33.0, 1, 0),
+    (3, 1, 1, 1, 1, 0, 6.0, 0, 0),         #a super over restarts every count, though its over number repeats
+    (3, 2, 1, 2, 5, 0, 15.0, 0, 1),
+    (4, 1, 1, 1, 0, 1, 0.0, 1, 0),
+], columns=INNINGS_STATE_COLUMNS)
+
+
+def test_innings_state_columns_of_a_hand_computed_match():
+    innings_df = parse_innings_info(hand_computed_match(), pd.DataFrame(), match_id=1000001)
+    assert_frame_equal(innings_df[INNINGS_STATE_COLUMNS], HAND_COMPUTED_STATE, check_dtype=False)
+    assert innings_df['team_score'].dtype == innings_df['legal_balls'].dtype == np.int64
+
+
+def test_the_chase_and_super_overs_carry_their_context_into_innings_summary():
+    rollups = {}
+    parse_innings_info(hand_computed_match(), pd.DataFrame(), match_id=1000001, rollups=rollups)
+    innings_summary = rollups['innings_summary']
+    assert innings_summary[['runs', 'wickets', 'legal_balls', 'overs', 'run_rate']].values.tolist() == [
+        [21, 2, 9, 1.3, 14.0], [11, 1, 2, 0.2, 33.0], [5, 0, 2, 0.2, 15.0], [0, 1, 1, 0.1, 0.0]]
+    #only the chase has a target
+    assert innings_summary['target_runs'].isna().tolist() == innings_summary['target_overs'].isna().tolist() == [True, False, True, True]
+    assert (innings_summary['target_runs'][1], innings_summary['target_overs'][1]) == (22, 2)
+    assert innings_summary['super_over'].tolist() == [0, 0, 1, 1]
+    assert innings_summary['won'].tolist() == [0, 1, 1, 0]
+
+
+def test_grouped_cumsum_restarts_at_each_group():
+    values = np.array([1, 2, 0, 3, 4, 0, 5])
+    starts = np.array([True, False, True, False, False, True, True])
+    assert _grouped_cumsum(values, starts).tolist() == [1, 3, 0, 3, 7, 0, 5]
+
+
+def test_run_rate_is_nan_until_the_first_legal_ball():
+    rates = run_rate(np.array([4, 4, 10]), np.array([0, 1, 8]), balls_per_over=8)
+    assert np.isnan(rates[0])
+    assert rates[1:].tolist() == [32.0, 10.0]
+
+
+###############################################
+def rollups_by_groupby(innings_df: pd.DataFrame, balls_per_over: int):
+    #over_summary and innings_summary recomputed from the parsed deliveries with pandas
+    deliveries = innings_df.assign(runs=innings_df['batter_runs'] + innings_df['extra_runs'])
+    overs = deliveries.groupby(['innings_num', 'over_num'], sort=False).agg(
+        team=('team', 'first'), bowler=('bowler', 'first'), runs=('runs', 'sum'), extra_runs=('extra_runs', 'sum'),
+        legal_balls=('is_legal', 'sum'), dot_balls=('is_dot', 'sum'), boundaries=('is_boundary', 'sum'),
+        team_score=('team_score', 'last'), team_wickets=('team_wickets', 'last')).reset_index()
+    #the wickets of an over are the rise in team_wickets since the end of the previous over of its innings
+    overs['wickets'] = overs['team_wickets'] - overs.groupby('innings_num')['team_wickets'].shift(fill_value=0)
+
+    innings = deliveries.groupby('innings_num', sort=False).agg(
+        team=('team', 'first'), runs=('runs', 'sum'), wickets=('team_wickets', 'last'), legal_balls=('is_legal', 'sum'),
+        extra_runs=('extra_runs', 'sum'), dot_balls=('is_dot', 'sum'), boundaries=('is_boundary', 'sum')).reset_index()
+    innings['overs'] = innings['legal_balls'] // balls_per_over + innings['legal_balls'] % balls_per_over / 10
+    innings['run_rate'] = innings['runs'] * balls_per_over / innings['legal_balls']
+    return overs, innings
+
+
+@pytest.mark.parametrize('name', ['odi', 'eight_ball_overs', 'many_wickets_and_extras', 'no_wickets'])
+def test_rollups_equal_a_groupby_over_the_deliveries(name):
+    match = MATCHES[name]()
+    rollups = {}
+    innings_df = parse_innings_info(match, pd.DataFrame(), match_id=1000001, rollups=rollups)
+    overs, innings = rollups_by_groupby(innings_df, match['info'].get('balls_per_over', 6))
+
+    over_summary = rollups['over_summary']
+    assert (over_summary['match_id'] == 1000001).all()
+    assert_frame_equal(over_summary[overs.columns], overs, check_dtype=False)
+    innings_summary = rollups['innings_summary']
+    assert_frame_equal(innings_summary[innings.columns], innings, check_dtype=False)
+    assert innings_summary['runs'].sum() == over_summary['runs'].sum() == innings_df['team_score'].groupby(innings_df['innings_num']).last().sum()
+
+
+def test_written_rollups_equal_a_group_by_over_innings_info():
+    cnx = LocalDatabase()
+    for match_id, match in enumerate([generate_match(1, seed=0, wicket_rate=0.2, extras_rate=0.3),
+                                      generate_match(2, seed=1, overs=20, balls_per_over=8)], 1000001):
+        write_parsed_match(*parse_match_data(match, match_id), cnx=cnx, batch_size=1000)
+    cursor = cnx.cursor()
+    cursor.execute("""SELECT match_id, innings_num, over_num, SUM(batter_runs + extra_runs), SUM(extra_runs), SUM(is_legal),
+                             SUM(is_dot), SUM(is_boundary), MAX(team_score), MAX(team_wickets)
+                      FROM innings_info GROUP BY match_id, innings_num, over_num ORDER BY 1, 2, 3""")
+    grouped_overs = cursor.fetchall()
+    cursor.execute("""SELECT match_id, innings_num, over_num, runs, extra_runs, legal_balls, dot_balls, boundaries, team_score,
+                             team_wickets
+                      FROM over_summary ORDER BY 1, 2, 3""")
+    assert cursor.fetchall() == grouped_overs
+    cursor.execute("""SELECT match_id, innings_num, SUM(batter_runs + extra_runs), SUM(is_legal), MAX(team_wickets)
+                      FROM innings_info GROUP BY match_id, innings_num ORDER BY 1, 2""")
+    grouped_innings = cursor.fetchall()
+    cursor.execute("SELECT match_id, innings_num, runs, legal_balls, wickets FROM innings_summary ORDER BY 1, 2")
+    assert cursor.fetchall() == grouped_innings
+    cursor.close()
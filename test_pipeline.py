@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from functions import parse_match_data
+from pipeline import BackgroundIterator, FlushBudget, parsed_nbytes, parsed_rows
+from synthetic_cricsheet import generate_match
+
+
+###############################################
+def parsed_match(match_type_number: int, **options):
+    return parse_match_data(generate_match(match_type_number, seed=match_type_number, **options), 1000000 + match_type_number)
+
+
+def test_parsed_rows_counts_every_frame_of_a_match():
+    team_df, player_df, match_info_df, innings_df, delivery_details, rollups = parsed = parsed_match(1, wicket_rate=0.1)
+    assert parsed_rows(parsed) == (len(team_df) + len(player_df) + len(match_info_df) + len(innings_df)
+                                   + sum(len(df) for df in delivery_details.values()) + sum(len(df) for df in rollups.values()))
+
+
+@pytest.mark.parametrize('measure, limit', [(parsed_rows, 'max_rows'), (parsed_nbytes, 'max_bytes')])
+def test_the_budget_trips_once_the_limit_is_reached(measure, limit):
+    small, large = parsed_match(1, overs=5), parsed_match(2, overs=50)
+    budget = FlushBudget(**{limit: measure(small) + measure(large)})
+    assert not budget.add(small)
+    assert budget.add(large)
+    #a single match over the whole budget trips it on its own
+    budget = FlushBudget(**{limit: measure(large) - 1})
+    assert budget.add(large)
+
+
+def test_the_first_limit_reached_trips_the_budget():
+    parsed = parsed_match(1, overs=5)
+    budget = FlushBudget(max_matches=3, max_rows=2 * parsed_rows(parsed))
+    assert not budget.add(parsed)
+    assert budget.add(parsed)
+    budget.reset()
+    assert (budget.matches, budget.rows, budget.nbytes) == (0, 0, 0)
+    assert not budget.add(parsed)
+
+
+def test_an_unbounded_budget_never_trips():
+    budget = FlushBudget()
+    assert not any(budget.add(parsed_match(1, overs=5)) for _ in range(5))
+    #bytes are only measured when they are budgeted
+    assert budget.nbytes == 0
+
+
+###############################################
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def recording(items: list, produced: list):
+    for item in items:
+        produced.append(item)
+        yield item
+
+
+def test_the_queue_blocks_at_its_byte_budget():
+    produced = []
+    iterator = BackgroundIterator(recording(['aaaa', 'bbbb', 'cccc', 'dddd'], produced), max_buffered=10,
+                                  max_buffered_bytes=10, sizeof=len)
+    with iterator:
+        #the third item does not fit next to the first two, so the producer waits with it
+        wait_for(lambda: len(produced) == 3)
+        time.sleep(0.2)
+        assert (len(produced), iterator.buffered_bytes) == (3, 8)
+        assert next(iterator) == 'aaaa'
+        wait_for(lambda: len(produced) == 4)
+        time.sleep(0.2)
+        assert iterator.buffered_bytes == 8
+        assert list(iterator) == ['bbbb', 'cccc', 'dddd']
+        assert iterator.buffered_bytes == 0
+
+
+def test_an_item_over_the_byte_budget_is_admitted_alone():
+    produced = []
+    large = 'x' * 50
+    iterator = BackgroundIterator(recording(['aa', large, 'bb'], produced), max_buffered=10, max_buffered_bytes=10, sizeof=len)
+    with iterator:
+        wait_for(lambda: len(produced) == 2)
+        time.sleep(0.2)
+        assert iterator.buffered_bytes == 2
+        assert next(iterator) == 'aa'
+        #once the buffer is empty the large item goes in, and nothing else until it is taken
+        wait_for(lambda: iterator.buffered_bytes == 50)
+        wait_for(lambda: len(produced) == 3)
+        time.sleep(0.2)
+        assert iterator.buffered_bytes == 50
+        assert list(iterator) == [large, 'bb']
+
+
+def test_closing_releases_a_producer_waiting_for_bytes():
+    produced = []
+    iterator = BackgroundIterator(recording(['aaaa', 'bbbbbbbb', 'cccc'], produced), max_buffered_bytes=10, sizeof=len)
+    wait_for(lambda: len(produced) == 2)
+    iterator.close()
+    assert not iterator._thread.is_alive()
+    assert len(produced) == 2
+
+
+def test_a_byte_budget_needs_a_sizeof_function():
+    with pytest.raises(ValueError):
+        BackgroundIterator(iter([]), max_buffered_bytes=10)
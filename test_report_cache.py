@@ -0,0 +1,169 @@
+import os
+import pickle
+
+import pytest
+
+from report_cache import (ReportCache, bump_data_version, create_data_version_table, read_data_version,
+                          read_data_watermark)
+from reports import top_strike_rate_report
+from storage import LocalDatabase
+from synthetic_cricsheet import SEASONS, generate_archive
+
+
+QUERY = "SELECT team FROM teams WHERE team = %s"
+
+
+###############################################
+def versioned_database(path: str = ':memory:'):
+    cnx = LocalDatabase(path)
+    create_data_version_table(cnx)
+    cnx.commit()
+    return cnx
+
+
+class Query:
+    """
+    Stands in for a report query: counts its runs and returns a fresh result each time.
+    """
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self.runs = 0
+
+    def __call__(self):
+        self.runs += 1
+        return [(self.runs, 'x' * self.size)]
+
+
+def entry_bytes(size: int):
+    return len(pickle.dumps([(1, 'x' * size)], protocol=pickle.HIGHEST_PROTOCOL))
+
+
+###############################################
+def test_a_repeated_query_is_served_from_the_cache():
+    cnx, cache, run = versioned_database(), ReportCache(), Query()
+    assert cache.fetch(QUERY, ('a',), cnx, run) == [(1, 'xxxxxxxxxx')]
+    assert cache.fetch(QUERY, ('a',), cnx, run) == [(1, 'xxxxxxxxxx')]
+    assert cache.fetch(QUERY, ('b',), cnx, run) == [(2, 'xxxxxxxxxx')]
+    assert run.runs == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_bumping_the_data_version_invalidates_cached_results():
+    cnx, cache, run = versioned_database(), ReportCache(), Query()
+    cache.fetch(QUERY, ('a',), cnx, run)
+    bump_data_version(cnx)
+    cnx.commit()
+    assert cache.fetch(QUERY, ('a',), cnx, run) == [(2, 'xxxxxxxxxx')]
+    assert cache.invalidations == 1
+    assert cache.fetch(QUERY, ('a',), cnx, run) == [(2, 'xxxxxxxxxx')]
+    assert run.runs == 2
+
+
+def test_a_database_without_a_data_version_is_not_cached():
+    cnx, cache, run = LocalDatabase(), ReportCache(), Query()
+    cache.fetch(QUERY, (), cnx, run)
+    cache.fetch(QUERY, (), cnx, run)
+    assert run.runs == 2
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_databases_at_the_same_version_do_not_share_entries(tmp_path):
+    directory = str(tmp_path / 'cache')
+    first, second = versioned_database(), versioned_database()
+    assert read_data_version(first) == read_data_version(second) == 0
+    first_run, second_run = Query(), Query()
+    ReportCache(directory).fetch(QUERY, (), first, first_run)
+    #a new process sharing the directory, against the other database
+    ReportCache(directory).fetch(QUERY, (), second, second_run)
+    assert (first_run.runs, second_run.runs) == (1, 1)
+
+
+def test_a_re_created_database_does_not_see_old_entries(tmp_path):
+    path, cache, run = str(tmp_path / 'cricket.db'), ReportCache(str(tmp_path / 'cache')), Query()
+    cache.fetch(QUERY, (), versioned_database(path), run)
+    os.remove(path)
+    cache.fetch(QUERY, (), versioned_database(path), run)
+    assert run.runs == 2
+
+
+def test_a_data_version_table_without_an_epoch_gets_one():
+    cnx = LocalDatabase()
+    cursor = cnx.cursor()
+    cursor.execute("CREATE TABLE data_version (id TINYINT NOT NULL PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0)")
+    cursor.execute("INSERT INTO data_version (id, version) VALUES (1, 7)")
+    assert read_data_watermark(cnx) is None
+    create_data_version_table(cnx)
+    epoch, version = read_data_watermark(cnx)
+    assert (len(epoch), version) == (32, 7)
+    create_data_version_table(cnx)
+    assert read_data_watermark(cnx) == (epoch, 7)
+
+
+###############################################
+def test_memory_entries_are_evicted_least_recently_used_first():
+    cnx, run = versioned_database(), Query(1000)
+    cache = ReportCache(max_memory_bytes=2 * entry_bytes(1000))
+    cache.fetch(QUERY, ('a',), cnx, run)
+    cache.fetch(QUERY, ('b',), cnx, run)
+    cache.fetch(QUERY, ('a',), cnx, run)
+    cache.fetch(QUERY, ('c',), cnx, run)
+    assert cache.evictions == 1
+    assert cache.stats()['memory_bytes'] <= cache.max_memory_bytes
+    #b was the least recently used
+    cache.fetch(QUERY, ('a',), cnx, run)
+    assert run.runs == 3
+    cache.fetch(QUERY, ('b',), cnx, run)
+    assert run.runs == 4
+
+
+def test_disk_entries_are_evicted_least_recently_used_first(tmp_path):
+    cnx, run = versioned_database(), Query(1000)
+    directory = str(tmp_path / 'cache')
+    cache = ReportCache(directory, max_memory_bytes=0, max_disk_bytes=2 * entry_bytes(1000) + 200)
+    epoch, _ = read_data_watermark(cnx)
+    cache.fetch(QUERY, ('a',), cnx, run)
+    cache.fetch(QUERY, ('b',), cnx, run)
+    #file times are the LRU order; set them apart rather than rely on the clock's resolution
+    os.utime(cache._path(cache.key(QUERY, ('a',), epoch)), (1000, 1000))
+    os.utime(cache._path(cache.key(QUERY, ('b',), epoch)), (2000, 2000))
+    cache.fetch(QUERY, ('a',), cnx, run)
+    assert cache.disk_hits == 1
+    cache.fetch(QUERY, ('c',), cnx, run)
+    assert len(os.listdir(directory)) == 2
+    assert not os.path.exists(cache._path(cache.key(QUERY, ('b',), epoch)))
+    assert os.path.exists(cache._path(cache.key(QUERY, ('a',), epoch)))
+
+
+def test_a_new_cache_on_the_same_directory_starts_warm(tmp_path):
+    cnx, run = versioned_database(), Query()
+    ReportCache(str(tmp_path)).fetch(QUERY, (), cnx, run)
+    cache = ReportCache(str(tmp_path))
+    assert cache.fetch(QUERY, (), cnx, run) == [(1, 'xxxxxxxxxx')]
+    assert (cache.hits, cache.disk_hits, run.runs) == (1, 1, 1)
+
+
+###############################################
+def test_an_ingest_that_changes_nothing_keeps_the_version(local_ingest):
+    archive = generate_archive(3, overs=10)
+    local_ingest(archive)
+    cnx = local_ingest.connect()
+    version = read_data_version(cnx)
+    local_ingest(archive)
+    assert read_data_version(cnx) == version
+    local_ingest(generate_archive(4, overs=10))
+    assert read_data_version(cnx) > version
+
+
+@pytest.mark.parametrize('writer_pool_size', [1, 4])
+def test_raw_table_reports_are_current_after_each_ingest(local_ingest, writer_pool_size):
+    cache = ReportCache()
+    local_ingest(generate_archive(4, overs=10, n_teams=3), writer_pool_size=writer_pool_size)
+    cnx = local_ingest.connect()
+    for season in SEASONS:
+        top_strike_rate_report(cnx, season=season, use_summary_tables=False, cache=cache)
+    local_ingest(generate_archive(12, overs=10, n_teams=3), writer_pool_size=writer_pool_size)
+    for season in SEASONS:
+        after = top_strike_rate_report(cnx, season=season, use_summary_tables=False, cache=cache)
+        assert after.equals(top_strike_rate_report(cnx, season=season, use_summary_tables=False))
+    assert (cache.hits, cache.invalidations) == (0, len(SEASONS))
@@ -0,0 +1,103 @@
+import pytest
+
+from functions import delete_match, parse_match_data, write_parsed_match
+from reports import (SUMMARY_TABLES, add_match_to_summaries, create_summary_tables, ensure_summary_tables,
+                     fold_summary_deltas, rebuild_summary_tables, remove_match_from_summaries, summary_deltas)
+from storage import LocalDatabase
+from synthetic_cricsheet import generate_archive, generate_match
+from test_cricket_parser import replace_member
+
+
+###############################################
+def read_summaries(cnx):
+    summaries = {}
+    cursor = cnx.cursor()
+    for table in SUMMARY_TABLES:
+        cursor.execute("SELECT * FROM {}".format(table))
+        summaries[table] = sorted(cursor.fetchall())
+    cursor.close()
+    return summaries
+
+
+def rebuilt_summaries(path: str):
+    #the summaries recomputed from match_info/innings_info, on a copy so the database under test is left as it is
+    source, copy = LocalDatabase(path), LocalDatabase()
+    source._connection.backup(copy._connection)
+    source.close()
+    rebuild_summary_tables(copy)
+    return read_summaries(copy)
+
+
+def test_ingest_rebuilds_summary_tables_missing_from_a_loaded_database(local_ingest):
+    local_ingest(generate_archive(3, overs=10))
+    #a database loaded before the summary tables existed
+    cnx = local_ingest.connect()
+    for table in SUMMARY_TABLES:
+        cnx.cursor().execute("DROP TABLE {}".format(table))
+    cnx.commit()
+
+    local_ingest(generate_archive(5, overs=10))
+    summaries = read_summaries(cnx)
+    assert sum(games for *_, games in summaries['team_season_summary']) == 2 * 5
+    assert summaries == rebuilt_summaries(local_ingest.path)
+    #once filled, they are left alone
+    assert not ensure_summary_tables(cnx)
+
+
+###############################################
+def test_summary_deltas_match_the_parsed_frames():
+    match = generate_match(1, seed=0, wicket_rate=0.1)
+    match['info']['outcome'] = {'winner': match['info']['teams'][1], 'by': {'runs': 12}}
+    _, _, match_info_df, innings_df, _, _ = parse_match_data(match, 1000001)
+    team_rows, batter_rows = summary_deltas(match_info_df, innings_df)
+
+    season, gender = match_info_df['season'].iloc[0], match_info_df['gender'].iloc[0]
+    team1, team2 = match['info']['teams']
+    assert team_rows == [(season, gender, team1, 0, 1), (season, gender, team2, 1, 1)]
+    by_batter = innings_df.groupby('batter')['batter_runs'].agg(['size', 'sum'])
+    assert sorted(batter_rows) == sorted((season, batter, balls, runs) for batter, balls, runs in by_batter.itertuples())
+    assert sum(balls for _, _, balls, _ in batter_rows) == len(innings_df)
+
+
+def test_summary_deltas_of_a_tie_add_games_but_no_wins():
+    match = generate_match(1, seed=0)
+    match['info']['outcome'] = {'result': 'tie'}
+    _, _, match_info_df, innings_df, _, _ = parse_match_data(match, 1000001)
+    team_rows, _ = summary_deltas(match_info_df, innings_df)
+    assert [(wins, games) for *_, wins, games in team_rows] == [(0, 1), (0, 1)]
+
+
+@pytest.mark.parametrize('deferred', [False, True])
+def test_adding_and_removing_matches_equals_a_rebuild(tmp_path, deferred):
+    path = str(tmp_path / 'cricket.db')
+    cnx = LocalDatabase(path)
+    create_summary_tables(cnx)
+    for match_id, match in enumerate([generate_match(i, seed=3, overs=10, n_teams=3) for i in range(1, 6)], 1000001):
+        team_df, player_df, match_info_df, innings_df, delivery_details, rollups = parse_match_data(match, match_id)
+        write_parsed_match(team_df, player_df, match_info_df, innings_df, delivery_details, rollups, cnx=cnx,
+                           batch_size=1000, commit=False)
+        add_match_to_summaries(match_info_df, innings_df, cnx, deferred=deferred)
+    #n_teams=3: the matches share teams and batters, so the summary rows are updated, not only inserted
+    remove_match_from_summaries(1000002, cnx, deferred=deferred)
+    delete_match(1000002, cnx)
+    if deferred:
+        assert fold_summary_deltas(cnx) > 0
+    cnx.commit()
+
+    summaries = read_summaries(cnx)
+    assert sum(games for *_, games in summaries['team_season_summary']) == 2 * 4
+    assert summaries == rebuilt_summaries(path)
+
+
+def test_ingest_of_a_changed_file_keeps_the_summaries_equal_to_a_rebuild(local_ingest):
+    archive = generate_archive(6, overs=10, n_teams=3)
+    local_ingest(archive)
+    cnx = local_ingest.connect()
+    assert read_summaries(cnx) == rebuilt_summaries(local_ingest.path)
+
+    def edit(match):
+        teams, outcome = match['info']['teams'], match['info']['outcome']
+        outcome['winner'] = teams[1] if outcome.get('winner') == teams[0] else teams[0]
+        del match['innings'][1]['overs'][-1]
+    local_ingest(replace_member(archive, '1000003.json', edit))
+    assert read_summaries(cnx) == rebuilt_summaries(local_ingest.path)
@@ -0,0 +1,53 @@
+import pytest
+
+from schema import FullScanError, REPORT_QUERIES, check_report_query_plans, full_scans
+
+
+###############################################
+class PlanCursor:
+    """
+    Cursor that answers EXPLAIN with a canned plan per table.
+    """
+
+    def __init__(self, plans: dict):
+        self.plans = plans
+        self.description = [(column,) for column in ['table', 'type', 'key', 'rows']]
+        self._rows = []
+
+    def execute(self, query: str, params=()):
+        self._rows = [row for table, row in self.plans.items() if 'FROM {}'.format(table) in query]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class PlanConnection:
+    def __init__(self, plans: dict):
+        self.plans = plans
+
+    def cursor(self):
+        return PlanCursor(self.plans)
+
+
+def test_full_scans_flags_table_and_full_index_scans():
+    plan = [
+        {'table': 'match_info', 'type': 'ALL'},
+        {'table': 'innings_info', 'type': 'index'},
+        {'table': 'players', 'type': 'ref'},
+        {'table': '<derived2>', 'type': 'ALL'},
+    ]
+    assert [row['table'] for row in full_scans(plan)] == ['match_info', 'innings_info']
+    assert [row['table'] for row in full_scans(plan, allowed_tables=['innings_info'])] == ['match_info']
+
+
+def test_check_report_query_plans_fails_on_a_full_index_scan():
+    indexed = {table: (table, 'ref', 'ix_' + table, 10) for table in ['match_info', 'innings_info', 'team_season_summary',
+                                                                       'batter_season_summary']}
+    assert set(check_report_query_plans(PlanConnection(indexed))) == set(REPORT_QUERIES)
+
+    scanned = dict(indexed, innings_info=('innings_info', 'index', 'PRIMARY', 1000000))
+    with pytest.raises(FullScanError, match='top_strike_rate: full index scan of innings_info'):
+        check_report_query_plans(PlanConnection(scanned))
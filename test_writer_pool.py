@@ -0,0 +1,106 @@
+from functools import partial
+
+import pytest
+
+import cricket_parser
+from functions import DELIVERY_DETAIL_TABLES, ROLLUP_TABLES, parse_match_data
+from reports import SUMMARY_DELTA_TABLES
+from storage import LocalDatabase
+from synthetic_cricsheet import generate_archive, generate_match
+from test_cricket_parser import count_rows, replace_member, rows_by_match
+from test_reports import read_summaries, rebuilt_summaries
+from writer_pool import WriterPool, write_match_unit
+
+
+###############################################
+def read_tables(cnx):
+    tables = {table: rows_by_match(cnx, table) for table in ['match_info', 'innings_info', 'load_manifest']
+              + DELIVERY_DETAIL_TABLES + ROLLUP_TABLES}
+    cursor = cnx.cursor()
+    for table in ['teams', 'players']:
+        cursor.execute("SELECT * FROM {}".format(table))
+        tables[table] = sorted(cursor.fetchall())
+    cursor.close()
+    return tables
+
+
+def test_pooled_ingest_writes_what_one_connection_writes(local_ingest, tmp_path, monkeypatch):
+    #few teams, so concurrent matches share teams, players and summary rows; folds run mid-run as well as at the end
+    archive = generate_archive(24, overs=10, wicket_rate=0.1, extras_rate=0.1, n_teams=4)
+    monkeypatch.setattr(cricket_parser, 'WRITER_POOL_FOLD_EVERY_N_MATCHES', 5)
+
+    def edit(match):
+        teams, outcome = match['info']['teams'], match['info']['outcome']
+        outcome['winner'] = teams[1] if outcome.get('winner') == teams[0] else teams[0]
+    #the second run changes three of the files, so pooled matches also replace stored ones
+    changed_archive = archive
+    for member_name in ['1000002.json', '1000011.json', '1000023.json']:
+        changed_archive = replace_member(changed_archive, member_name, edit)
+
+    single_path, pooled_path = local_ingest.path, str(tmp_path / 'pooled.db')
+    for archive_version, matches_written in [(archive, 24), (changed_archive, 3)]:
+        local_ingest.path = single_path
+        local_ingest(archive_version, writer_pool_size=1)
+        local_ingest.path = pooled_path
+        counts = local_ingest(archive_version, writer_pool_size=4)
+
+        single, pooled = LocalDatabase(single_path), LocalDatabase(pooled_path)
+        assert counts['match_info'] == [matches_written, 0]
+        assert read_tables(pooled) == read_tables(single)
+        assert read_summaries(pooled) == read_summaries(single) == rebuilt_summaries(pooled_path)
+        assert [count_rows(pooled, table) for table in SUMMARY_DELTA_TABLES] == [0, 0]
+
+
+###############################################
+class Deadlock(Exception):
+    errno = 1213
+
+
+def parsed_match(match_type_number: int = 1):
+    return parse_match_data(generate_match(match_type_number, seed=0, overs=5), 1000000 + match_type_number)
+
+
+def test_a_deadlocked_match_is_retried(tmp_path):
+    attempts = []
+
+    def deadlock_once(cnx, parsed, dimension_cache, **options):
+        attempts.append(parsed[2]['match_id'].iloc[0])
+        counts = write_match_unit(cnx, parsed, dimension_cache, **options)
+        if len(attempts) == 1:
+            raise Deadlock()
+        return counts
+
+    path = str(tmp_path / 'cricket.db')
+    with WriterPool(partial(LocalDatabase, path), pool_size=2) as writer_pool:
+        future = writer_pool.submit(parsed_match(), unit=deadlock_once)
+    assert future.result()['match_info'] == (1, 0)
+    assert attempts == [1000001, 1000001]
+    #the first attempt was rolled back, so the match is stored once
+    assert count_rows(LocalDatabase(path), 'match_info') == 1
+
+
+def test_a_match_that_keeps_deadlocking_fails(tmp_path):
+    def deadlock(cnx, parsed, dimension_cache, **options):
+        raise Deadlock()
+
+    writer_pool = WriterPool(partial(LocalDatabase, str(tmp_path / 'cricket.db')), pool_size=1, deadlock_retries=2)
+    future = writer_pool.submit(parsed_match(), unit=deadlock)
+    assert isinstance(future.exception(), Deadlock)
+    with pytest.raises(Deadlock):
+        writer_pool.close()
+
+
+def test_a_unit_error_is_raised_by_submit_and_close(tmp_path):
+    def fail(cnx, parsed, dimension_cache, **options):
+        raise RuntimeError("unit failed")
+
+    writer_pool = WriterPool(partial(LocalDatabase, str(tmp_path / 'cricket.db')), pool_size=2)
+    future = writer_pool.submit(parsed_match(1), unit=fail)
+    assert isinstance(future.exception(), RuntimeError)
+    with pytest.raises(RuntimeError, match="unit failed"):
+        writer_pool.submit(parsed_match(2))
+    with pytest.raises(RuntimeError, match="unit failed"):
+        writer_pool.close()
+    #close is safe to call again, and still reports the error
+    with pytest.raises(RuntimeError, match="unit failed"):
+        writer_pool.close()
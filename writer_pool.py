@@ -0,0 +1,212 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from functions import *
+from metrics import time_stage
+from reports import add_match_to_summaries, remove_match_from_summaries
+
+
+#MySQL errors after which a match transaction is rolled back and retried: deadlock, lock wait timeout
+RETRYABLE_ERRNOS = {1213, 1205}
+
+
+###############################################
+def write_match_unit(cnx, parsed: tuple, dimension_cache: DimensionCache, batch_size: int = 1000, timings: dict = None):
+    """
+    Default unit of work of WriterPool: write_parsed_match without committing, so the match row, its deliveries and
+    its delivery details form one transaction.
+    """
+    return write_parsed_match(*parsed, cnx=cnx, batch_size=batch_size, commit=False, dimension_cache=dimension_cache,
+                              timings=timings)
+
+
+def ingest_match_unit(cnx, parsed: tuple, dimension_cache: DimensionCache, batch_size: int = 1000, timings: dict = None,
+                      file_name: str = None, content_hash: str = None, replace: bool = False):
+    """
+    Unit of work of an incremental ingest (see cricket_parser.py): replaces the stored match if replace is True,
+    writes it, journals its summary table changes and records its load_manifest entry, all in one transaction. The
+    summary changes are journaled rather than applied (see reports.queue_summary_deltas), so concurrent matches do not
+    queue on the shared team and batter summary rows; fold them in with reports.fold_summary_deltas on one connection,
+    and bump the data version (see report_cache.py) there too, once per fold rather than once per match.
+    """
+    match_info_df, innings_df = parsed[2], parsed[3]
+    if replace:
+        match_id = match_info_df['match_id'].iloc[0]
+        time_stage(timings, 'summaries', remove_match_from_summaries, match_id, cnx, deferred=True)
+        time_stage(timings, 'delete_match', delete_match, match_id, cnx)
+    counts = write_match_unit(cnx, parsed, dimension_cache, batch_size=batch_size, timings=timings)
+    if counts['match_info'][0]:
+        time_stage(timings, 'summaries', add_match_to_summaries, match_info_df, innings_df, cnx, deferred=True)
+    time_stage(timings, 'manifest', record_load_manifest, file_name, content_hash, match_info_df, cnx)
+    return counts
+
+
+class WriterPool:
+    """
+    Writes parsed matches over pool_size database connections, one match-level transaction at a time per connection.
+
+    Dimension rows (teams and players, including the people of the delivery details) are inserted by the thread
+    that calls submit(), on dimension_cnx, and committed before the match is queued. The worker connections then
+    find every team and player of their match in the shared DimensionCache and only insert rows keyed by match_id,
+    so they neither race on the dimension unique keys nor wait on each other's dimension locks. A transaction that
+    still deadlocks is rolled back and retried up to deadlock_retries times.
+
+    Parameters:
+    ------------
+        - connect: Function returning a new database connection, e.g.
+          functools.partial(mysql.connector.connect, user=..., password=..., database=...).
+          Each worker calls it in its own thread.
+        - pool_size (int): Number of worker connections.
+        - dimension_cnx (optional): Connection for the dimension inserts. Defaults to a connect() of its own,
+          closed by close().
+        - dimension_cache (DimensionCache, optional): Defaults to one loaded from dimension_cnx.
+        - batch_size (int): Rows per multi-row INSERT.
+        - max_pending (int, optional): Matches queued for the workers before submit() blocks. Defaults to 2 * pool_size.
+        - deadlock_retries (int): Attempts after the first for a match hitting a RETRYABLE_ERRNOS error.
+
+    Notes:
+    ------------
+        - The first error a worker hits is re-raised by the next submit() and by close(); matches still queued by
+          then are cancelled. Matches committed before the error stay committed.
+        - Matches commit in completion order, not submission order.
+        - Extra connections only pay off when the database runs their transactions concurrently. The sqlite
+          LocalDatabase serializes them, and benchmark.run_pool_benchmark shows no speedup there; time it against a
+          throwaway MySQL database (benchmark.py --pool-sizes 1 2 4 8 --mysql-database ...) before using
+          cricket_parser.ingest(writer_pool_size=...).
+
+    Example:
+    -----------
+        with WriterPool(partial(mysql.connector.connect, **credentials), pool_size=4, dimension_cnx=cnx) as writer_pool:
+            futures = [writer_pool.submit(parsed) for parsed in parse_match_members(members)]
+        counts = [future.result() for future in futures]
+    """
+
+    def __init__(self, connect, pool_size: int = 4, dimension_cnx=None, dimension_cache: DimensionCache = None,
+                 batch_size: int = 1000, max_pending: int = None, deadlock_retries: int = 3):
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.deadlock_retries = deadlock_retries
+        self._connect = connect
+        self._owns_dimension_cnx = dimension_cnx is None
+        self.dimension_cnx = connect() if dimension_cnx is None else dimension_cnx
+        if dimension_cache is None:
+            dimension_cache = DimensionCache()
+            dimension_cache.load(self.dimension_cnx)
+        self.dimension_cache = dimension_cache
+        self._tasks = queue.Queue(maxsize=max_pending or 2 * pool_size)
+        self._error = None
+        self._cancelled = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, name='writer-{}'.format(idx), daemon=True)
+                         for idx in range(pool_size)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, parsed: tuple, unit=write_match_unit, timings: dict = None, **unit_options):
+        """
+        Adds the match's teams and players, then queues unit(cnx, parsed, dimension_cache, batch_size=...,
+        timings=timings, **unit_options) for the next free connection, which commits it. Blocks while max_pending
+        matches are queued.
+
+        Parameters:
+        ------------
+            - parsed (tuple): Output of functions.parse_match_file.
+            - unit: The function writing the match (write_match_unit or ingest_match_unit, or one with their signature).
+            - timings (dict, optional): Filled with the stage timings of the match (see metrics.IngestMetrics); complete
+              once the future is done.
+
+        Returns:
+        -----------
+            - concurrent.futures.Future of the unit's table -> (rows_written, rows_skipped) counts
+        """
+        self._raise_error()
+        dimension_counts = self._add_dimensions(parsed, timings)
+        future = Future()
+        self._tasks.put((future, unit, parsed, dimension_counts, timings, unit_options))
+        return future
+
+    def _add_dimensions(self, parsed: tuple, timings: dict):
+        team_df, player_df, delivery_details = parsed[0], parsed[1], parsed[4] if len(parsed) > 4 else None
+        cache, cnx = self.dimension_cache, self.dimension_cnx
+        players = time_stage(timings, 'write_players', cache.add_players, player_df, cnx, batch_size=self.batch_size, commit=False)
+        if delivery_details is not None:
+            detail_players = time_stage(timings, 'write_players', cache.add_players, delivery_detail_people(delivery_details),
+                                        cnx, batch_size=self.batch_size, commit=False)
+            players = (players[0] + detail_players[0], players[1])
+        teams = time_stage(timings, 'write_teams', cache.add_teams, team_df, cnx, batch_size=self.batch_size, commit=False)
+        time_stage(timings, 'commit', cnx.commit)
+        return {'players': players, 'teams': teams}
+
+    def _work(self):
+        cnx = None
+        try:
+            cnx = self._connect()
+        except Exception as error:
+            self._fail(error)
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            future, unit, parsed, dimension_counts, timings, unit_options = task
+            if self._error is not None or self._cancelled:
+                future.cancel()
+                continue
+            future.set_running_or_notify_cancel()
+            try:
+                counts = self._write(cnx, unit, parsed, timings, unit_options)
+            except Exception as error:
+                self._fail(error)
+                future.set_exception(error)
+                continue
+            counts.update(dimension_counts)
+            future.set_result(counts)
+        if cnx is not None:
+            cnx.close()
+
+    def _write(self, cnx, unit, parsed: tuple, timings: dict, unit_options: dict):
+        attempt = 0
+        while True:
+            try:
+                counts = unit(cnx, parsed, self.dimension_cache, batch_size=self.batch_size, timings=timings, **unit_options)
+                time_stage(timings, 'commit', cnx.commit)
+                return counts
+            except Exception as error:
+                cnx.rollback()
+                if getattr(error, 'errno', None) not in RETRYABLE_ERRNOS or attempt >= self.deadlock_retries:
+                    raise
+                attempt += 1
+
+    def _fail(self, error: Exception):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def close(self, cancel: bool = False):
+        """
+        Waits for the queued matches to be written (or cancels them if cancel is True), closes the connections and
+        re-raises the first worker error, if any. Safe to call more than once.
+        """
+        if not self._closed:
+            self._closed = True
+            self._cancelled = cancel
+            for _ in self._workers:
+                self._tasks.put(None)
+            for worker in self._workers:
+                worker.join()
+            if self._owns_dimension_cnx:
+                self.dimension_cnx.close()
+        if not cancel:
+            self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        #don't mask the caller's exception with a worker's
+        self.close(cancel=exc_type is not None)